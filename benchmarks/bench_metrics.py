@@ -0,0 +1,56 @@
+"""Measure the per-message cost of the pipeline instrumentation in ``metrics``.
+
+Each simulated message goes through the same calls the app makes on the hot
+path (read_string, filter, translate, add_msg stages plus one counter).  The
+loop runs once with metrics enabled and once with them disabled.  The
+difference from an empty loop is the overhead per message.
+
+Usage::
+
+    python benchmarks/bench_metrics.py --messages 200000
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT_DIR / 'src') not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR / 'src'))
+
+import metrics  # noqa: E402
+
+
+def baseline(messages):
+    start = time.perf_counter()
+    for _ in range(messages):
+        time.perf_counter()
+    return time.perf_counter() - start
+
+
+def instrumented(registry, messages):
+    start = time.perf_counter()
+    for _ in range(messages):
+        stage_start = time.perf_counter()
+        stage_start = registry.record_since('read_string', stage_start)
+        stage_start = registry.record_since('filter', stage_start)
+        registry.record('translate', 0.08)
+        registry.record_since('add_msg', stage_start)
+        registry.incr('dedup')
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200000)
+    args = parser.parse_args()
+
+    empty = baseline(args.messages)
+    for enabled in (True, False):
+        elapsed = instrumented(metrics.Metrics(enabled=enabled), args.messages)
+        overhead = (elapsed - empty) / args.messages * 1e6
+        print(f'{"enabled" if enabled else "disabled":<10}{overhead:>8.2f} us/message')
+
+
+if __name__ == '__main__':
+    main()
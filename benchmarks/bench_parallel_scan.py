@@ -0,0 +1,121 @@
+"""Measure how memory scan time scales with the number of workers.
+
+The target process is replaced by a synthetic memory image held in an
+anonymous mmap, so the benchmark runs without the game and on any OS.
+Two modes are measured.  ``processes`` is the default: this process reads
+each window into shared memory and worker processes only search it.
+``threads`` reads and searches on a thread pool.  ``bytes.find`` holds
+the GIL, so the threads mode is not expected to scale past one core.
+
+Pass ``--pid`` to scan a live process through the default backend
+(``process_vm_readv`` on Linux), or ``--snapshot`` to replay a capture
+made with ``tools/memory_snapshot.py``, instead of the synthetic image.
+
+Usage::
+
+    python benchmarks/bench_parallel_scan.py --size-mb 2048 --workers 1 2 4 8
+    python benchmarks/bench_parallel_scan.py --pid 4242 --workers 1 2 4
+    python benchmarks/bench_parallel_scan.py --snapshot game.snap
+"""
+import argparse
+import mmap
+import os
+import pathlib
+import random
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import memory_utils  # noqa: E402
+
+REGION_SIZE = 64 * 1024 * 1024
+REGION_STRIDE = REGION_SIZE + 0x10000
+IMAGE_BASE = 0x10000000
+PATTERN = '482915063771'.encode('utf-16le')
+
+
+def build_image(size_mb, needles):
+    size = size_mb * 1024 * 1024
+    image = mmap.mmap(-1, size)
+    rng = random.Random(0)
+    block = bytes(rng.getrandbits(8) for _ in range(1024 * 1024))
+    for offset in range(0, size, len(block)):
+        image[offset:offset + len(block)] = block[:size - offset]
+    for _ in range(needles):
+        offset = rng.randrange(0, size - len(PATTERN))
+        image[offset:offset + len(PATTERN)] = PATTERN
+    return image
+
+
+def install_image(image):
+    size = len(image)
+    regions = [(IMAGE_BASE + index * REGION_STRIDE, min(REGION_SIZE, size - start))
+               for index, start in enumerate(range(0, size, REGION_SIZE))]
+    view = memoryview(image)
+
+    def iter_regions(_handle):
+        return iter(regions)
+
+    def read_into(_handle, address, buffer, size):
+        index, offset = divmod(address - IMAGE_BASE, REGION_STRIDE)
+        start = index * REGION_SIZE + offset
+        buffer[:size] = view[start:start + size]
+        return size
+
+    memory_utils.iter_memory_regions = iter_regions
+    memory_utils.read_process_memory_into = read_into
+    memory_utils.get_process_handle = lambda _pid: None
+    memory_utils.CloseHandle = lambda _handle: True
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=2048)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--needles', type=int, default=100)
+    parser.add_argument('--pid', type=int, help='scan this live process instead of a synthetic image')
+    parser.add_argument('--snapshot', help='replay this memory snapshot instead of a synthetic image')
+    args = parser.parse_args()
+
+    if args.snapshot:
+        backend = memory_utils.ReplayBackend(args.snapshot)
+        memory_utils.set_backend(backend)
+        handle = None
+        args.size_mb = sum(region[2] for region in backend.regions) // (1024 * 1024) or 1
+    elif args.pid is None:
+        image = build_image(args.size_mb, args.needles)
+        install_image(image)
+        handle = None
+    else:
+        handle = memory_utils.get_process_handle(args.pid)
+        args.size_mb = sum(size for _, size in memory_utils.iter_memory_regions(handle)) // (1024 * 1024)
+
+    baseline, expected = timed(memory_utils.scan_memory_bytes, handle, PATTERN)
+    print(f'image: {args.size_mb} MiB, matches: {len(expected)}, cpus: {os.cpu_count()}')
+    print(f'{"mode":<10}{"workers":>8}{"seconds":>10}{"MiB/s":>10}{"speedup":>9}')
+    print(f'{"sequential":<10}{1:>8}{baseline:>10.3f}{args.size_mb / baseline:>10.0f}{1.0:>9.2f}')
+    for mode in ('processes', 'threads'):
+        for workers in args.workers:
+            # 先跑一次小窗口让进程池启动, 计时只包含扫描本身
+            memory_utils.parallel_scan_memory_bytes(handle, PATTERN, workers=workers, window_size=4096,
+                                                    processes=mode == 'processes')
+            elapsed, result = timed(memory_utils.parallel_scan_memory_bytes, handle, PATTERN,
+                                    workers=workers, processes=mode == 'processes')
+            assert result == expected, 'parallel scan returned different addresses'
+            print(f'{mode:<10}{workers:>8}{elapsed:>10.3f}{args.size_mb / elapsed:>10.0f}'
+                  f'{baseline / elapsed:>9.2f}')
+    memory_utils.shutdown_scan_executors()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Time AOB signature and multi-pattern scans over a synthetic memory image.
+
+Usage::
+
+    python benchmarks/bench_signature_scan.py --size-mb 512
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+if str(BENCH_DIR) not in sys.path:
+    sys.path.insert(0, str(BENCH_DIR))
+
+from bench_parallel_scan import PATTERN, build_image, install_image, memory_utils  # noqa: E402
+
+SIGNATURES = [
+    '48 8B ?? ?? 00 00 C3',
+    '?? ?? 8B 05 ?? ?? ?? ?? C3',
+    '4? 8B ?5',
+]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=512)
+    args = parser.parse_args()
+
+    install_image(build_image(args.size_mb, needles=100))
+    print(f'{"scan":<36}{"seconds":>10}{"MiB/s":>10}{"matches":>10}')
+    for signature in SIGNATURES:
+        elapsed, result = timed(memory_utils.scan_memory_signature, None, signature)
+        print(f'{signature:<36}{elapsed:>10.3f}{args.size_mb / elapsed:>10.0f}{len(result):>10}')
+
+    probe = PATTERN.decode('utf-16le')
+    patterns = [probe.encode(encoding) for encoding in ('utf-8', 'utf-16le', 'utf-16')]
+    elapsed, result = timed(memory_utils.scan_memory_patterns, None, patterns)
+    matches = sum(len(addresses) for addresses in result.values())
+    print(f'{"3 probe encodings, one pass":<36}{elapsed:>10.3f}{args.size_mb / elapsed:>10.0f}{matches:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Drive each translator class against the local provider stand-in and report throughput and latency.
+
+Every provider gets a fresh ``ConnectionPool`` and is hit with ``--requests``
+calls from ``--concurrency`` threads.  Errors are the translators' own
+failure strings.  Use ``--host`` to target an already running stand-in
+(``tools/provider_stand_in.py``) instead of the in-process one.
+
+Usage::
+
+    python benchmarks/bench_translators.py --requests 500 --concurrency 8 --latency lognormal:0.05,0.5
+    python benchmarks/bench_translators.py --providers baidu deepl --batch-size 10 --qps 20
+"""
+import argparse
+import pathlib
+import sys
+import threading
+import time
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+for path in (ROOT_DIR / 'src', ROOT_DIR / 'tools'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import translator  # noqa: E402
+from provider_stand_in import StandInServer  # noqa: E402
+
+PROVIDERS = ('baidu', 'deepl', 'youdao', 'papago')
+CREDENTIALS = {
+    'baidu': {'appid': 'bench', 'secretkey': 'bench'},
+    'deepl': {'auth_key': 'bench'},
+    'youdao': {'app_key': 'bench', 'app_secret': 'bench'},
+    'papago': {'client_id': 'bench', 'client_secret': 'bench'},
+}
+MESSAGES = ['한타 가자', '미드 라인 지원 부탁해요', '용병 먹고 코어 치자', '다음 오브젝트 준비', 'ㅈㅅ 실수했어요']
+
+
+def build_translator(provider, host, timeout):
+    settings = dict(CREDENTIALS[provider], host=host, scheme='http')
+    created = translator.PROVIDERS.create(provider, settings)
+    created.pool = translator.ConnectionPool()
+    created.timeout = timeout
+    return created
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def run_load(call, requests, concurrency):
+    """concurrency 个线程共同完成 requests 次调用, 返回 (耗时, 每次延迟, 失败次数)"""
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                index = remaining[0]
+            start = time.perf_counter()
+            failed = call(index)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                failures[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, failures[0]
+
+
+def make_call(created, batch_size):
+    if batch_size > 1:
+        def call(index):
+            texts = [MESSAGES[(index + offset) % len(MESSAGES)] for offset in range(batch_size)]
+            results = created.trans_batch(texts, fromLang='kor', toLang='zh')
+            return sum(result in translator.ERROR_MESSAGES for result in results)
+    else:
+        def call(index):
+            result = created.trans(MESSAGES[index % len(MESSAGES)], fromLang='kor', toLang='zh')
+            return int(result in translator.ERROR_MESSAGES)
+    return call
+
+
+def bench(args, host):
+    header = f'{"provider":<10}{"req/s":>10}{"msg/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}'
+    print(header)
+    for provider in args.providers:
+        created = build_translator(provider, host, args.timeout)
+        elapsed, latencies, failures = run_load(make_call(created, args.batch_size), args.requests, args.concurrency)
+        created.pool.close()
+        print(f'{provider:<10}{args.requests / elapsed:>10.1f}{args.requests * args.batch_size / elapsed:>10.1f}'
+              f'{percentile(latencies, 0.50) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}'
+              f'{percentile(latencies, 0.99) * 1000:>10.1f}{failures:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', nargs='+', choices=PROVIDERS, default=list(PROVIDERS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=1, help='messages per trans_batch call, 1 uses trans()')
+    parser.add_argument('--timeout', type=float, default=translator.REQUEST_TIMEOUT)
+    parser.add_argument('--host', help='existing stand-in host:port; starts one in-process when omitted')
+    parser.add_argument('--latency', default='fixed:0.02', help='stand-in latency spec, e.g. lognormal:0.05,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--qps', type=float, default=None, help='stand-in per-credential quota')
+    args = parser.parse_args()
+
+    if args.host:
+        bench(args, args.host)
+        return
+    with StandInServer(latency=args.latency, error_rate=args.error_rate, qps=args.qps) as server:
+        bench(args, server.host)
+        print('stand-in counters:', server.stats)
+
+
+if __name__ == '__main__':
+    main()
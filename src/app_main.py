@@ -6,16 +6,27 @@ from PyQt5.QtGui import QColor, QPainter, QBrush, QPen
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtCore import Qt, QTimer
 import pyautogui
+import multiprocessing
 import time
 import sys
-from translator import create_translator, load_config, save_config, TRANSLATOR_SPECS
-from utils import window_exists, contains_korean, generate_random_string
+from translator import (load_config, save_config, TRANSLATOR_SPECS, CONFIG_PATH,
+                        TranslationWorker, SwappableTranslator, METRICS_PATH, NO_TRANSLATION)
+from metrics import METRICS, MetricsExporter
+from utils import window_exists, get_window_pid, contains_korean, generate_random_string
 import os
-from memory_utils import read_string, get_process_id, get_process_handle, scan_memory_bytes, CloseHandle
+from memory_utils import (read_string, ProcessAttachManager, parallel_scan_memory_patterns,
+                          CandidateSet, build_address_signature, resolve_address_signature,
+                          save_address_signature, load_address_signature, discover_chat_history,
+                          shutdown_scan_executors)
 import keyboard
 from qss_style import list_widget_style, main_style, title_label_style
 
 GAME_APP_NAME = 'HeroesOfTheStorm_x64.exe'
+SIGNATURE_PATH = os.path.join(os.path.dirname(CONFIG_PATH), 'chat_signature.json')
+MIN_PROBE_ROUNDS = 3
+MAX_PROBE_ROUNDS = 6
+WATCHER_SCAN_INTERVAL = 250
+CONFIG_CHECK_INTERVAL = 2000
 
 
 class GlobalHotkey(QObject):
@@ -33,6 +44,11 @@ class GlobalHotkey(QObject):
         keyboard.remove_hotkey(self.hotkey)
 
 
+class TranslationSignals(QObject):
+    # 工作线程里发出, Qt 会排队到界面线程执行槽函数
+    finished = pyqtSignal(object)
+
+
 class HotKey(object):
     def __init__(self, key):
         self.key = key
@@ -139,16 +155,25 @@ class TransparentWindow(QMainWindow):
         self.count = 0
         self.my_last_msg = ''
         self.address = None
-        self.pid = None
         self.init_state = False
         self.candidate_address = None
         self.hided = False
         self.msg_list = []
 
         self.old_pos = None
-        self.handle = None
+        self.process = ProcessAttachManager(GAME_APP_NAME, pid_finder=lambda: get_window_pid("《风暴英雄》"))
+        self.attached_generation = None
+        self.chat_watcher = None
         self.encoding_format = 'utf-8'
-        self.get_translator()
+        self.translation_signals = TranslationSignals()
+        self.translation_signals.finished.connect(self.on_translation_finished)
+        self.translation_worker = TranslationWorker(callback=self.translation_signals.finished.emit)
+        self.pending_chat = {}
+        self.trans = SwappableTranslator()
+        self.translation_worker.translator = self.trans
+        self.report_translator()
+        self.metrics_exporter = None
+        self.apply_metrics_settings()
         self.target_lan = 'kor'
 
     def init_ui(self):
@@ -199,16 +224,33 @@ class TransparentWindow(QMainWindow):
         self.hide_win_timer.timeout.connect(self.hide_win)
         self.hide_win_timer.start(4500)
 
-    def get_translator(self):
-        self.trans = create_translator()
+        # 手工编辑配置文件后无需重启, 文件未变化时只做一次 stat
+        self.config_timer = QTimer(self)
+        self.config_timer.timeout.connect(self.reload_translator)
+        self.config_timer.start(CONFIG_CHECK_INTERVAL)
+
+    def report_translator(self):
         if self.trans:
-            config = load_config()
-            provider = config.get('provider', '')
-            provider_name = TRANSLATOR_SPECS.get(provider, {}).get('label', provider)
-            self.add_msg(f'已加载翻译服务: {provider_name}')
+            self.add_msg(f'已加载翻译服务: {self.trans.label}')
         else:
             self.add_msg('翻译接口未配置或信息缺失')
 
+    def apply_metrics_settings(self):
+        """启动时和配置变化后按 metrics 配置开关统计, 导出间隔变化时重启导出线程"""
+        settings = self.trans.config_service.get()['metrics']
+        METRICS.enabled = settings['enabled']
+        exporter = self.metrics_exporter
+        if exporter is not None and (not settings['enabled'] or exporter.interval != settings['export_interval']):
+            exporter.stop()
+            self.metrics_exporter = exporter = None
+        if settings['enabled'] and exporter is None:
+            self.metrics_exporter = MetricsExporter(METRICS, METRICS_PATH, settings['export_interval']).start()
+
+    def reload_translator(self):
+        if self.trans.reload():
+            self.apply_metrics_settings()
+            self.report_translator()
+
     def hide_win(self):
         if self.hided:
             return
@@ -241,7 +283,8 @@ class TransparentWindow(QMainWindow):
         dialog = SettingsDialog(self)
         result = dialog.exec_()
         if result == QDialog.Accepted:
-            self.get_translator()
+            self.trans.reload()
+            self.apply_metrics_settings()
             if self.trans:
                 self.add_msg(f'翻译服务已切换为: {dialog.selected_provider_label}')
             else:
@@ -294,39 +337,86 @@ class TransparentWindow(QMainWindow):
         time.sleep(1)
         return random_chat_msg
 
-    def get_process_handle(self):
-        if self.pid is None:
-            self.pid = get_process_id(GAME_APP_NAME)
-        if not self.handle:
-            self.handle = get_process_handle(self.pid)
-        self.add_msg('PID:{} Handle:{}'.format(self.pid, self.handle))
-
     def locate_memory_region(self):
-        self.get_process_handle()
+        try:
+            process_ref = self.process.acquire()
+        except ProcessLookupError:
+            self.add_msg('游戏未启动')
+            return
+        with process_ref as handle:
+            self.add_msg('PID:{} Handle:{}'.format(process_ref.pid, handle))
+            self.reset_memory_state()
+            self.attached_generation = self.process.generation
+            self.calibrate(handle)
+
+    def calibrate(self, handle):
         encoding_formats = ['utf-8', 'utf-16le', 'utf-16']
         self.add_msg('初始化中，不要操作键鼠')
+        random_chat_msg = self.send_random_chat_msg()
+        probe_messages = [random_chat_msg]
+        patterns = {encoding_format: random_chat_msg.encode(encoding=encoding_format)
+                    for encoding_format in encoding_formats}
+        # 一次遍历粗定位所有编码, 本进程读取内存, 搜索交给工作进程
+        found = parallel_scan_memory_patterns(handle, patterns.values())
+        candidates = {encoding_format: CandidateSet(handle, found[pattern])
+                      for encoding_format, pattern in patterns.items()}
+        for probe_round in range(1, MAX_PROBE_ROUNDS):
+            candidates = {encoding_format: candidate_set for encoding_format, candidate_set in candidates.items()
+                          if len(candidate_set)}
+            if not candidates:
+                break
+            if probe_round >= MIN_PROBE_ROUNDS and any(len(candidate_set) == 1 for candidate_set in candidates.values()):
+                break
+            random_chat_msg = self.send_random_chat_msg()
+            probe_messages.append(random_chat_msg)
+            for encoding_format, candidate_set in candidates.items():
+                candidate_set.refine(random_chat_msg.encode(encoding=encoding_format))  # 只检查已有候选地址
         for encoding_format in encoding_formats:
-            candidate_address_list = []
-            for _ in range(3):
-                random_chat_msg = self.send_random_chat_msg()
-
-                candidate_address = scan_memory_bytes(self.handle,
-                                                      random_chat_msg.encode(encoding=encoding_format))  # 粗定位
-                candidate_address_list.append(candidate_address)
-            candidate_address_list = [set(v) for v in candidate_address_list]
-            candidate_address = candidate_address_list[0] & candidate_address_list[1] & candidate_address_list[2]
-            candidate_address = list(candidate_address)
-            if len(candidate_address) == 1:
-                self.address = candidate_address[0]
+            candidate_set = candidates.get(encoding_format)
+            if candidate_set is not None and len(candidate_set) == 1:
+                self.address = candidate_set.addresses[0]
                 self.encoding_format = encoding_format
                 break
         if self.address is not None:
             self.hide_win_timer.start(4500)
             self.init_state = True
             self.add_msg('初始化成功, 监听地址{}'.format(hex(self.address)))
+            signature = build_address_signature(handle, self.address, self.encoding_format)
+            if signature is not None:
+                save_address_signature(SIGNATURE_PATH, signature)
+            # 第一条探测消息的命中地址来自上面的粗定位扫描, 不再重新扫描整个进程
+            first_hits = found[patterns[self.encoding_format]]
+            self.chat_watcher = discover_chat_history(handle, probe_messages, self.encoding_format, first_hits)
+            if self.chat_watcher is not None:
+                self.chat_watcher.poll()
+                self.scan_timer.start(WATCHER_SCAN_INTERVAL)
+                self.add_msg('已定位聊天记录, 共{}条消息槽位'.format(self.chat_watcher.slot_count))
         else:
             self.add_msg('初始化失败，请尝试重启游戏和插件')
 
+    def reset_memory_state(self):
+        self.init_state = False
+        self.address = None
+        self.chat_watcher = None
+        self.scan_timer.start(1000)
+
+    def restore_memory_region(self):
+        # 每次连接游戏进程只尝试一次, 特征校验失败时仍需 ctrl+1 完整初始化
+        self.attached_generation = self.process.generation
+        signature = load_address_signature(SIGNATURE_PATH)
+        if signature is None:
+            return
+        with self.process.acquire() as handle:
+            address = resolve_address_signature(handle, signature)
+        if address is None:
+            self.add_msg('内存特征已失效，请按ctrl+1重新初始化')
+            return
+        self.address = address
+        self.encoding_format = signature['encoding']
+        self.init_state = True
+        self.hide_win_timer.start(4500)
+        self.add_msg('已根据保存的特征恢复监听地址{}'.format(hex(self.address)))
+
     def auto_trans(self):
         if not window_exists("《风暴英雄》"):
             return
@@ -336,7 +426,6 @@ class TransparentWindow(QMainWindow):
             return
         select_all = HotKey(('ctrl', 'a'))
         copy = HotKey(('ctrl', 'c'))
-        paste = HotKey(('ctrl', 'v'))
         for _ in range(2):
             select_all.run()
             time.sleep(0.01)
@@ -346,7 +435,14 @@ class TransparentWindow(QMainWindow):
         chinese_text = clipboard.text()
         if not chinese_text:
             return
-        foreign_text = self.trans.trans(chinese_text, toLang=self.target_lan, fromLang='zh')
+        # 再次按下热键时取消上一次尚未完成的输入翻译
+        self.translation_worker.submit(chinese_text, fromLang='zh', toLang=self.target_lan,
+                                       channel='input', droppable=False, context='input')
+
+    def paste_translation(self, foreign_text):
+        select_all = HotKey(('ctrl', 'a'))
+        paste = HotKey(('ctrl', 'v'))
+        clipboard = QApplication.clipboard()
         clipboard.setText(foreign_text)
         self.my_last_msg = foreign_text
         for _ in range(2):
@@ -359,9 +455,28 @@ class TransparentWindow(QMainWindow):
             self.add_msg('游戏未启动')
             self.reshow()
             return
+        if not self.process.poll():
+            return
+        if self.attached_generation != self.process.generation:
+            # 首次连接或游戏重启后, 之前定位的地址已失效
+            self.reset_memory_state()
+            self.restore_memory_region()
         if not self.init_state:
             return
-        text = read_string(self.handle, self.address, 200, self.encoding_format)
+        start = time.perf_counter()
+        with self.process.acquire() as handle:
+            if self.chat_watcher is not None:
+                # 一次读取整个聊天记录数组, 同一周期内的多条消息按顺序处理
+                texts = [text for _, text in self.chat_watcher.poll()]
+            else:
+                texts = [read_string(handle, self.address, 200, self.encoding_format)]
+        # 读取和解码合计在 read_string 阶段
+        start = METRICS.record_since('read_string', start)
+        for text in texts:
+            self.handle_chat_text(text)
+        METRICS.record_since('filter', start)
+
+    def handle_chat_text(self, text):
         if text is None:
             return
         sys_msgs = ['综合 한국어', '<c val="3184FF">[团队]:</c>', '浏览战利', '浏览收藏', '菜单']
@@ -370,21 +485,46 @@ class TransparentWindow(QMainWindow):
                 return
         if contains_korean(text) and text != self.my_last_msg:
             if text in self.msg_list:
+                METRICS.incr('dedup')
                 return
             if not self.trans:
                 return
-            ch_text = self.trans.trans(text, toLang='zh')
             if len(text) == 0:
                 return
-            if '翻译失败' in ch_text:
+            job = self.pending_chat.get(text)
+            if job is not None and job.active:
+                METRICS.incr('dedup')
                 return
-            # if text != self.my_last_msg:
-            if True:
-                self.add_msg(text)
-                self.add_msg(ch_text)
-                self.reshow()
-                self.hide_win_timer.start(4500)  # 重置隐藏窗体倒计时
-                self.msg_list.append(text)
+            # 不等待网络, 译文由 on_translation_finished 显示; 被丢弃的请求不会回调, 顺便清理
+            self.pending_chat = {pending_text: pending_job for pending_text, pending_job in self.pending_chat.items()
+                                 if pending_job.active}
+            self.pending_chat[text] = self.translation_worker.submit(text, toLang='zh', context='chat')
+
+    def on_translation_finished(self, job):
+        if job.context == 'input':
+            # 输入框里已经是目标语言时不改动
+            if job.result != NO_TRANSLATION:
+                self.paste_translation(job.result)
+            return
+        text, ch_text = job.text, job.result
+        if self.pending_chat.get(text) is job:
+            del self.pending_chat[text]
+        if '翻译失败' in ch_text:
+            return
+        if text in self.msg_list:
+            METRICS.incr('dedup')
+            return
+        start = time.perf_counter()
+        self.add_msg(text)
+        # 不需要翻译的消息只显示一次原文
+        if ch_text != NO_TRANSLATION:
+            self.add_msg(ch_text)
+        self.reshow()
+        self.hide_win_timer.start(4500)  # 重置隐藏窗体倒计时
+        self.msg_list.append(text)
+        METRICS.record_since('add_msg', start)
+        # 从提交翻译到译文进入浮窗(不含随后的 Qt 重绘)
+        METRICS.record('end_to_end', time.monotonic() - job.submitted_at)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -401,12 +541,17 @@ class TransparentWindow(QMainWindow):
             self.old_pos = None
 
     def closeEvent(self, a0):
-        if self.handle is not None:
-            CloseHandle(self.handle)
+        self.translation_worker.shutdown()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        self.process.detach()
+        shutdown_scan_executors()
         self.close()
 
 
 if __name__ == "__main__":
+    # 内存扫描在工作进程中搜索, 打包成 exe 后需要它让子进程不再启动界面
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = TransparentWindow()
     window.show()
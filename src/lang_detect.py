@@ -0,0 +1,52 @@
+import re
+
+# 语言代码沿用百度翻译的写法, 各翻译接口的 _map_lang 负责转换
+KOREAN = 'kor'
+CHINESE = 'zh'
+JAPANESE = 'jp'
+ENGLISH = 'en'
+
+# 正则只在导入时编译一次, 聊天热路径上直接复用
+HANGUL_PATTERN = re.compile('[\uAC00-\uD7AF\u3130-\u318F\u1100-\u11FF]')
+KANA_PATTERN = re.compile('[\u3040-\u30FF\u31F0-\u31FF\uFF66-\uFF9F]')
+HAN_PATTERN = re.compile('[\u4E00-\u9FFF\u3400-\u4DBF\uF900-\uFAFF]')
+LATIN_PATTERN = re.compile('[A-Za-z\u00C0-\u024F]')
+
+# 拉丁字母一个词由多个字母组成, 计数时打折, 避免 "gg 한타" 这类夹杂英文的消息被判成英语
+LATIN_WEIGHT = 0.5
+
+
+def script_histogram(text):
+    """统计各文字的字符数, 数字、表情和标点不计入"""
+    return {
+        'hangul': len(HANGUL_PATTERN.findall(text)),
+        'kana': len(KANA_PATTERN.findall(text)),
+        'han': len(HAN_PATTERN.findall(text)),
+        'latin': len(LATIN_PATTERN.findall(text)),
+    }
+
+
+def detect_language(text):
+    """根据文字分布判断语言, 没有任何文字(只有数字、表情、标点)时返回 None"""
+    if not text:
+        return None
+    counts = script_histogram(text)
+    if counts['kana'] and counts['kana'] >= counts['hangul']:
+        # 假名只出现在日文里, 日文中的汉字也一并算作日文
+        return JAPANESE
+    scores = [
+        (counts['hangul'], KOREAN),
+        (counts['han'], CHINESE),
+        (counts['latin'] * LATIN_WEIGHT, ENGLISH),
+    ]
+    score, language = max(scores, key=lambda item: item[0])
+    if score <= 0:
+        return None
+    return language
+
+
+def needs_translation(text, toLang, language=None):
+    """已经是目标语言或没有文字内容的消息不需要翻译"""
+    if language is None:
+        language = detect_language(text)
+    return language is not None and language != toLang
@@ -1,29 +1,51 @@
+import abc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bisect
+from collections import deque
 import ctypes
 from ctypes import wintypes
+import heapq
+import itertools
+import json
+import mmap
+from multiprocessing import shared_memory
+import os
 import psutil
+import re
 import struct
-
-kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+import sys
+import threading
+import time
 
 PROCESS_VM_READ = 0x0010
 PROCESS_QUERY_INFORMATION = 0x0400
+SYNCHRONIZE = 0x00100000
+WAIT_TIMEOUT = 0x102
+PAGE_NOACCESS = 0x01
+PAGE_READONLY = 0x02
 PAGE_READWRITE = 0x04
+PAGE_WRITECOPY = 0x08
+PAGE_EXECUTE_READ = 0x20
+PAGE_EXECUTE_READWRITE = 0x40
+PAGE_EXECUTE_WRITECOPY = 0x80
+PAGE_WRITABLE = PAGE_READWRITE | PAGE_WRITECOPY | PAGE_EXECUTE_READWRITE | PAGE_EXECUTE_WRITECOPY
+PAGE_SIZE = 0x1000
+MEM_COMMIT = 0x1000
+SCAN_WINDOW_SIZE = 0x100000
+SCAN_WORKERS = os.cpu_count() or 1
+REATTACH_INTERVAL = 5.0
+SIGNATURE_VERSION = 1
+SIGNATURE_CONTEXT_SIZE = 64
+SIGNATURE_MIN_BYTES = 8
+CHAT_SLOT_MAX_STRIDE = 0x1000
+CHAT_SLOT_MAX_LENGTH = 0x200
+CHAT_HISTORY_MAX_SLOTS = 128
+SNAPSHOT_MAGIC = b"HOSSNAP1"
+SNAPSHOT_HEADER = struct.Struct('<8sQ')
+# 基址, 分配基址, 大小, 保护属性, 数据在文件中的偏移
+SNAPSHOT_ENTRY = struct.Struct('<QQQQQ')
 
-kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
-kernel32.OpenProcess.restype = wintypes.HANDLE
-
-kernel32.ReadProcessMemory.argtypes = [
-    wintypes.HANDLE,
-    wintypes.LPCVOID,
-    wintypes.LPVOID,
-    ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_size_t)
-]
-kernel32.ReadProcessMemory.restype = wintypes.BOOL
-
-kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
-kernel32.CloseHandle.restype = wintypes.BOOL
-CloseHandle = kernel32.CloseHandle
 
 # 正确定义 MEMORY_BASIC_INFORMATION 结构体
 class MEMORY_BASIC_INFORMATION(ctypes.Structure):
@@ -38,10 +60,301 @@ class MEMORY_BASIC_INFORMATION(ctypes.Structure):
     ]
 
 
-# 修正 VirtualQueryEx 定义
-VirtualQueryEx = kernel32.VirtualQueryEx
-VirtualQueryEx.argtypes = [wintypes.HANDLE, wintypes.LPCVOID, ctypes.POINTER(MEMORY_BASIC_INFORMATION), ctypes.c_size_t]
-VirtualQueryEx.restype = ctypes.c_size_t
+class IOVEC(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t)
+    ]
+
+
+class ProcessMemoryBackend(abc.ABC):
+    """进程内存访问后端: 打开进程、枚举内存区域、读取和批量分散读取"""
+
+    @abc.abstractmethod
+    def open_process(self, pid):
+        """Open ``pid`` for reading and return a backend-specific handle."""
+
+    @abc.abstractmethod
+    def close_process(self, handle):
+        """Release a handle returned by ``open_process``."""
+
+    def is_process_alive(self, handle):
+        """Cheap liveness check for an open handle, without enumerating processes."""
+        return True
+
+    @abc.abstractmethod
+    def iter_region_info(self, handle):
+        """Yield ``(base_address, allocation_base, region_size, protect)`` for every committed region."""
+
+    @abc.abstractmethod
+    def read_into(self, handle, address, buffer, size):
+        """Read ``size`` bytes into the start of ``buffer``; return the byte count read."""
+
+    def read(self, handle, address, size):
+        buffer = bytearray(size)
+        if self.read_into(handle, address, buffer, size) != size:
+            return None
+        return bytes(buffer)
+
+    def read_scatter(self, handle, requests):
+        """Read every ``(address, size)`` request; failed reads come back as ``None``."""
+        return [self.read(handle, address, size) for address, size in requests]
+
+
+class Win32Backend(ProcessMemoryBackend):
+    """基于 kernel32 的 OpenProcess / VirtualQueryEx / ReadProcessMemory 实现"""
+
+    def __init__(self):
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+
+        kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+
+        kernel32.ReadProcessMemory.argtypes = [
+            wintypes.HANDLE,
+            wintypes.LPCVOID,
+            wintypes.LPVOID,
+            ctypes.c_size_t,
+            ctypes.POINTER(ctypes.c_size_t)
+        ]
+        kernel32.ReadProcessMemory.restype = wintypes.BOOL
+
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        kernel32.CloseHandle.restype = wintypes.BOOL
+
+        kernel32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+        kernel32.WaitForSingleObject.restype = wintypes.DWORD
+
+        # 修正 VirtualQueryEx 定义
+        kernel32.VirtualQueryEx.argtypes = [wintypes.HANDLE, wintypes.LPCVOID,
+                                            ctypes.POINTER(MEMORY_BASIC_INFORMATION), ctypes.c_size_t]
+        kernel32.VirtualQueryEx.restype = ctypes.c_size_t
+        self.kernel32 = kernel32
+
+    def open_process(self, pid):
+        handle = self.kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_VM_READ | SYNCHRONIZE, False, pid)
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        return handle
+
+    def close_process(self, handle):
+        return self.kernel32.CloseHandle(handle)
+
+    def is_process_alive(self, handle):
+        # 进程退出后句柄变为有信号状态, 等待 0 毫秒即可判断
+        return self.kernel32.WaitForSingleObject(handle, 0) == WAIT_TIMEOUT
+
+    def iter_region_info(self, handle):
+        mbi = MEMORY_BASIC_INFORMATION()
+        address = 0
+
+        while True:
+            # 查询内存区域信息
+            if not self.kernel32.VirtualQueryEx(handle, address, ctypes.byref(mbi), ctypes.sizeof(mbi)):
+                break
+
+            if mbi.State == MEM_COMMIT:
+                yield mbi.BaseAddress or 0, mbi.AllocationBase or 0, mbi.RegionSize, mbi.Protect
+
+            address += mbi.RegionSize
+            if address == 0:  # 防止无限循环
+                break
+
+    def read_into(self, handle, address, buffer, size):
+        target = (ctypes.c_char * size).from_buffer(buffer)
+        bytes_read = ctypes.c_size_t()
+        if not self.kernel32.ReadProcessMemory(handle, address, target, size, ctypes.byref(bytes_read)):
+            return 0
+        return bytes_read.value
+
+    def read(self, handle, address, size):
+        buffer = ctypes.create_string_buffer(size)
+        bytes_read = ctypes.c_size_t()
+        if not self.kernel32.ReadProcessMemory(handle, address, buffer, size, ctypes.byref(bytes_read)):
+            return None
+        return buffer.raw
+
+
+class LinuxBackend(ProcessMemoryBackend):
+    """基于 /proc/<pid>/maps 和 process_vm_readv 的实现, 句柄就是 pid"""
+
+    IOV_MAX = 1024
+    PROTECT_FLAGS = {
+        'r--': PAGE_READONLY,
+        'rw-': PAGE_READWRITE,
+        'r-x': PAGE_EXECUTE_READ,
+        'rwx': PAGE_EXECUTE_READWRITE,
+    }
+
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._process_vm_readv = libc.process_vm_readv
+        self._process_vm_readv.argtypes = [ctypes.c_int, ctypes.POINTER(IOVEC), ctypes.c_ulong,
+                                           ctypes.POINTER(IOVEC), ctypes.c_ulong, ctypes.c_ulong]
+        self._process_vm_readv.restype = ctypes.c_ssize_t
+
+    def open_process(self, pid):
+        if not os.path.exists(f'/proc/{pid}/maps'):
+            raise ProcessLookupError(f"Process {pid} not found")
+        return pid
+
+    def close_process(self, handle):
+        return True
+
+    def is_process_alive(self, handle):
+        return os.path.exists(f'/proc/{handle}/maps')
+
+    def iter_region_info(self, handle):
+        with open(f'/proc/{handle}/maps', 'r') as fh:
+            for line in fh:
+                fields = line.split(None, 5)
+                start, end = (int(value, 16) for value in fields[0].split('-'))
+                protect = self.PROTECT_FLAGS.get(fields[1][:3], PAGE_NOACCESS)
+                # Linux 没有分配基址的概念, 以映射起始地址代替
+                yield start, start, end - start, protect
+
+    def read_into(self, handle, address, buffer, size):
+        target = (ctypes.c_char * size).from_buffer(buffer)
+        local = IOVEC(ctypes.addressof(target), size)
+        remote = IOVEC(address, size)
+        return max(self._process_vm_readv(handle, ctypes.byref(local), 1, ctypes.byref(remote), 1, 0), 0)
+
+    def read_scatter(self, handle, requests):
+        # 一次系统调用读取多个分散地址; 遇到不可读的请求时内核会停止, 跳过它后继续
+        results = [None] * len(requests)
+        index = 0
+        while index < len(requests):
+            batch = requests[index:index + self.IOV_MAX]
+            buffers = [ctypes.create_string_buffer(size) for _, size in batch]
+            local = (IOVEC * len(batch))(*[IOVEC(ctypes.addressof(buffer), size)
+                                           for buffer, (_, size) in zip(buffers, batch)])
+            remote = (IOVEC * len(batch))(*[IOVEC(address, size) for address, size in batch])
+            remaining = self._process_vm_readv(handle, local, len(batch), remote, len(batch), 0)
+
+            done = 0
+            for buffer, (_, size) in zip(buffers, batch):
+                if remaining < size:
+                    break
+                results[index + done] = buffer.raw
+                remaining -= size
+                done += 1
+            index += done if done == len(batch) else done + 1
+        return results
+
+
+class ReplayBackend(ProcessMemoryBackend):
+    """从内存快照文件回放读取, 数据通过 mmap 直接来自页缓存, 不需要目标进程"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, count = SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a memory snapshot")
+        self.regions = [SNAPSHOT_ENTRY.unpack_from(self._mmap, SNAPSHOT_HEADER.size + index * SNAPSHOT_ENTRY.size)
+                        for index in range(count)]
+        self._starts = [region[0] for region in self.regions]
+        self._view = memoryview(self._mmap)
+
+    def close(self):
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._mmap.close()
+        self._file.close()
+
+    def open_process(self, pid):
+        return pid
+
+    def close_process(self, handle):
+        return True
+
+    def iter_region_info(self, handle):
+        for base_address, allocation_base, region_size, protect, _ in self.regions:
+            yield base_address, allocation_base, region_size, protect
+
+    def view(self, address, size):
+        """Return a zero-copy memoryview of ``size`` bytes at ``address``, or ``None`` if not captured."""
+        index = bisect.bisect_right(self._starts, address) - 1
+        if index < 0:
+            return None
+        base_address, _, region_size, _, data_offset = self.regions[index]
+        if address + size > base_address + region_size:
+            return None
+        start = data_offset + address - base_address
+        return self._view[start:start + size]
+
+    def read_into(self, handle, address, buffer, size):
+        data = self.view(address, size)
+        if data is None:
+            return 0
+        buffer[:size] = data
+        return size
+
+    def read(self, handle, address, size):
+        data = self.view(address, size)
+        return None if data is None else data.tobytes()
+
+
+def capture_memory_snapshot(handle, path, window_size=SCAN_WINDOW_SIZE):
+    """把进程所有已提交的可读写区域保存为快照文件, 返回保存的区域数量"""
+    regions = [info for info in iter_memory_region_info(handle) if info[3] & PAGE_READWRITE]
+    buffer = bytearray(window_size)
+    index = []
+
+    with open(path, 'wb') as fh:
+        # 先占位写入索引, 数据按页对齐写在后面, 读完再回写真实大小和偏移
+        fh.write(b"\x00" * (SNAPSHOT_HEADER.size + SNAPSHOT_ENTRY.size * len(regions)))
+        for base_address, allocation_base, region_size, protect in regions:
+            fh.seek(-fh.tell() % PAGE_SIZE, os.SEEK_CUR)
+            data_offset = fh.tell()
+            captured = 0
+            while captured < region_size:
+                size = min(window_size, region_size - captured)
+                if read_process_memory_into(handle, base_address + captured, buffer, size) != size:
+                    break
+                fh.write(memoryview(buffer)[:size])
+                captured += size
+            if captured:
+                index.append((base_address, allocation_base, captured, protect, data_offset))
+        fh.truncate()
+
+        fh.seek(0)
+        fh.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(index)))
+        for entry in index:
+            fh.write(SNAPSHOT_ENTRY.pack(*entry))
+    return len(index)
+
+
+def create_default_backend():
+    if sys.platform == 'win32':
+        return Win32Backend()
+    if sys.platform.startswith('linux'):
+        return LinuxBackend()
+    raise OSError(f"No process memory backend for {sys.platform}")
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_default_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """切换进程内存后端, 返回之前的后端"""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
 
 
 def get_process_id(process_name):
@@ -52,46 +365,55 @@ def get_process_id(process_name):
 
 
 def get_process_handle(pid):
-    handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_VM_READ, False, pid)
-    if not handle:
-        raise ctypes.WinError(ctypes.get_last_error())
-    return handle
+    return get_backend().open_process(pid)
+
+
+def CloseHandle(handle):
+    return get_backend().close_process(handle)
 
-def read_process_memory(process_handle, address, size=4):
-    # process_handle = kernel32.OpenProcess(
-    #     PROCESS_VM_READ | PROCESS_QUERY_INFORMATION,
-    #     False,
-    #     pid
-    # )
-    # if not process_handle:
-    #     raise ctypes.WinError(ctypes.get_last_error())
 
+def is_process_alive(handle):
     try:
-        buffer = ctypes.create_string_buffer(size)
-        bytes_read = ctypes.c_size_t()
-        if not kernel32.ReadProcessMemory(
-                process_handle,
-                address,
-                buffer,
-                size,
-                ctypes.byref(bytes_read)
-        ):
-            return None
-            # raise ctypes.WinError(ctypes.get_last_error())
-        return buffer.raw
-    except:
+        return get_backend().is_process_alive(handle)
+    except Exception:
+        return False
+
+
+def read_process_memory(process_handle, address, size=4):
+    try:
+        return get_backend().read(process_handle, address, size)
+    except Exception:
         return None
-    # finally:
-    #     kernel32.CloseHandle(process_handle)
+
+
+def read_process_memory_into(handle, address, buffer, size):
+    """Read ``size`` bytes into the start of a writable ``buffer``; return the byte count read."""
+    try:
+        return get_backend().read_into(handle, address, buffer, size)
+    except Exception:
+        return 0
+
+
+def read_process_memory_batch(handle, requests):
+    """批量读取多个 (地址, 大小), 返回与请求顺序一致的 bytes 列表, 读取失败的位置为 None"""
+    requests = list(requests)
+    try:
+        return get_backend().read_scatter(handle, requests)
+    except Exception:
+        return [read_process_memory(handle, address, size) for address, size in requests]
 
 
 def read_int(handle, address):
     data = read_process_memory(handle, address, 4)
+    if data is None:
+        return None
     return int.from_bytes(data, 'little')
 
 
 def read_float(handle, address):
     data = read_process_memory(handle, address, 4)
+    if data is None:
+        return None
     return struct.unpack('<f', data)[0]
 
 
@@ -110,30 +432,60 @@ def _get_char_width(encoding_format):
     return 1
 
 
-def read_string(handle, address, max_length=100, encoding_format='utf-8'):
-    encoding = encoding_format or 'utf-8'
-    char_width = _get_char_width(encoding)
-    terminator = b"\x00" * max(char_width, 1)
+def _read_readable_prefix(handle, address, size):
+    """Read ``size`` bytes in one call, or page by page up to the first unreadable page."""
+    if size <= 0:
+        return b''
+    data = read_process_memory(handle, address, size)
+    if data is not None and len(data) >= size:
+        return data[:size]
 
-    buffer = bytearray()
+    # 整块读取失败时按页读取，保留可读部分
+    chunks = []
     offset = 0
+    while offset < size:
+        current = address + offset
+        chunk_size = min(PAGE_SIZE - (current % PAGE_SIZE), size - offset)
+        chunk = read_process_memory(handle, current, chunk_size)
+        if not chunk or len(chunk) < chunk_size:
+            break
+        chunks.append(chunk)
+        offset += chunk_size
+    return b''.join(chunks)
 
-    # Ensure we only read complete characters worth of bytes to avoid leftovers.
-    max_bytes = max_length if max_length else 0
-    max_steps = (max_bytes // char_width) if max_bytes else None
 
-    steps = 0
-    while max_steps is None or steps < max_steps:
-        chunk = read_process_memory(handle, address + offset, char_width)
-        if not chunk or len(chunk) < char_width:
-            break
+def _find_terminator(data, terminator, char_width, start=0):
+    """Return the offset of the first character-aligned terminator, or the aligned length."""
+    pos = data.find(terminator, start)
+    while pos != -1 and pos % char_width:
+        pos = data.find(terminator, pos + 1)
+    if pos == -1:
+        return len(data) - (len(data) % char_width)
+    return pos
 
-        if chunk == terminator:
-            break
 
+def _read_until_terminator(handle, address, terminator, char_width):
+    """Read page-aligned chunks until a terminator or an unreadable page is reached."""
+    buffer = bytearray()
+    while True:
+        current = address + len(buffer)
+        chunk_size = PAGE_SIZE - (current % PAGE_SIZE)
+        chunk = read_process_memory(handle, current, chunk_size)
+        if not chunk or len(chunk) < chunk_size:
+            return bytes(buffer)
+        search_from = len(buffer) - (len(buffer) % char_width)
         buffer.extend(chunk)
-        offset += char_width
-        steps += 1
+        end = _find_terminator(buffer, terminator, char_width, search_from)
+        if end + char_width <= len(buffer):
+            return bytes(buffer[:end + char_width])
+
+
+def decode_string(data, encoding_format='utf-8'):
+    """Decode bytes up to the first character-aligned NUL terminator, the way read_string does."""
+    encoding = encoding_format or 'utf-8'
+    char_width = _get_char_width(encoding)
+    terminator = b"\x00" * max(char_width, 1)
+    buffer = data[:_find_terminator(data, terminator, char_width)]
 
     try:
         return buffer.decode(encoding)
@@ -144,43 +496,964 @@ def read_string(handle, address, max_length=100, encoding_format='utf-8'):
         return buffer.decode(encoding, errors="ignore")
 
 
-def scan_memory_bytes(handle, pattern_bytes):
+def read_string(handle, address, max_length=100, encoding_format='utf-8'):
+    """Read a NUL-terminated string with as few ReadProcessMemory calls as possible."""
+    encoding = encoding_format or 'utf-8'
+    char_width = _get_char_width(encoding)
+    terminator = b"\x00" * max(char_width, 1)
+
+    # Ensure we only read complete characters worth of bytes to avoid leftovers.
+    if max_length:
+        max_bytes = (max_length // char_width) * char_width
+        data = _read_readable_prefix(handle, address, max_bytes)
+    else:
+        data = _read_until_terminator(handle, address, terminator, char_width)
+
+    return decode_string(data, encoding)
+
+
+def iter_memory_region_info(handle):
+    """枚举所有已提交的内存区域, 逐个返回 (基址, 分配基址, 大小, 保护属性)"""
+    return get_backend().iter_region_info(handle)
+
+
+def iter_memory_regions(handle):
+    """枚举已提交的可读写内存区域, 逐个返回 (基址, 大小)"""
+    for base_address, _, region_size, protect in iter_memory_region_info(handle):
+        if protect & PAGE_READWRITE:
+            yield base_address, region_size
+
+
+def _window_layout(region_size, window_size, overlap):
+    """把区域切成窗口, 返回 (窗口偏移, 有效长度, 本窗口负责报告的起始位置上限)"""
+    step = window_size - overlap
+    offset = 0
+
+    while offset < region_size:
+        size = min(window_size, region_size - offset)
+        # 相邻窗口重叠 overlap 字节, 起始位置落在重叠区的匹配交给下一个窗口报告
+        last_window = offset + size >= region_size
+        yield offset, size, size if last_window else step
+
+        if last_window:
+            return
+        offset += step
+
+
+def _iter_region_windows(handle, base_address, region_size, buffer, overlap):
+    """按窗口读取区域, 返回 (窗口偏移, 有效长度, 本窗口负责报告的起始位置上限)"""
+    for offset, size, limit in _window_layout(region_size, len(buffer), overlap):
+        if read_process_memory_into(handle, base_address + offset, buffer, size) != size:
+            return
+        yield offset, size, limit
+
+
+def _scan_region(handle, base_address, region_size, pattern_bytes, buffer):
+    overlap = max(len(pattern_bytes) - 1, 0)
+    for offset, size, limit in _iter_region_windows(handle, base_address, region_size, buffer, overlap):
+        pos = buffer.find(pattern_bytes, 0, size)
+        while pos != -1 and pos < limit:
+            yield base_address + offset + pos
+            pos = buffer.find(pattern_bytes, pos + 1, size)
+
+
+def iter_scan_memory_bytes(handle, pattern_bytes, window_size=SCAN_WINDOW_SIZE, regions=None):
+    """流式搜索字节序列, 按固定窗口读取内存并逐个返回匹配地址"""
+    # 所有区域共用一个缓冲区, 峰值内存只与窗口大小有关
+    buffer = bytearray(max(window_size, len(pattern_bytes)))
+    if regions is None:
+        regions = iter_memory_regions(handle)
+
+    for base_address, region_size in regions:
+        try:
+            yield from _scan_region(handle, base_address, region_size, pattern_bytes, buffer)
+        except Exception as e:
+            print(f"读取内存区域 {hex(base_address)} 时出错: {e}")
+
+
+def scan_memory_bytes(handle, pattern_bytes, window_size=SCAN_WINDOW_SIZE):
     """搜索字节序列"""
-    mbi = MEMORY_BASIC_INFORMATION()
-    address = 0
-    found_addresses = []
-    pattern_len = len(pattern_bytes)
+    return list(iter_scan_memory_bytes(handle, pattern_bytes, window_size))
 
-    while True:
-        # 查询内存区域信息
-        if not VirtualQueryEx(handle, address, ctypes.byref(mbi), ctypes.sizeof(mbi)):
+
+def compile_patterns(patterns):
+    """去重并按长度从长到短排列要同时搜索的字节序列"""
+    unique_patterns = sorted({bytes(p) for p in patterns if p}, key=len, reverse=True)
+    if not unique_patterns:
+        raise ValueError("patterns must contain at least one non-empty byte string")
+    return unique_patterns
+
+
+def _iter_find(buffer, pattern_bytes, size, limit, tag):
+    pos = buffer.find(pattern_bytes, 0, size)
+    while pos != -1 and pos < limit:
+        yield pos, tag
+        pos = buffer.find(pattern_bytes, pos + 1, size)
+
+
+def _find_patterns(buffer, patterns, size, limit):
+    # 各模式分别用 bytes.find 搜索后按位置合并;
+    # 拼成 (?=a|b) 正则会让 re 用不上字面量前缀搜索, 比逐个 find 慢一个数量级
+    finders = [_iter_find(buffer, pattern, size, limit, index) for index, pattern in enumerate(patterns)]
+    return heapq.merge(*finders)
+
+
+def _scan_region_multi(handle, base_address, region_size, patterns, buffer):
+    overlap = len(patterns[0]) - 1
+    for offset, size, limit in _iter_region_windows(handle, base_address, region_size, buffer, overlap):
+        # 每个窗口只读取一次
+        for pos, index in _find_patterns(buffer, patterns, size, limit):
+            yield base_address + offset + pos, patterns[index]
+
+
+def iter_scan_memory_patterns(handle, patterns, window_size=SCAN_WINDOW_SIZE, regions=None):
+    """单次遍历内存同时搜索多个字节序列, 按地址顺序返回 (地址, 命中的模式)"""
+    compiled = compile_patterns(patterns)
+    buffer = bytearray(max(window_size, len(compiled[0])))
+    if regions is None:
+        regions = iter_memory_regions(handle)
+
+    for base_address, region_size in regions:
+        try:
+            yield from _scan_region_multi(handle, base_address, region_size, compiled, buffer)
+        except Exception as e:
+            print(f"读取内存区域 {hex(base_address)} 时出错: {e}")
+
+
+def scan_memory_patterns(handle, patterns, window_size=SCAN_WINDOW_SIZE):
+    """搜索多个字节序列, 返回 {模式: [地址, ...]}"""
+    patterns = list(patterns)
+    found = {bytes(p): [] for p in patterns if p}
+    for address, pattern in iter_scan_memory_patterns(handle, patterns, window_size):
+        found[pattern].append(address)
+    return found
+
+
+class ByteSignature(object):
+    """AOB 特征码, 支持 ?? 通配字节和半字节掩码, 例如 "48 8B ?? ?? 00 00 C3"、"4? 8B 0?"
+
+    先用最长的确定字节段作为锚点, 让正则引擎在 C 层快速定位, 其余字节在同一个正则中
+    通过前后断言一并校验, 不需要逐个候选位置在 Python 中比较。
+    """
+
+    def __init__(self, pattern, mask=None):
+        if isinstance(pattern, str):
+            if mask is not None:
+                raise ValueError("mask is only accepted together with a bytes pattern")
+            values, mask = self._parse(pattern)
+        else:
+            values = bytes(pattern)
+            mask = bytes(mask) if mask is not None else b"\xff" * len(values)
+            if len(mask) != len(values):
+                raise ValueError("mask must be as long as the pattern")
+        if not values:
+            raise ValueError("signature must not be empty")
+        self.values = bytes(v & m for v, m in zip(values, mask))
+        self.mask = mask
+        self.size = len(values)
+        self.anchor_offset, anchor_size = self._longest_exact_run()
+        self.anchor = self.values[self.anchor_offset:self.anchor_offset + anchor_size]
+        self.regex = self._compile()
+
+    @staticmethod
+    def _parse(pattern):
+        values = bytearray()
+        mask = bytearray()
+        for token in pattern.split():
+            if token in ('?', '??'):
+                values.append(0)
+                mask.append(0)
+                continue
+            if len(token) != 2:
+                raise ValueError(f"invalid signature byte {token!r}")
+            value = 0
+            byte_mask = 0
+            for nibble in token:
+                value <<= 4
+                byte_mask <<= 4
+                if nibble != '?':
+                    value |= int(nibble, 16)
+                    byte_mask |= 0xF
+            values.append(value)
+            mask.append(byte_mask)
+        return bytes(values), bytes(mask)
+
+    def _longest_exact_run(self):
+        best = (0, 0)
+        start = None
+        for index, byte_mask in enumerate(self.mask + b"\x00"):
+            if byte_mask == 0xFF:
+                if start is None:
+                    start = index
+            elif start is not None:
+                if index - start > best[1]:
+                    best = (start, index - start)
+                start = None
+        return best
+
+    def _byte_regex(self, index):
+        value, byte_mask = self.values[index], self.mask[index]
+        if byte_mask == 0xFF:
+            return re.escape(bytes([value]))
+        if byte_mask == 0:
+            return b'.'
+        allowed = bytes(b for b in range(256) if b & byte_mask == value)
+        return b'[' + b''.join(re.escape(bytes([b])) for b in allowed) + b']'
+
+    def _compile(self):
+        parts = [self._byte_regex(index) for index in range(self.size)]
+        anchor_end = self.anchor_offset + len(self.anchor)
+        regex = re.escape(self.anchor)
+        if self.anchor_offset:
+            # 锚点放在最前面才能用上正则引擎的字面量前缀加速, 锚点之前的字节用后行断言校验
+            regex += b'(?<=' + b''.join(parts[:anchor_end]) + b')'
+        regex += b''.join(parts[anchor_end:])
+        return re.compile(regex, re.DOTALL)
+
+    def matches(self, data, offset=0):
+        if offset < 0 or offset + self.size > len(data):
+            return False
+        return all((data[offset + index] & m) == v for index, (v, m) in enumerate(zip(self.values, self.mask)))
+
+    def iter_matches(self, buffer, size=None, limit=None):
+        """Yield start offsets of every (possibly overlapping) match inside ``buffer[:size]``."""
+        size = len(buffer) if size is None else size
+        limit = size if limit is None else limit
+        match = self.regex.search(buffer, self.anchor_offset, size)
+        while match is not None:
+            pos = match.start() - self.anchor_offset
+            if pos >= limit:
+                return
+            yield pos
+            match = self.regex.search(buffer, match.start() + 1, size)
+
+
+def _scan_region_signature(handle, base_address, region_size, signature, buffer):
+    for offset, size, limit in _iter_region_windows(handle, base_address, region_size, buffer, signature.size - 1):
+        for pos in signature.iter_matches(buffer, size, limit):
+            yield base_address + offset + pos
+
+
+def iter_scan_memory_signature(handle, signature, window_size=SCAN_WINDOW_SIZE, regions=None):
+    """按 AOB 特征码流式搜索内存, 按地址顺序逐个返回匹配地址"""
+    if not isinstance(signature, ByteSignature):
+        signature = ByteSignature(signature)
+    buffer = bytearray(max(window_size, signature.size))
+    if regions is None:
+        regions = iter_memory_regions(handle)
+
+    for base_address, region_size in regions:
+        try:
+            yield from _scan_region_signature(handle, base_address, region_size, signature, buffer)
+        except Exception as e:
+            print(f"读取内存区域 {hex(base_address)} 时出错: {e}")
+
+
+def scan_memory_signature(handle, signature, window_size=SCAN_WINDOW_SIZE):
+    """按 AOB 特征码搜索内存, 返回所有匹配地址"""
+    return list(iter_scan_memory_signature(handle, signature, window_size))
+
+
+def _split_regions(regions, overlap, parts):
+    """按字节数把区域切成大致相等的若干段, 拆开的大区域之间保留 overlap 字节重叠"""
+    total = sum(region_size for _, region_size in regions)
+    target = max(total // max(parts, 1), PAGE_SIZE)
+    chunks = []
+    current = []
+    current_bytes = 0
+
+    for base_address, region_size in regions:
+        offset = 0
+        while offset < region_size:
+            piece = min(target - current_bytes, region_size - offset)
+            current.append((base_address + offset, min(piece + overlap, region_size - offset)))
+            current_bytes += piece
+            offset += piece
+            if current_bytes >= target:
+                chunks.append(current)
+                current = []
+                current_bytes = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _scan_regions_task(handle, scan_func, pattern_arg, window_size, regions):
+    return list(scan_func(handle, pattern_arg, window_size, regions))
+
+
+def _search_shared_window(name, size, limit, patterns):
+    """在工作进程中搜索父进程读入共享内存的窗口, 返回 [(窗口内偏移, 模式序号), ...]"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        with block.buf[:size] as view:
+            data = bytes(view)
+    finally:
+        block.close()
+    return list(_find_patterns(data, patterns, size, limit))
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(use_processes, workers):
+    """扫描用的线程池/进程池只创建一次, 多次校准之间复用, 不必每次重新启动工作线程或进程"""
+    key = (use_processes, workers)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            executor = _executors[key] = executor_cls(max_workers=workers)
+        return executor
+
+
+def _discard_executor(use_processes, workers, executor):
+    # 工作进程异常退出后进程池不可再用, 丢弃它, 下次调用重新创建
+    with _executors_lock:
+        if _executors.get((use_processes, workers)) is executor:
+            del _executors[(use_processes, workers)]
+
+
+def shutdown_scan_executors():
+    """关闭所有扫描线程池/进程池, 程序退出时调用"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False)
+
+
+def _scan_in_threads(handle, scan_func, pattern_arg, overlap, workers, window_size):
+    regions = list(iter_memory_regions(handle))
+    chunks = _split_regions(regions, overlap, workers * 4)
+    executor = _get_executor(False, workers)
+    futures = [executor.submit(_scan_regions_task, handle, scan_func, pattern_arg, window_size, chunk)
+               for chunk in chunks]
+    # 相邻分段的重叠部分可能重复命中, 去重后按地址排序
+    return sorted(set(itertools.chain.from_iterable(future.result() for future in futures)))
+
+
+def _scan_in_processes(handle, patterns, workers, window_size):
+    """父进程按窗口读入共享内存, 工作进程只做搜索; bytes.find 搜索期间持有 GIL, 只有多进程才能用上多核
+
+    每个工作进程约有两个窗口轮换: 一个在搜索时父进程已经在读下一个, 读取失败的区域停止读取, 与顺序扫描一致。
+    """
+    overlap = len(patterns[0]) - 1
+    window_size = max(window_size, overlap + 1)
+    executor = _get_executor(True, workers)
+    slots = [shared_memory.SharedMemory(create=True, size=window_size) for _ in range(workers * 2)]
+    free = list(slots)
+    pending = deque()
+    found = []
+
+    def collect():
+        future, slot, address = pending.popleft()
+        found.extend((address + pos, patterns[index]) for pos, index in future.result())
+        free.append(slot)
+
+    try:
+        for base_address, region_size in iter_memory_regions(handle):
+            for offset, size, limit in _window_layout(region_size, window_size, overlap):
+                if not free:
+                    collect()
+                slot = free.pop()
+                if read_process_memory_into(handle, base_address + offset, slot.buf, size) != size:
+                    free.append(slot)
+                    break
+                future = executor.submit(_search_shared_window, slot.name, size, limit, patterns)
+                pending.append((future, slot, base_address + offset))
+        while pending:
+            collect()
+    except BrokenProcessPool:
+        _discard_executor(True, workers, executor)
+        raise
+    finally:
+        for slot in slots:
+            slot.close()
+            slot.unlink()
+    found.sort()
+    return found
+
+
+def _parallel_scan(handle, scan_func, patterns, workers, window_size, processes):
+    """返回按地址排序的 [(地址, 命中的模式), ...]"""
+    workers = workers or SCAN_WORKERS
+    if workers <= 1:
+        return list(scan_func(handle, patterns, window_size))
+    if processes:
+        return _scan_in_processes(handle, patterns, workers, window_size)
+    overlap = len(patterns[0]) - 1
+    return _scan_in_threads(handle, scan_func, patterns, overlap, workers, window_size)
+
+
+def _iter_scan_tagged(handle, patterns, window_size=SCAN_WINDOW_SIZE, regions=None):
+    for address in iter_scan_memory_bytes(handle, patterns[0], window_size, regions):
+        yield address, patterns[0]
+
+
+def parallel_scan_memory_bytes(handle, pattern_bytes, workers=None, window_size=SCAN_WINDOW_SIZE, processes=True):
+    """多进程并行搜索字节序列, 结果与 scan_memory_bytes 相同
+
+    默认由父进程读取内存, 在工作进程中搜索共享内存里的窗口。读取和进程间传递仍是串行部分,
+    单核上比顺序扫描慢约一倍, 所以 workers 为 1 时直接顺序扫描; 多核加速以
+    benchmarks/bench_parallel_scan.py 的实测为准。Windows 上工作进程以 spawn 启动,
+    第一次扫描时会在每个工作进程里重新导入主模块一次, 之后进程池复用。
+    processes=False 时改用线程池, 读取可以重叠, 但搜索受 GIL 限制只能串行。
+    """
+    pattern_bytes = bytes(pattern_bytes)
+    if not pattern_bytes:
+        return []
+    return [address for address, _ in _parallel_scan(handle, _iter_scan_tagged, [pattern_bytes], workers,
+                                                     window_size, processes)]
+
+
+def parallel_scan_memory_patterns(handle, patterns, workers=None, window_size=SCAN_WINDOW_SIZE, processes=True):
+    """多核并行搜索多个字节序列, 结果与 scan_memory_patterns 相同"""
+    patterns = [bytes(p) for p in patterns if p]
+    found = {pattern: [] for pattern in patterns}
+    if not found:
+        return found
+    for address, pattern in _parallel_scan(handle, iter_scan_memory_patterns, compile_patterns(patterns),
+                                           workers, window_size, processes):
+        found[pattern].append(address)
+    return found
+
+
+class CandidateSet(object):
+    """候选地址集合, 只读取候选地址处的内存来逐轮缩小范围 (类似 "再次扫描")"""
+
+    def __init__(self, handle, addresses):
+        self.handle = handle
+        self.addresses = sorted(set(addresses))
+        self.snapshot_size = 0
+        self._snapshot = {}
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __iter__(self):
+        return iter(self.addresses)
+
+    def __contains__(self, address):
+        return address in self.addresses
+
+    def read_values(self, size):
+        """Read ``size`` bytes at every candidate, one request per page of candidates, all in one batch."""
+        values = {}
+        pages = {}
+        for address in self.addresses:
+            pages.setdefault(address // PAGE_SIZE, []).append(address)
+
+        page_groups = list(pages.values())
+        requests = [(group[0], group[-1] + size - group[0]) for group in page_groups]
+        failed = []
+        for group, (start, span), data in zip(page_groups, requests,
+                                               read_process_memory_batch(self.handle, requests)):
+            if data is None or len(data) < span:
+                failed.extend(group)
+                continue
+            for address in group:
+                offset = address - start
+                values[address] = data[offset:offset + size]
+
+        # 整页读取失败(例如末尾跨越不可读页), 退回逐地址读取
+        if failed:
+            fallback = read_process_memory_batch(self.handle, [(address, size) for address in failed])
+            for address, value in zip(failed, fallback):
+                values[address] = value if value is not None and len(value) >= size else None
+        return values
+
+    def refine(self, pattern_bytes):
+        """只保留当前内容等于 ``pattern_bytes`` 的地址, 返回剩余数量"""
+        values = self.read_values(len(pattern_bytes))
+        self.addresses = [address for address in self.addresses if values[address] == pattern_bytes]
+        return len(self.addresses)
+
+    def take_snapshot(self, size):
+        """记录每个候选地址处 ``size`` 字节的当前内容, 供变化/未变化筛选使用"""
+        self.snapshot_size = size
+        self._snapshot = self.read_values(size)
+
+    def _refine_by_snapshot(self, keep_changed):
+        if not self.snapshot_size:
+            raise ValueError("take_snapshot() must be called before filtering on changes")
+        values = self.read_values(self.snapshot_size)
+        kept = []
+        for address in self.addresses:
+            value = values[address]
+            if value is None:
+                continue
+            if (value != self._snapshot.get(address)) == keep_changed:
+                kept.append(address)
+        self.addresses = kept
+        self._snapshot = {address: values[address] for address in kept}
+        return len(self.addresses)
+
+    def refine_changed(self):
+        """只保留自上次快照以来内容发生变化的地址, 并更新快照"""
+        return self._refine_by_snapshot(True)
+
+    def refine_unchanged(self):
+        """只保留自上次快照以来内容未变化的地址, 并更新快照"""
+        return self._refine_by_snapshot(False)
+
+
+def _pointer_mask(context, context_start, regions):
+    """把看起来像指针(指向已提交内存)的 8 字节对齐数据标记为通配, 它们每次启动都会变化"""
+    starts = [base_address for base_address, _, _, _ in regions]
+    mask = bytearray(b"\xff" * len(context))
+    for offset in range(-context_start % 8, len(context) - 7, 8):
+        value = int.from_bytes(context[offset:offset + 8], 'little')
+        index = bisect.bisect_right(starts, value) - 1
+        if index >= 0 and value < starts[index] + regions[index][2]:
+            mask[offset:offset + 8] = b"\x00" * 8
+    return bytes(mask)
+
+
+def _masked_equal(data, context, mask):
+    if data is None or len(data) < len(context):
+        return False
+    return all((a ^ b) & m == 0 for a, b, m in zip(data, context, mask))
+
+
+def build_address_signature(handle, address, encoding_format, context_size=SIGNATURE_CONTEXT_SIZE):
+    """为已定位的地址生成可重定位的特征: 分配基址偏移 + 地址前方内存的字节特征"""
+    regions = list(iter_memory_region_info(handle))
+    for base_address, allocation_base, region_size, _ in regions:
+        if base_address <= address < base_address + region_size:
             break
+    else:
+        return None
+
+    context_start = max(address - context_size, base_address)
+    context = read_process_memory(handle, context_start, address - context_start)
+    if not context:
+        return None
+    mask = _pointer_mask(context, context_start, regions)
+    # 前方内存几乎全是 0 或指针时特征不可靠, 不保存
+    if sum(1 for b, m in zip(context, mask) if b and m) < SIGNATURE_MIN_BYTES:
+        return None
+    return {
+        'version': SIGNATURE_VERSION,
+        'encoding': encoding_format,
+        'allocation_offset': address - allocation_base,
+        'region_size': region_size,
+        'context': context.hex(),
+        'mask': mask.hex(),
+    }
+
+
+def resolve_address_signature(handle, signature):
+    """按特征在新进程中找回地址, 只有唯一候选通过校验时才返回地址, 否则返回 None
+
+    堆区域的大小每次启动都可能不同, 只在多个候选都通过字节特征校验时用它挑选。
+    """
+    if not signature or signature.get('version') != SIGNATURE_VERSION:
+        return None
+    context = bytes.fromhex(signature['context'])
+    mask = bytes.fromhex(signature['mask'])
+    offset = signature['allocation_offset']
+
+    candidates = []
+    for base_address, allocation_base, region_size, protect in iter_memory_region_info(handle):
+        address = allocation_base + offset
+        if not protect & PAGE_WRITABLE or not base_address <= address < base_address + region_size:
+            continue
+        data = read_process_memory(handle, address - len(context), len(context))
+        if _masked_equal(data, context, mask):
+            candidates.append((address, region_size))
+    if len(candidates) > 1:
+        candidates = [candidate for candidate in candidates if candidate[1] == signature.get('region_size')]
+    if len(candidates) == 1:
+        return candidates[0][0]
+    return None
+
 
-        if mbi.Protect & PAGE_READWRITE and mbi.State == 0x1000:  # MEM_COMMIT
-            try:
-                # 读取内存区域
-                buffer = (ctypes.c_byte * mbi.RegionSize)()
-                bytes_read = ctypes.c_size_t()
-
-                if kernel32.ReadProcessMemory(handle, mbi.BaseAddress, buffer, mbi.RegionSize, ctypes.byref(bytes_read)):
-                    # 转换为bytes进行搜索
-                    region_data = bytes(buffer)
-
-                    # 搜索所有匹配位置
-                    pos = 0
-                    while pos < len(region_data):
-                        match_pos = region_data.find(pattern_bytes, pos)
-                        if match_pos == -1:
-                            break
-                        found_address = mbi.BaseAddress + match_pos
-                        found_addresses.append(found_address)
-                        pos = match_pos + 1
-            except Exception as e:
-                print(f"读取内存区域 {hex(address)} 时出错: {e}")
-
-        address += mbi.RegionSize
-        if address == 0:  # 防止无限循环
+def save_address_signature(path, signature):
+    try:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(signature, fh, indent=2)
+    except OSError:
+        pass
+
+
+def load_address_signature(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _looks_like_chat_slot(data, encoding_format):
+    """槽位内容是空的, 或是以结束符结尾、能完整解码的可打印文本"""
+    if data is None:
+        return False
+    char_width = _get_char_width(encoding_format)
+    end = _find_terminator(data, b"\x00" * char_width, char_width)
+    if end >= len(data) - (len(data) % char_width):
+        return False
+    try:
+        return data[:end].decode(encoding_format).isprintable()
+    except (LookupError, UnicodeDecodeError):
+        return False
+
+
+class ChatHistoryWatcher(object):
+    """聊天记录数组监视器: 每次一次性读取所有消息槽位, 按写入顺序返回新出现的消息"""
+
+    def __init__(self, handle, base_address, slot_stride, slot_count, encoding_format='utf-8',
+                 max_length=None, last_slot=None):
+        self.handle = handle
+        self.base_address = base_address
+        self.slot_stride = slot_stride
+        self.slot_count = slot_count
+        self.encoding_format = encoding_format
+        self.max_length = min(max_length or slot_stride, slot_stride)
+        self.last_slot = last_slot
+        self._previous = None
+
+    def read_slots(self):
+        """Read every slot with one bulk read; slots past an unreadable page come back as ``None``."""
+        data = _read_readable_prefix(self.handle, self.base_address, self.slot_stride * self.slot_count)
+        slots = []
+        for index in range(self.slot_count):
+            start = index * self.slot_stride
+            slot = data[start:start + self.max_length]
+            slots.append(slot if len(slot) == self.max_length else None)
+        return slots
+
+    def poll(self):
+        """返回自上次调用以来新写入的 [(槽位索引, 文本), ...]; 第一次调用只记录基线
+
+        槽位按环形顺序写入, 所以上次写入位置到最后一个变化槽位之间的槽位都是新消息,
+        即使内容与原来相同(队友重复了该槽位里的旧消息)也会返回; 如果这样的重复正好是最后一条,
+        要等下一条消息写入后才能确认, 届时按顺序一并返回。
+        """
+        slots = self.read_slots()
+        previous, self._previous = self._previous, slots
+        if previous is None:
+            return []
+
+        changed = [index for index, slot in enumerate(slots) if slot is not None and slot != previous[index]]
+        if not changed:
+            return []
+        # 环形缓冲区: 从上次写入位置的下一个槽位开始排序, 回绕后的槽位排在后面
+        start = 0 if self.last_slot is None else (self.last_slot + 1) % self.slot_count
+        changed.sort(key=lambda index: (index - start) % self.slot_count)
+        if self.last_slot is not None:
+            written = (changed[-1] - start) % self.slot_count + 1
+            changed = [index for index in ((start + offset) % self.slot_count for offset in range(written))
+                       if slots[index] is not None]
+        self.last_slot = changed[-1]
+
+        messages = []
+        for index in changed:
+            text = decode_string(slots[index], self.encoding_format)
+            if text:
+                messages.append((index, text))
+        return messages
+
+
+def _find_slot_stride(window, encoded, min_stride, max_stride):
+    """window 从第一条探测消息开始; 返回后续探测消息依次出现的固定间距, 找不到时返回 None"""
+    end = max_stride + len(encoded[1])
+    stride = window.find(encoded[1], min_stride + 1, end)
+    while stride != -1:
+        if all(window.startswith(encoded[index], index * stride) for index in range(2, len(encoded))):
+            return stride
+        stride = window.find(encoded[1], stride + 1, end)
+    return None
+
+
+def discover_chat_history(handle, probe_messages, encoding_format='utf-8', first_hits=None,
+                          max_stride=CHAT_SLOT_MAX_STRIDE, max_slots=CHAT_HISTORY_MAX_SLOTS):
+    """根据按顺序发送的探测消息寻找聊天记录数组, 找到时返回 ChatHistoryWatcher, 否则返回 None
+
+    探测消息必须出现在间距固定的连续槽位中; 数组两端再向外扩展到不像消息槽位的位置为止。
+    first_hits 是校准扫描中第一条探测消息的命中地址, 传入后只读取这些地址之后的一小段内存,
+    不再重新扫描整个进程。
+    """
+    if len(probe_messages) < 2:
+        return None
+    encoded = [message.encode(encoding_format) for message in probe_messages]
+    if first_hits is None:
+        first_hits = parallel_scan_memory_bytes(handle, encoded[0])
+    min_stride = max(len(pattern) for pattern in encoded)
+    span = (len(encoded) - 1) * max_stride + len(encoded[-1])
+
+    layout = None
+    for first_address in sorted(set(first_hits)):
+        window = _read_readable_prefix(handle, first_address, span)
+        if not window.startswith(encoded[0]):
+            continue
+        stride = _find_slot_stride(window, encoded, min_stride, max_stride)
+        if stride is not None:
+            layout = first_address, stride
             break
+    if layout is None:
+        return None
+
+    first_address, stride = layout
+    max_length = min(stride, CHAT_SLOT_MAX_LENGTH)
+    span = max_slots - len(encoded)
+    requests = [(first_address + index * stride, max_length) for index in range(-span, span + len(encoded))]
+    slots = dict(zip(range(-span, span + len(encoded)), read_process_memory_batch(handle, requests)))
+
+    lowest = 0
+    while lowest - 1 >= -span and _looks_like_chat_slot(slots[lowest - 1], encoding_format):
+        lowest -= 1
+    highest = len(encoded) - 1
+    while highest + 1 - lowest < max_slots and highest + 1 < span + len(encoded) \
+            and _looks_like_chat_slot(slots[highest + 1], encoding_format):
+        highest += 1
+
+    return ChatHistoryWatcher(handle, first_address + lowest * stride, stride, highest - lowest + 1,
+                              encoding_format, max_length, last_slot=len(encoded) - 1 - lowest)
+
+
+class TextField(object):
+    """字符串字段: 在结构体内时是定长缓冲区, 作为指针目标时是以 NUL 结尾的字符串"""
+
+    def __init__(self, length, encoding_format='utf-8'):
+        self.length = length
+        self.encoding_format = encoding_format
+
+
+class PointerField(object):
+    """指针字段, target 可以是 StructLayout、TextField 或 None(只保留地址)"""
+
+    def __init__(self, target=None, pointer_size=8):
+        if pointer_size not in (4, 8):
+            raise ValueError("pointer_size must be 4 or 8")
+        self.target = target
+        self.pointer_size = pointer_size
+
+
+class LazyPointer(object):
+    """指针字段的值, 第一次调用 get() 时才读取目标内存"""
+
+    _UNSET = object()
+
+    def __init__(self, handle, address, target):
+        self.handle = handle
+        self.address = address
+        self.target = target
+        self._value = self._UNSET
+
+    def __int__(self):
+        return self.address
+
+    def __bool__(self):
+        return bool(self.address)
+
+    def __repr__(self):
+        return f"LazyPointer({self.address:#x})"
+
+    def get(self):
+        if self._value is self._UNSET:
+            self._value = self._read()
+        return self._value
+
+    def _read(self):
+        if not self.address or self.target is None:
+            return None
+        if isinstance(self.target, StructLayout):
+            return self.target.read(self.handle, self.address)
+        return read_string(self.handle, self.address, self.target.length, self.target.encoding_format)
+
+
+class StructLayout(object):
+    """声明式结构体布局, 一次读取整条记录(或记录数组)后用 struct 解码
+
+    fields 为 (名称, 类型[, 偏移]) 列表; 类型可以是单个 struct 格式('I', 'Q', 'f', '32s'),
+    NumPy dtype 风格的字符串('<u4', 'f8', 'S32'), TextField 或 PointerField。
+    未指定偏移的字段紧接上一个字段, 不做对齐填充。
+    """
+
+    _DTYPE_CODES = {
+        'b1': '?', 'i1': 'b', 'u1': 'B', 'i2': 'h', 'u2': 'H', 'i4': 'i', 'u4': 'I',
+        'i8': 'q', 'u8': 'Q', 'f4': 'f', 'f8': 'd',
+    }
+
+    def __init__(self, fields, size=None):
+        self.fields = []
+        format_parts = ['<']
+        offset = 0
+        for field in fields:
+            name, spec = field[0], field[1]
+            field_offset = field[2] if len(field) > 2 else offset
+            if field_offset < offset:
+                raise ValueError(f"field {name!r} overlaps the previous field")
+            if field_offset > offset:
+                format_parts.append(f'{field_offset - offset}x')
+            code = self._field_code(spec)
+            format_parts.append(code)
+            offset = field_offset + struct.calcsize('<' + code)
+            self.fields.append((name, spec, field_offset))
+
+        if size is not None:
+            if size < offset:
+                raise ValueError(f"size {size} is smaller than the fields ({offset} bytes)")
+            if size > offset:
+                format_parts.append(f'{size - offset}x')
+        self.struct = struct.Struct(''.join(format_parts))
+        self.size = self.struct.size
+
+    @classmethod
+    def _field_code(cls, spec):
+        if isinstance(spec, TextField):
+            return f'{spec.length}s'
+        if isinstance(spec, PointerField):
+            return 'Q' if spec.pointer_size == 8 else 'I'
+        code = spec.lstrip('<=|')
+        if code.startswith('>') or code.startswith('!'):
+            raise ValueError(f"big-endian field {spec!r} is not supported")
+        if code in cls._DTYPE_CODES:
+            return cls._DTYPE_CODES[code]
+        if code[:1] == 'S' and code[1:].isdigit():
+            return f'{code[1:]}s'
+        try:
+            if len(struct.unpack('<' + code, bytes(struct.calcsize('<' + code)))) != 1:
+                raise ValueError(f"field type {spec!r} must describe exactly one value")
+        except struct.error:
+            raise ValueError(f"unknown field type {spec!r}") from None
+        return code
+
+    def unpack(self, data, handle=None, offset=0):
+        """Decode one record from ``data``; pointer fields become LazyPointer bound to ``handle``."""
+        values = self.struct.unpack_from(data, offset)
+        return self._to_record(values, handle)
+
+    def _to_record(self, values, handle):
+        record = {}
+        for (name, spec, _), value in zip(self.fields, values):
+            if isinstance(spec, TextField):
+                value = decode_string(value, spec.encoding_format)
+            elif isinstance(spec, PointerField):
+                value = LazyPointer(handle, value, spec.target)
+            record[name] = value
+        return record
+
+    def read(self, handle, address):
+        """用一次读取获取并解码一条记录, 读取失败返回 None"""
+        data = read_process_memory(handle, address, self.size)
+        if data is None or len(data) < self.size:
+            return None
+        return self.unpack(data, handle)
+
+    def read_array(self, handle, address, count, stride=None):
+        """用一次读取获取连续的记录数组; 末尾不可读时只返回完整读到的记录"""
+        stride = stride or self.size
+        if stride < self.size:
+            raise ValueError("stride must not be smaller than the record size")
+        data = _read_readable_prefix(handle, address, stride * (count - 1) + self.size if count else 0)
+        complete = (len(data) - self.size) // stride + 1 if len(data) >= self.size else 0
+        if stride == self.size:
+            return [self._to_record(values, handle)
+                    for values in self.struct.iter_unpack(data[:complete * self.size])]
+        return [self.unpack(data, handle, index * stride) for index in range(complete)]
+
+
+class ProcessHandle(object):
+    """引用计数的进程句柄: 用 with 语句借用, 最后一个引用释放时才关闭句柄"""
+
+    def __init__(self, pid, handle):
+        self.pid = pid
+        self.handle = handle
+        self.closed = False
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def retain(self):
+        with self._lock:
+            if self.closed:
+                raise ProcessLookupError(f"handle for process {self.pid} is already closed")
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0 or self.closed:
+                return
+            self.closed = True
+        CloseHandle(self.handle)
+
+    def __enter__(self):
+        return self.handle
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class ProcessAttachManager(object):
+    """只在需要时查找一次目标进程并持有句柄, 廉价检测进程退出并自动重新连接
+
+    ``generation`` 每次连接到新进程时加一, 调用方据此判断之前定位的地址是否失效。
+    """
+
+    def __init__(self, process_name, pid_finder=None, reattach_interval=REATTACH_INTERVAL):
+        self.process_name = process_name
+        self.pid_finder = pid_finder or self._find_pid
+        self.reattach_interval = reattach_interval
+        self.generation = 0
+        self._current = None
+        self._last_attempt = None
+
+    def _find_pid(self):
+        try:
+            return get_process_id(self.process_name)
+        except Exception:
+            return None
+
+    @property
+    def attached(self):
+        return self._current is not None
+
+    @property
+    def pid(self):
+        return self._current.pid if self._current is not None else None
+
+    @property
+    def handle(self):
+        return self._current.handle if self._current is not None else None
+
+    def poll(self):
+        """检查进程是否仍在运行, 退出则释放句柄; 未连接时按间隔重试连接。返回当前是否已连接"""
+        current = self._current
+        if current is not None:
+            if is_process_alive(current.handle):
+                return True
+            self.detach()
+
+        now = time.monotonic()
+        if self._last_attempt is not None and now - self._last_attempt < self.reattach_interval:
+            return False
+        self._last_attempt = now
+        return self.attach()
+
+    def attach(self):
+        pid = self.pid_finder()
+        if pid is None:
+            return False
+        try:
+            handle = get_process_handle(pid)
+        except Exception:
+            return False
+        self.detach()
+        self._current = ProcessHandle(pid, handle)
+        self.generation += 1
+        return True
 
-    return found_addresses
+    def detach(self):
+        current, self._current = self._current, None
+        if current is not None:
+            current.release()
 
+    def acquire(self):
+        """借用当前进程句柄 (``with manager.acquire() as handle``), 未连接且连接失败时抛出 ProcessLookupError"""
+        if self._current is None and not self.attach():
+            raise ProcessLookupError(f"{self.process_name} is not running")
+        return self._current.retain()
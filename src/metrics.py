@@ -0,0 +1,173 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图桶上界(秒): 1us 起按 2 倍增长到约 67s, 桶数固定, 记录时只做一次二分查找
+BUCKET_BOUNDS = [1e-6 * (2 ** index) for index in range(27)]
+EXPORT_INTERVAL = 10
+
+
+class Histogram(object):
+    """固定对数桶的耗时直方图; 为了热路径开销不加锁, 多线程并发记录时极少数计数可能丢失"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """返回分位数所在桶的上界(不超过最大值), 误差在 2 倍以内"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class Metrics(object):
+    """各阶段耗时直方图和计数器; enabled 为 False 时 record/incr 直接返回
+
+    register_collector 可以挂上已有的统计字典(如缓存命中数), 只在 snapshot 时读取, 不增加热路径开销。
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def record(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def record_since(self, stage, start):
+        """记录从 start(time.perf_counter 的返回值)到现在的耗时, 返回当前时间便于串联下一阶段"""
+        now = time.perf_counter()
+        if self.enabled:
+            self.histogram(stage).record(now - start)
+        return now
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_since(stage, start)
+
+    def incr(self, name, value=1):
+        # 计数器会被多个翻译线程同时累加, 与直方图不同, 这里不能丢失计数
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def counter(self, name):
+        return self.counters.get(name, 0)
+
+    def register_collector(self, name, collect):
+        self._collectors[name] = collect
+
+    def unregister_collector(self, name):
+        self._collectors.pop(name, None)
+
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+        collected = {}
+        for name, collect in list(self._collectors.items()):
+            try:
+                collected[name] = dict(collect())
+            except Exception as exc:
+                collected[name] = {'error': str(exc)}
+        return {
+            'time': time.time(),
+            'stages': {stage: histogram.summary() for stage, histogram in histograms.items()},
+            'counters': counters,
+            'collectors': collected,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+
+class MetricsExporter(object):
+    """定期把 snapshot 以 JSON Lines 追加写入文件"""
+
+    def __init__(self, metrics, path, interval=EXPORT_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export_once(self):
+        line = json.dumps(self.metrics.snapshot(), ensure_ascii=False, sort_keys=True)
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(line + '\n')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export_once()
+            except OSError:
+                pass
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+        try:
+            self.export_once()
+        except OSError:
+            pass
+
+
+METRICS = Metrics()
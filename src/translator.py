@@ -1,3 +1,4 @@
+import concurrent.futures
 import copy
 import hashlib
 import http.client
@@ -6,19 +7,149 @@ import logging
 import os
 import random
 import socket
+import sqlite3
+import threading
 import time
 import urllib
+import urllib.parse
+from collections import OrderedDict, deque
+
+from lang_detect import detect_language, needs_translation
+from metrics import METRICS
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, 'translator_config.json')
+CACHE_PATH = os.path.join(BASE_DIR, 'translation_cache.db')
+PHRASEBOOK_PATH = os.path.join(BASE_DIR, 'phrasebook.json')
+METRICS_PATH = os.path.join(BASE_DIR, 'translation_metrics.jsonl')
+
+# providers.<接口> 中可选的接入点覆盖项, 用于连接本地模拟服务器 (tools/provider_stand_in.py)
+ENDPOINT_OVERRIDES = ('host', 'scheme')
 
 LOGGER = logging.getLogger(__name__)
 REQUEST_TIMEOUT = 5
+POOL_IDLE_TIMEOUT = 30
+POOL_MAX_IDLE = 4
+TRANSLATION_WORKERS = 4
+TRANSLATION_QUEUE_SIZE = 16
+TRANSLATION_MAX_AGE = 10
+BATCH_WINDOW = 0.005
+HEDGE_SAMPLE_SIZE = 100
+HEDGE_MIN_SAMPLES = 10
+HEALTH_EWMA_ALPHA = 0.2
+# 没有测量数据的接口视为最快, 保证每个接口至少被试用一次
+HEALTH_UNKNOWN_LATENCY = 0.0
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 30
+PROBE_INTERVAL = 10
+MIN_REQUEST_TIMEOUT = 1.0
+TIMEOUT_LATENCY_FACTOR = 4
+TIMEOUT_MESSAGE = '翻译请求超时，请检查网络连接。'
+
+RATE_LIMITED_MESSAGE = '翻译请求过于频繁，请稍后再试。'
+# 消息已是目标语言或没有可翻译的文字时的结果, 界面据此不再重复显示原文
+NO_TRANSLATION = ''
+
+# 各接口出错时返回的提示文本, 不能当作译文缓存
+ERROR_MESSAGES = frozenset(['翻译失败!', TIMEOUT_MESSAGE, RATE_LIMITED_MESSAGE, '网络请求失败，请检查网络设置。'])
+
+DEFAULT_CACHE_SETTINGS = {
+    'enabled': True,
+    'max_entries': 2000,
+    'disk_max_entries': 50000,
+    'ttl': 7 * 24 * 3600,
+}
+
+# 对冲请求: 主接口超过 p95 延迟仍未返回时, 同时向备用接口发送同一请求
+DEFAULT_HEDGING_SETTINGS = {
+    'enabled': False,
+    'providers': [],
+    'budget_per_minute': 30,
+    'min_delay': 0.2,
+    'default_delay': 1.0,
+}
+
+# 按各接口的健康状况自动选择最快的可用接口, 开启后忽略 hedging
+DEFAULT_ROUTING_SETTINGS = {
+    'enabled': False,
+}
+
+# 每组凭据每秒允许的请求数, 超出的请求排队等待; 预计等待超过 max_wait 秒时直接返回 RATE_LIMITED_MESSAGE。
+# 默认关闭, qps 是各接口免费版的限额(百度标准版 1 次/秒), 付费账号开启前应按自己的额度调高
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    'enabled': False,
+    'burst': 1,
+    'max_wait': 1.0,
+    'qps': {
+        'baidu': 1,
+        'deepl': 5,
+        'youdao': 5,
+        'papago': 5,
+    },
+}
+
+DEFAULT_PHRASEBOOK_SETTINGS = {
+    'enabled': True,
+}
+
+# 聊天到浮窗各阶段的耗时统计, 每 export_interval 秒追加一行到 translation_metrics.jsonl
+DEFAULT_METRICS_SETTINGS = {
+    'enabled': True,
+    'export_interval': 10,
+}
+
+# 游戏内常用的韩文短语和缩写 -> 中文, 可在 phrasebook.json 中补充或覆盖
+DEFAULT_PHRASEBOOK = {
+    'ㅋ': '哈',
+    'ㅎ': '呵',
+    'ㅠ': '呜',
+    'ㅜ': '呜',
+    'gg': 'GG',
+    'ㄱㄱ': '走走',
+    'ㅈㅈ': 'GG',
+    'ㅈㅅ': '抱歉',
+    'ㄳ': '谢谢',
+    'ㄱㅅ': '谢谢',
+    'ㅇㅇ': '嗯嗯',
+    'ㄴㄴ': '不不',
+    'ㅎㅇ': '嗨',
+    'ㅂㅂ': '拜拜',
+    '미아': '敌人消失',
+    '백': '撤退',
+    '후퇴': '撤退',
+    '한타': '团战',
+    '용병': '雇佣兵',
+    '오브젝트': '地图机制',
+    '코어': '核心',
+    '포탑': '炮塔',
+    '요새': '要塞',
+    '궁': '大招',
+    '탱': '坦克',
+    '힐': '治疗',
+    '힐러': '治疗',
+    '딜러': '输出',
+    '갱': '抓人',
+    '가자': '走吧',
+    '모여': '集合',
+    '조심': '小心',
+    '도와줘': '帮我',
+    '나이스': '漂亮',
+    '수고': '辛苦了',
+    '수고하셨습니다': '辛苦了',
+    '안녕하세요': '你好',
+    '잘했어': '干得好',
+    '리밍': '李敏',
+    '제이나': '吉安娜',
+    '겐지': '源氏',
+    '일리단': '伊利丹',
+    '아바투르': '阿巴瑟',
+}
 
 
 TRANSLATOR_SPECS = {
     'baidu': {
+        'translator': 'BaiduTranslator',
         'label': '百度翻译',
         'fields': [
             {'key': 'appid', 'label': 'App ID', 'required': True},
@@ -26,6 +157,7 @@ TRANSLATOR_SPECS = {
         ],
     },
     'deepl': {
+        'translator': 'DeepLTranslator',
         'label': 'DeepL',
         'fields': [
             {'key': 'auth_key', 'label': 'Auth Key', 'required': True, 'secret': True},
@@ -33,6 +165,7 @@ TRANSLATOR_SPECS = {
         ],
     },
     'youdao': {
+        'translator': 'YoudaoTranslator',
         'label': '有道翻译',
         'fields': [
             {'key': 'app_key', 'label': 'App Key', 'required': True},
@@ -40,6 +173,7 @@ TRANSLATOR_SPECS = {
         ],
     },
     'papago': {
+        'translator': 'PapagoTranslator',
         'label': 'Papago',
         'fields': [
             {'key': 'client_id', 'label': 'Client ID', 'required': True},
@@ -59,26 +193,35 @@ def _build_default_config():
     return {
         'provider': 'baidu',
         'providers': providers,
+        'cache': dict(DEFAULT_CACHE_SETTINGS),
+        'hedging': copy.deepcopy(DEFAULT_HEDGING_SETTINGS),
+        'routing': dict(DEFAULT_ROUTING_SETTINGS),
+        'phrasebook': dict(DEFAULT_PHRASEBOOK_SETTINGS),
+        'rate_limits': copy.deepcopy(DEFAULT_RATE_LIMIT_SETTINGS),
+        'metrics': dict(DEFAULT_METRICS_SETTINGS),
     }
 
 
+def _merge_defaults(settings, defaults):
+    """逐层补齐缺少的默认值; 用户只写了 rate_limits.qps.deepl 时, 其它接口的 qps 仍保留默认"""
+    for key, default_value in defaults.items():
+        if key not in settings:
+            settings[key] = copy.deepcopy(default_value)
+        elif isinstance(settings[key], dict) and isinstance(default_value, dict):
+            _merge_defaults(settings[key], default_value)
+    return settings
+
+
 def _ensure_config_defaults(config):
-    defaults = _build_default_config()
-    if 'provider' not in config:
-        config['provider'] = defaults['provider']
-    providers = config.setdefault('providers', {})
-    for provider_key, fields in defaults['providers'].items():
-        provider_fields = providers.setdefault(provider_key, {})
-        for field_key, default_value in fields.items():
-            provider_fields.setdefault(field_key, default_value)
-    return config
-
-
-def load_config():
+    return _merge_defaults(config, _build_default_config())
+
+
+def load_config(path=None):
+    path = path or CONFIG_PATH
     config = _build_default_config()
-    if os.path.exists(CONFIG_PATH):
+    if os.path.exists(path):
         try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as fh:
+            with open(path, 'r', encoding='utf-8') as fh:
                 file_config = json.load(fh)
             config.update({k: v for k, v in file_config.items() if k in config})
             config['providers'].update(file_config.get('providers', {}))
@@ -99,23 +242,205 @@ def load_config():
     return _ensure_config_defaults(copy.deepcopy(config))
 
 
-def save_config(config):
+def save_config(config, path=None):
     config = _ensure_config_defaults(copy.deepcopy(config))
     try:
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as fh:
+        with open(path or CONFIG_PATH, 'w', encoding='utf-8') as fh:
             json.dump(config, fh, ensure_ascii=False, indent=2)
     except OSError:
         pass
+    CONFIG_SERVICE.invalidate()
+
+
+class ConfigService(object):
+    """缓存解析后的配置, 只有文件修改时间或大小变化时才重新读取; 返回的配置不要原地修改"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.version = 0
+        self._config = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _current_stamp(self):
+        try:
+            stat = os.stat(self.path or CONFIG_PATH)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        stamp = self._current_stamp()
+        with self._lock:
+            if self._config is None or stamp != self._stamp:
+                self._config = load_config(self.path)
+                self._stamp = stamp
+                self.version += 1
+            return self._config
+
+    def invalidate(self):
+        with self._lock:
+            self._config = None
+
+
+CONFIG_SERVICE = ConfigService()
+
+
+class ConnectionPool(object):
+    """按 (协议, 主机) 复用 keep-alive 连接, 避免每条消息都重新做 DNS/TCP/TLS 握手"""
+
+    # 复用的连接在发送前可能已被服务端关闭, 这些异常说明请求没有被处理, 可以换新连接重试
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                    ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+    def __init__(self, idle_timeout=POOL_IDLE_TIMEOUT, max_idle=POOL_MAX_IDLE, ssl_context=None):
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self.ssl_context = ssl_context
+        self.stats = {'created': 0, 'reused': 0, 'expired': 0, 'retried': 0}
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, scheme, host, timeout):
+        with self._lock:
+            self.stats['created'] += 1
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, timeout=timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, timeout=timeout)
+
+    def _checkout(self, scheme, host, timeout):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get((scheme, host), [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    self.stats['expired'] += 1
+                    conn.close()
+                    continue
+                self.stats['reused'] += 1
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._new_connection(scheme, host, timeout), False
+
+    def _checkin(self, scheme, host, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def request(self, scheme, host, method, url, body=None, headers=None, timeout=REQUEST_TIMEOUT):
+        """发送请求并读完响应体, 返回 (状态码, 响应字节); 网络错误照常抛出"""
+        start = time.perf_counter()
+        for attempt in range(2):
+            conn, reused = self._checkout(scheme, host, timeout)
+            try:
+                conn.request(method, url, body, headers or {})
+                response = conn.getresponse()
+                payload = response.read()
+            except self.STALE_ERRORS:
+                conn.close()
+                if reused and attempt == 0:
+                    with self._lock:
+                        self.stats['retried'] += 1
+                    continue
+                METRICS.incr('http_errors')
+                raise
+            except BaseException:
+                conn.close()
+                METRICS.incr('http_errors')
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(scheme, host, conn)
+            METRICS.record_since('http', start)
+            return response.status, payload
+
+    def warm(self, scheme, host, timeout=REQUEST_TIMEOUT):
+        """提前建立一条连接(含 TLS 握手)放入空闲池, 失败时忽略"""
+        conn = self._new_connection(scheme, host, timeout)
+        try:
+            conn.connect()
+        except (OSError, http.client.HTTPException) as exc:
+            LOGGER.info('Pre-warming %s://%s failed: %s', scheme, host, exc)
+            conn.close()
+            return False
+        self._checkin(scheme, host, conn)
+        return True
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+
+DEFAULT_POOL = ConnectionPool()
+
+
+def _pack_batches(texts, max_items, max_chars):
+    """按条数和字符数上限把文本切成若干批, 单条超长的文本单独成批"""
+    batch, size = [], 0
+    for text in texts:
+        if batch and (len(batch) >= max_items or size + len(text) > max_chars):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        yield batch
+
+
+def _batch_translate(translator, name, texts, fromLang, toLang):
+    """逐批调用 translator._trans_chunk, 某一批失败时该批每条都返回对应的错误提示"""
+    # 聊天消息本身不含换行, 换行会破坏百度按行切分的批量格式
+    texts = [' '.join(text.splitlines()) for text in texts]
+    results = []
+    for batch in _pack_batches(texts, translator.BATCH_MAX_ITEMS, translator.BATCH_MAX_CHARS):
+        try:
+            translated = translator._trans_chunk(batch, fromLang, toLang)
+            if translated is None or len(translated) != len(batch):
+                translated = ['翻译失败!'] * len(batch)
+        except socket.timeout as exc:
+            LOGGER.warning('%s batch translation timed out: %s', name, exc, exc_info=True)
+            translated = [TIMEOUT_MESSAGE] * len(batch)
+        except (OSError, http.client.HTTPException) as exc:
+            LOGGER.warning('%s batch translation network error: %s', name, exc, exc_info=True)
+            translated = ['网络请求失败，请检查网络设置。'] * len(batch)
+        except Exception as exc:
+            LOGGER.exception('%s batch translation unexpected error: %s', name, exc)
+            translated = ['翻译失败!'] * len(batch)
+        results.extend(translated)
+    return results
 
 
 class BaiduTranslator(object):
-    def __init__(self, appid, secretkey, timeout=REQUEST_TIMEOUT):
+    provider = 'baidu'
+    scheme = 'http'
+    host = 'api.fanyi.baidu.com'
+    supports_batch = True
+    BATCH_MAX_ITEMS = 50
+    BATCH_MAX_CHARS = 2000
+
+    def __init__(self, appid, secretkey, timeout=REQUEST_TIMEOUT, pool=None, host=None, scheme=None):
         self.appid = appid
         self.secretKey = secretkey
         self.timeout = timeout
+        self.pool = pool or DEFAULT_POOL
+        # host/scheme 覆盖默认接入点, 例如指向本地模拟服务器
+        self.host = host or self.host
+        self.scheme = scheme or self.scheme
+
+    def warm_up(self):
+        return self.pool.warm(self.scheme, self.host, self.timeout)
 
     def trans(self, src_text, fromLang='auto', toLang='zh'):
-        httpClient = None
         myurl = '/api/trans/vip/translate'
         salt = random.randint(32768, 65536)
         sign = self.appid + src_text + str(salt) + self.secretKey
@@ -124,44 +449,81 @@ class BaiduTranslator(object):
             src_text) + '&from=' + fromLang + '&to=' + toLang + '&salt=' + str(
             salt) + '&sign=' + sign
         try:
-            httpClient = http.client.HTTPConnection('api.fanyi.baidu.com', timeout=self.timeout)
-            httpClient.request('GET', myurl)
-
-            response = httpClient.getresponse()
-            result_all = response.read().decode("utf-8")
+            _, payload = self.pool.request(self.scheme, self.host, 'GET', myurl, timeout=self.timeout)
+            result_all = payload.decode("utf-8")
             result = json.loads(result_all)
+            if 'error_code' in result:
+                LOGGER.warning('Baidu translation API error %s: %s', result['error_code'], result.get('error_msg'))
+                return '翻译失败!'
 
             return result['trans_result'][0]['dst']
         except socket.timeout as exc:
             LOGGER.warning('Baidu translation request timed out: %s', exc, exc_info=True)
-            return '翻译请求超时，请检查网络连接。'
+            return TIMEOUT_MESSAGE
         except (OSError, http.client.HTTPException) as exc:
             LOGGER.warning('Baidu translation network error: %s', exc, exc_info=True)
             return '网络请求失败，请检查网络设置。'
         except Exception as exc:
             LOGGER.exception('Baidu translation unexpected error: %s', exc)
             return '翻译失败!'
-        finally:
-            if httpClient:
-                httpClient.close()
+
+    def _trans_chunk(self, texts, fromLang, toLang):
+        query = '\n'.join(texts)
+        salt = str(random.randint(32768, 65536))
+        sign = hashlib.md5((self.appid + query + salt + self.secretKey).encode()).hexdigest()
+        body = urllib.parse.urlencode({'appid': self.appid, 'q': query, 'from': fromLang, 'to': toLang,
+                                       'salt': salt, 'sign': sign})
+        headers = {'Content-type': 'application/x-www-form-urlencoded'}
+        status, payload = self.pool.request(self.scheme, self.host, 'POST', '/api/trans/vip/translate',
+                                            body, headers, self.timeout)
+        if status != 200:
+            return None
+        result = json.loads(payload.decode('utf-8'))
+        if 'error_code' in result:
+            LOGGER.warning('Baidu translation API error %s: %s', result['error_code'], result.get('error_msg'))
+            return None
+        return [item['dst'] for item in result['trans_result']]
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        return _batch_translate(self, 'Baidu', texts, fromLang, toLang)
 
 
 class DeepLTranslator(object):
-    def __init__(self, auth_key, api_host='api-free.deepl.com', timeout=REQUEST_TIMEOUT):
+    provider = 'deepl'
+    scheme = 'https'
+    supports_batch = True
+    BATCH_MAX_ITEMS = 50
+    BATCH_MAX_CHARS = 30000
+
+    def __init__(self, auth_key, api_host='api-free.deepl.com', timeout=REQUEST_TIMEOUT, pool=None, host=None,
+                 scheme=None):
         self.auth_key = auth_key
-        self.api_host = api_host or 'api-free.deepl.com'
+        self.api_host = host or api_host or 'api-free.deepl.com'
         self.timeout = timeout
+        self.pool = pool or DEFAULT_POOL
+        self.scheme = scheme or self.scheme
+
+    @property
+    def host(self):
+        return self.api_host
+
+    @host.setter
+    def host(self, value):
+        self.api_host = value
+
+    def warm_up(self):
+        return self.pool.warm(self.scheme, self.host, self.timeout)
 
     def _map_lang(self, lang):
         mapping = {
             'zh': 'ZH',
             'en': 'EN',
             'kor': 'KO',
+            'jp': 'JA',
         }
         return mapping.get(lang.lower(), lang.upper())
 
     def trans(self, src_text, fromLang='auto', toLang='zh'):
-        conn = None
         params = {
             'auth_key': self.auth_key,
             'text': src_text,
@@ -170,43 +532,68 @@ class DeepLTranslator(object):
         if fromLang != 'auto':
             params['source_lang'] = self._map_lang(fromLang)
         try:
-            conn = http.client.HTTPSConnection(self.api_host, timeout=self.timeout)
             headers = {'Content-type': 'application/x-www-form-urlencoded'}
-            conn.request('POST', '/v2/translate', urllib.parse.urlencode(params), headers)
-            response = conn.getresponse()
-            if response.status != 200:
+            status, payload = self.pool.request(self.scheme, self.host, 'POST', '/v2/translate',
+                                                urllib.parse.urlencode(params), headers, self.timeout)
+            if status != 200:
                 return '翻译失败!'
-            payload = response.read().decode('utf-8')
-            data = json.loads(payload)
+            data = json.loads(payload.decode('utf-8'))
             translations = data.get('translations', [])
             if not translations:
                 return '翻译失败!'
             return translations[0].get('text', '翻译失败!')
         except socket.timeout as exc:
             LOGGER.warning('DeepL translation request timed out: %s', exc, exc_info=True)
-            return '翻译请求超时，请检查网络连接。'
+            return TIMEOUT_MESSAGE
         except (OSError, http.client.HTTPException) as exc:
             LOGGER.warning('DeepL translation network error: %s', exc, exc_info=True)
             return '网络请求失败，请检查网络设置。'
         except Exception as exc:
             LOGGER.exception('DeepL translation unexpected error: %s', exc)
             return '翻译失败!'
-        finally:
-            if conn:
-                conn.close()
+
+    def _trans_chunk(self, texts, fromLang, toLang):
+        params = [('auth_key', self.auth_key), ('target_lang', self._map_lang(toLang))]
+        if fromLang != 'auto':
+            params.append(('source_lang', self._map_lang(fromLang)))
+        params.extend(('text', text) for text in texts)
+        headers = {'Content-type': 'application/x-www-form-urlencoded'}
+        status, payload = self.pool.request(self.scheme, self.host, 'POST', '/v2/translate',
+                                            urllib.parse.urlencode(params), headers, self.timeout)
+        if status != 200:
+            return None
+        data = json.loads(payload.decode('utf-8'))
+        return [item.get('text', '翻译失败!') for item in data.get('translations', [])]
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        return _batch_translate(self, 'DeepL', texts, fromLang, toLang)
 
 
 class YoudaoTranslator(object):
-    def __init__(self, app_key, app_secret, timeout=REQUEST_TIMEOUT):
+    provider = 'youdao'
+    scheme = 'https'
+    host = 'openapi.youdao.com'
+    supports_batch = True
+    BATCH_MAX_ITEMS = 50
+    BATCH_MAX_CHARS = 5000
+
+    def __init__(self, app_key, app_secret, timeout=REQUEST_TIMEOUT, pool=None, host=None, scheme=None):
         self.app_key = app_key
         self.app_secret = app_secret
         self.timeout = timeout
+        self.pool = pool or DEFAULT_POOL
+        self.host = host or self.host
+        self.scheme = scheme or self.scheme
+
+    def warm_up(self):
+        return self.pool.warm(self.scheme, self.host, self.timeout)
 
     def _map_lang(self, lang):
         mapping = {
             'zh': 'zh-CHS',
             'en': 'en',
             'kor': 'ko',
+            'jp': 'ja',
         }
         return mapping.get(lang.lower(), lang)
 
@@ -219,7 +606,6 @@ class YoudaoTranslator(object):
         return text[:10] + str(size) + text[-10:]
 
     def trans(self, src_text, fromLang='auto', toLang='zh'):
-        conn = None
         salt = str(random.randint(1, 65536))
         curtime = str(int(time.time()))
         params = {
@@ -234,14 +620,12 @@ class YoudaoTranslator(object):
         sign_str = self.app_key + self._truncate(src_text) + salt + curtime + self.app_secret
         params['sign'] = hashlib.sha256(sign_str.encode('utf-8')).hexdigest()
         try:
-            conn = http.client.HTTPSConnection('openapi.youdao.com', timeout=self.timeout)
             headers = {'Content-type': 'application/x-www-form-urlencoded'}
-            conn.request('POST', '/api', urllib.parse.urlencode(params), headers)
-            response = conn.getresponse()
-            if response.status != 200:
+            status, payload = self.pool.request(self.scheme, self.host, 'POST', '/api',
+                                                urllib.parse.urlencode(params), headers, self.timeout)
+            if status != 200:
                 return '翻译失败!'
-            payload = response.read().decode('utf-8')
-            data = json.loads(payload)
+            data = json.loads(payload.decode('utf-8'))
             if data.get('errorCode') != '0':
                 return '翻译失败!'
             translation = data.get('translation')
@@ -252,23 +636,54 @@ class YoudaoTranslator(object):
             return '翻译失败!'
         except socket.timeout as exc:
             LOGGER.warning('Youdao translation request timed out: %s', exc, exc_info=True)
-            return '翻译请求超时，请检查网络连接。'
+            return TIMEOUT_MESSAGE
         except (OSError, http.client.HTTPException) as exc:
             LOGGER.warning('Youdao translation network error: %s', exc, exc_info=True)
             return '网络请求失败，请检查网络设置。'
         except Exception as exc:
             LOGGER.exception('Youdao translation unexpected error: %s', exc)
             return '翻译失败!'
-        finally:
-            if conn:
-                conn.close()
+
+    def _trans_chunk(self, texts, fromLang, toLang):
+        salt = str(random.randint(1, 65536))
+        curtime = str(int(time.time()))
+        # 批量接口的签名输入是所有 q 按顺序拼接
+        sign_str = self.app_key + self._truncate(''.join(texts)) + salt + curtime + self.app_secret
+        params = [('appKey', self.app_key), ('salt', salt), ('curtime', curtime), ('signType', 'v3'),
+                  ('from', 'auto' if fromLang == 'auto' else self._map_lang(fromLang)),
+                  ('to', self._map_lang(toLang)),
+                  ('sign', hashlib.sha256(sign_str.encode('utf-8')).hexdigest())]
+        params.extend(('q', text) for text in texts)
+        headers = {'Content-type': 'application/x-www-form-urlencoded'}
+        status, payload = self.pool.request(self.scheme, self.host, 'POST', '/v2/api',
+                                            urllib.parse.urlencode(params), headers, self.timeout)
+        if status != 200:
+            return None
+        data = json.loads(payload.decode('utf-8'))
+        if data.get('errorCode') != '0':
+            return None
+        return [item.get('translation') or '翻译失败!' for item in data.get('translateResults', [])]
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        return _batch_translate(self, 'Youdao', texts, fromLang, toLang)
 
 
 class PapagoTranslator(object):
-    def __init__(self, client_id, client_secret, timeout=REQUEST_TIMEOUT):
+    provider = 'papago'
+    scheme = 'https'
+    host = 'openapi.naver.com'
+    supports_batch = False
+
+    def __init__(self, client_id, client_secret, timeout=REQUEST_TIMEOUT, pool=None, host=None, scheme=None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.timeout = timeout
+        self.pool = pool or DEFAULT_POOL
+        self.host = host or self.host
+        self.scheme = scheme or self.scheme
+
+    def warm_up(self):
+        return self.pool.warm(self.scheme, self.host, self.timeout)
 
     def _map_lang(self, lang):
         mapping = {
@@ -278,6 +693,7 @@ class PapagoTranslator(object):
             'en': 'en',
             'kor': 'ko',
             'ko': 'ko',
+            'jp': 'ja',
         }
         return mapping.get(lang.lower(), lang)
 
@@ -289,16 +705,13 @@ class PapagoTranslator(object):
         }
 
     def _detect_lang(self, text):
-        conn = None
         try:
-            conn = http.client.HTTPSConnection('openapi.naver.com', timeout=self.timeout)
             params = urllib.parse.urlencode({'query': text})
-            conn.request('POST', '/v1/papago/detectLangs', params, self._build_headers())
-            response = conn.getresponse()
-            if response.status != 200:
+            status, payload = self.pool.request(self.scheme, self.host, 'POST', '/v1/papago/detectLangs',
+                                                params, self._build_headers(), self.timeout)
+            if status != 200:
                 return None
-            payload = response.read().decode('utf-8')
-            data = json.loads(payload)
+            data = json.loads(payload.decode('utf-8'))
             return data.get('langCode')
         except socket.timeout as exc:
             LOGGER.warning('Papago language detection timed out: %s', exc, exc_info=True)
@@ -309,12 +722,8 @@ class PapagoTranslator(object):
         except Exception as exc:
             LOGGER.exception('Papago language detection unexpected error: %s', exc)
             return None
-        finally:
-            if conn:
-                conn.close()
 
     def trans(self, src_text, fromLang='auto', toLang='zh'):
-        conn = None
         source_lang = fromLang
         if fromLang == 'auto':
             detected = self._detect_lang(src_text)
@@ -330,13 +739,11 @@ class PapagoTranslator(object):
             'text': src_text,
         })
         try:
-            conn = http.client.HTTPSConnection('openapi.naver.com', timeout=self.timeout)
-            conn.request('POST', '/v1/papago/n2mt', params, self._build_headers())
-            response = conn.getresponse()
-            if response.status != 200:
+            status, payload = self.pool.request(self.scheme, self.host, 'POST', '/v1/papago/n2mt',
+                                                params, self._build_headers(), self.timeout)
+            if status != 200:
                 return '翻译失败!'
-            payload = response.read().decode('utf-8')
-            data = json.loads(payload)
+            data = json.loads(payload.decode('utf-8'))
             message = data.get('message', {})
             result = message.get('result', {}) if isinstance(message, dict) else {}
             translated = result.get('translatedText')
@@ -345,40 +752,1276 @@ class PapagoTranslator(object):
             return '翻译失败!'
         except socket.timeout as exc:
             LOGGER.warning('Papago translation request timed out: %s', exc, exc_info=True)
-            return '翻译请求超时，请检查网络连接。'
+            return TIMEOUT_MESSAGE
         except (OSError, http.client.HTTPException) as exc:
             LOGGER.warning('Papago translation network error: %s', exc, exc_info=True)
             return '网络请求失败，请检查网络设置。'
         except Exception as exc:
             LOGGER.exception('Papago translation unexpected error: %s', exc)
             return '翻译失败!'
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        # Papago 没有批量接口, 逐条请求(复用同一条 keep-alive 连接)
+        return [self.trans(text, fromLang=fromLang, toLang=toLang) for text in texts]
+
+
+class TranslationCache(object):
+    """译文缓存: 内存 LRU 在前, sqlite 持久化在后, 按 (接口, 源语言, 目标语言, 规范化文本) 索引"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=DEFAULT_CACHE_SETTINGS['max_entries'],
+                 disk_max_entries=DEFAULT_CACHE_SETTINGS['disk_max_entries'],
+                 ttl=DEFAULT_CACHE_SETTINGS['ttl']):
+        self.path = path
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl = ttl
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_count = 0
+        if path:
+            self._open_db()
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.split())
+
+    def make_key(self, provider, from_lang, to_lang, text):
+        return provider, from_lang, to_lang, self.normalize(text)
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS translations ('
+                             'provider TEXT, from_lang TEXT, to_lang TEXT, text TEXT, result TEXT, created REAL, '
+                             'PRIMARY KEY (provider, from_lang, to_lang, text))')
+            self._db.commit()
+            self._disk_count = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        except sqlite3.Error as exc:
+            LOGGER.warning('Translation cache database unavailable, using memory only: %s', exc)
+            self._db = None
+
+    def _expired(self, created, now):
+        return bool(self.ttl) and now - created > self.ttl
+
+    def _remember(self, key, result, created):
+        self._memory[key] = (result, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return entry[0]
+                del self._memory[key]
+            if self._db is not None:
+                try:
+                    row = self._db.execute('SELECT result, created FROM translations WHERE provider=? AND from_lang=? '
+                                           'AND to_lang=? AND text=?', key).fetchone()
+                except sqlite3.Error as exc:
+                    LOGGER.warning('Translation cache read failed: %s', exc)
+                    row = None
+                if row is not None and not self._expired(row[1], now):
+                    self._remember(key, row[0], row[1])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, result):
+        if not result or result in ERROR_MESSAGES:
+            return False
+        now = time.time()
+        with self._lock:
+            self._remember(key, result, now)
+            self.stats['stores'] += 1
+            if self._db is None:
+                return True
+            try:
+                # 先尝试更新已有行, 只有真正新增一行时才计数, 否则重复写入会让计数虚高、提前触发清理
+                cursor = self._db.execute('UPDATE translations SET result=?, created=? WHERE provider=? AND '
+                                          'from_lang=? AND to_lang=? AND text=?', (result, now) + key)
+                if cursor.rowcount == 0:
+                    self._db.execute('INSERT INTO translations VALUES (?, ?, ?, ?, ?, ?)', key + (result, now))
+                    self._disk_count += 1
+                if self._disk_count > self.disk_max_entries:
+                    self._trim_disk(now)
+                self._db.commit()
+            except sqlite3.Error as exc:
+                LOGGER.warning('Translation cache write failed: %s', exc)
+        return True
+
+    def _trim_disk(self, now):
+        if self.ttl:
+            self._db.execute('DELETE FROM translations WHERE created < ?', (now - self.ttl,))
+        # 多删一成, 避免每次写入都触发清理
+        keep = int(self.disk_max_entries * 0.9)
+        self._db.execute('DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations '
+                         'ORDER BY created DESC LIMIT -1 OFFSET ?)', (keep,))
+        self._disk_count = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM translations')
+                self._db.commit()
+                self._disk_count = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class TranslatorWrapper(object):
+    """在翻译接口外加一层处理, 对外保持 trans/warm_up/provider 不变"""
+
+    def __init__(self, translator):
+        self.translator = translator
+
+    @property
+    def provider(self):
+        return self.translator.provider
+
+    def warm_up(self):
+        return self.translator.warm_up()
+
+    @property
+    def supports_batch(self):
+        return self.translator.supports_batch
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        return self.translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        return self.translator.trans_batch(texts, fromLang=fromLang, toLang=toLang)
+
+
+class CachedTranslator(TranslatorWrapper):
+    """包装任意翻译接口, 命中缓存时不发起网络请求"""
+
+    def __init__(self, translator, cache):
+        super().__init__(translator)
+        self.cache = cache
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        key = self.cache.make_key(self.provider, fromLang, toLang, src_text)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        result = self.translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+        self.cache.put(key, result)
+        return result
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        keys = [self.cache.make_key(self.provider, fromLang, toLang, text) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            translated = self.translator.trans_batch([texts[index] for index in missing],
+                                                     fromLang=fromLang, toLang=toLang)
+            for index, result in zip(missing, translated):
+                results[index] = result
+                self.cache.put(keys[index], result)
+        return results
+
+
+class LanguageDetectingTranslator(TranslatorWrapper):
+    """在本地判断源语言: 给接口传明确的源语言(Papago 不必再调用 detectLangs),
+    已是目标语言或只有数字、表情、标点的消息不发请求, 返回 NO_TRANSLATION"""
+
+    def __init__(self, translator):
+        super().__init__(translator)
+        self.stats = {'detected': 0, 'skipped': 0}
+
+    def _source_lang(self, src_text, fromLang):
+        if fromLang != 'auto':
+            return fromLang
+        self.stats['detected'] += 1
+        return detect_language(src_text)
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        language = self._source_lang(src_text, fromLang)
+        if not needs_translation(src_text, toLang, language):
+            self.stats['skipped'] += 1
+            return NO_TRANSLATION
+        return self.translator.trans(src_text, fromLang=language, toLang=toLang)
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        results = [NO_TRANSLATION] * len(texts)
+        groups = {}
+        for index, text in enumerate(texts):
+            language = self._source_lang(text, fromLang)
+            if needs_translation(text, toLang, language):
+                groups.setdefault(language, []).append(index)
+            else:
+                self.stats['skipped'] += 1
+        for language, indexes in groups.items():
+            translated = self.translator.trans_batch([texts[index] for index in indexes],
+                                                     fromLang=language, toLang=toLang)
+            for index, result in zip(indexes, translated):
+                results[index] = result
+        return results
+
+
+def load_phrasebook(path=PHRASEBOOK_PATH):
+    """内置短语表加上用户的 phrasebook.json ({"韩文": "中文"}), 用户条目优先"""
+    entries = dict(DEFAULT_PHRASEBOOK)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                user_entries = json.load(fh)
+            entries.update({k: v for k, v in user_entries.items() if k and isinstance(v, str)})
+        except (OSError, json.JSONDecodeError, AttributeError) as exc:
+            LOGGER.warning('Failed to load phrasebook %s: %s', path, exc)
+    return entries
+
+
+class Phrasebook(object):
+    """本地短语表: 整句直接查表, 否则用前缀树做最长匹配, 整句都能被短语覆盖时才给出译文
+
+    백、궁、힐 这类单个音节的短语只在前后不紧接其他文字时匹配, 避免把 '백힐' 拆成 '撤退治疗'。
+    """
+
+    def __init__(self, entries):
+        self.entries = {}
+        self._trie = {}
+        self.stats = {'lookups': 0, 'exact_hits': 0, 'segment_hits': 0}
+        self._stats_lock = threading.Lock()
+        for phrase, translation in entries.items():
+            self.add(phrase, translation)
+
+    def add(self, phrase, translation):
+        phrase = phrase.lower()
+        self.entries[phrase] = translation
+        node = self._trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[None] = translation
+
+    @property
+    def hit_rate(self):
+        if not self.stats['lookups']:
+            return 0.0
+        return (self.stats['exact_hits'] + self.stats['segment_hits']) / self.stats['lookups']
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _is_standalone(text, start, end):
+        return (start == 0 or not text[start - 1].isalpha()) and (end == len(text) or not text[end].isalpha())
+
+    def _longest_match(self, text, start):
+        node = self._trie
+        match = None
+        for index in range(start, len(text)):
+            node = node.get(text[index])
+            if node is None:
+                break
+            if None in node:
+                match = index + 1, node[None]
+        if match is not None and match[0] == start + 1 and '\uac00' <= text[start] <= '\ud7a3' \
+                and not self._is_standalone(text, start, match[0]):
+            return None
+        return match
+
+    def segment(self, text):
+        """逐段最长匹配; 数字、空白、标点、表情原样保留, 有文字没被覆盖或没有任何短语时返回 None"""
+        parts = []
+        matched = False
+        index = 0
+        while index < len(text):
+            match = self._longest_match(text, index)
+            if match is not None:
+                index, translation = match
+                parts.append(translation)
+                matched = True
+                continue
+            if text[index].isalpha():
+                return None
+            parts.append(text[index])
+            index += 1
+        return ''.join(parts) if matched else None
+
+    def translate(self, text):
+        self._count('lookups')
+        key = ' '.join(text.split())
+        lowered = key.lower()
+        if len(lowered) == len(key):
+            key = lowered
+        result = self.entries.get(key)
+        if result is not None:
+            self._count('exact_hits')
+            return result
+        result = self.segment(key)
+        if result is not None:
+            self._count('segment_hits')
+            return result
+        return None
+
+
+class PhrasebookTranslator(TranslatorWrapper):
+    """翻译成中文前先查本地短语表, 完全覆盖的消息不发网络请求"""
+
+    def __init__(self, translator, phrasebook):
+        super().__init__(translator)
+        self.phrasebook = phrasebook
+
+    def _lookup(self, src_text, toLang):
+        if toLang != 'zh':
+            return None
+        return self.phrasebook.translate(src_text)
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        result = self._lookup(src_text, toLang)
+        if result is not None:
+            return result
+        return self.translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        results = [self._lookup(text, toLang) for text in texts]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            translated = self.translator.trans_batch([texts[index] for index in missing],
+                                                     fromLang=fromLang, toLang=toLang)
+            for index, result in zip(missing, translated):
+                results[index] = result
+        return results
+
+
+class TokenBucket(object):
+    """令牌桶; reserve 允许透支, 返回调用者需要等待的秒数, 这样排队的请求按顺序均匀放行"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, cost=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (cost - self._tokens) / self.rate)
+
+    def reserve(self, cost=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= cost
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RateLimitedTranslator(TranslatorWrapper):
+    """同一接口的多组凭据各自限速, 请求轮流分给最早有令牌的凭据, 总吞吐随凭据数增加
+
+    等待在翻译线程上进行, 预计等待超过 max_wait 秒的请求不占用令牌, 直接返回 RATE_LIMITED_MESSAGE,
+    避免一阵聊天把所有翻译线程都堵在排队上。
+    """
+
+    def __init__(self, translators, qps, burst=1, max_wait=DEFAULT_RATE_LIMIT_SETTINGS['max_wait']):
+        super().__init__(translators[0])
+        self.translators = list(translators)
+        self.buckets = [TokenBucket(qps, burst) for _ in self.translators]
+        self.max_wait = max_wait
+        self.stats = {'requests': 0, 'delayed': 0, 'waited': 0.0, 'rejected': 0}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def BATCH_MAX_ITEMS(self):
+        return self.translator.BATCH_MAX_ITEMS
+
+    @property
+    def BATCH_MAX_CHARS(self):
+        return self.translator.BATCH_MAX_CHARS
+
+    @property
+    def timeout(self):
+        return self.translator.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        for translator in self.translators:
+            translator.timeout = value
+
+    def _acquire(self, cost):
+        with self._lock:
+            count = len(self.translators)
+            order = [(self._next + offset) % count for offset in range(count)]
+            # 等待时间相同的凭据按轮转顺序选择
+            index = min(order, key=lambda item: self.buckets[item].delay(cost))
+            self.stats['requests'] += 1
+            if self.buckets[index].delay(cost) > self.max_wait:
+                self.stats['rejected'] += 1
+                return None
+            self._next = (index + 1) % count
+            wait = self.buckets[index].reserve(cost)
+            if wait:
+                self.stats['delayed'] += 1
+                self.stats['waited'] += wait
+        if wait:
+            time.sleep(wait)
+        return self.translators[index]
+
+    def _batch_cost(self, texts):
+        if not self.supports_batch:
+            return max(1, len(texts))
+        return max(1, len(list(_pack_batches(texts, self.BATCH_MAX_ITEMS, self.BATCH_MAX_CHARS))))
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        translator = self._acquire(1)
+        if translator is None:
+            return RATE_LIMITED_MESSAGE
+        return translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        translator = self._acquire(self._batch_cost(texts))
+        if translator is None:
+            return [RATE_LIMITED_MESSAGE] * len(texts)
+        return translator.trans_batch(texts, fromLang=fromLang, toLang=toLang)
+
+    def warm_up(self):
+        # 各组凭据访问同一主机, 共用连接池, 预热一次即可
+        return self.translator.warm_up()
+
+
+class _BatchSlot(object):
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.result = None
+
+
+class MicroBatchTranslator(TranslatorWrapper):
+    """把 window 秒内到达的同方向翻译请求合并成一次 trans_batch
+
+    第一个到达的调用者负责等待并发送整批, 其余调用者阻塞到结果返回。
+    没有其他请求在途时第一个调用者不等待, 单条消息立即发送; 在它在途期间到达的消息再攒成一批。
+    """
+
+    def __init__(self, translator, window=BATCH_WINDOW, max_items=None):
+        super().__init__(translator)
+        self.window = window
+        self.max_items = max_items or translator.BATCH_MAX_ITEMS
+        self.stats = {'batches': 0, 'messages': 0}
+        self._queues = {}
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        key = (fromLang, toLang)
+        slot = _BatchSlot(src_text)
+        with self._condition:
+            queue = self._queues.get(key)
+            leader = queue is None
+            if leader:
+                queue = self._queues[key] = []
+                wait = self._in_flight > 0
+            queue.append(slot)
+            if len(queue) >= self.max_items:
+                # 这一批已满, 之后到达的请求另起一批
+                del self._queues[key]
+                self._condition.notify_all()
+        if not leader:
+            slot.done.wait()
+            return slot.result
+        deadline = time.monotonic() + self.window
+        with self._condition:
+            while wait and len(queue) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self._queues.get(key) is queue:
+                del self._queues[key]
+            self._in_flight += 1
+            self.stats['batches'] += 1
+            self.stats['messages'] += len(queue)
+        try:
+            if len(queue) == 1:
+                results = [self.translator.trans(src_text, fromLang=fromLang, toLang=toLang)]
+            else:
+                results = self.translator.trans_batch([item.text for item in queue], fromLang=fromLang, toLang=toLang)
+        except Exception as exc:
+            LOGGER.exception('Micro-batch translation error: %s', exc)
+            results = []
         finally:
-            if conn:
-                conn.close()
+            with self._condition:
+                self._in_flight -= 1
+        for index, item in enumerate(queue):
+            item.result = results[index] if index < len(results) else '翻译失败!'
+            item.done.set()
+        return slot.result
 
 
-def create_translator():
-    config = load_config()
-    provider = config.get('provider', 'baidu')
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightTranslator(TranslatorWrapper):
+    """相同 (接口, 源语言, 目标语言, 文本) 的并发请求只发一次, 等待者共享同一结果(包括失败提示)"""
+
+    def __init__(self, translator):
+        super().__init__(translator)
+        self.stats = {'requests': 0, 'coalesced': 0}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        key = (self.provider, fromLang, toLang, TranslationCache.normalize(src_text))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats['requests'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self.translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class LatencyTracker(object):
+    """记录最近若干次成功请求的耗时, 用于计算分位数"""
+
+    def __init__(self, size=HEDGE_SAMPLE_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[int(fraction * (len(samples) - 1))]
+
+
+class RequestBudget(object):
+    """滑动窗口计数, 限制每个备用接口每分钟最多被对冲调用的次数"""
+
+    def __init__(self, limit, period=60.0):
+        self.limit = limit
+        self.period = period
+        self._stamps = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._stamps and now - self._stamps[0] >= self.period:
+                self._stamps.popleft()
+            if len(self._stamps) >= self.limit:
+                return False
+            self._stamps.append(now)
+            return True
+
+
+class HedgedTranslator(TranslatorWrapper):
+    """先请求主接口, 超过其 p95 延迟仍未返回(或已返回失败)时再请求一个备用接口, 取先到的有效译文
+
+    线程里已经发出的请求无法中止, 落后的一方结果直接丢弃, 连接照常归还连接池。
+    """
+
+    def __init__(self, translator, secondaries, budget_per_minute=DEFAULT_HEDGING_SETTINGS['budget_per_minute'],
+                 min_delay=DEFAULT_HEDGING_SETTINGS['min_delay'],
+                 default_delay=DEFAULT_HEDGING_SETTINGS['default_delay']):
+        super().__init__(translator)
+        self.secondaries = list(secondaries)
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.latency = {id(item): LatencyTracker() for item in [translator] + self.secondaries}
+        self.budgets = {id(item): RequestBudget(budget_per_minute) for item in self.secondaries}
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_exhausted': 0}
+        self._stats_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * TRANSLATION_WORKERS + 2,
+                                                               thread_name_prefix='hedge')
+
+    @property
+    def provider(self):
+        # 译文可能来自任一接口, 缓存不能记在主接口名下
+        return 'hedged:' + '+'.join(item.provider for item in [self.translator] + self.secondaries)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def hedge_delay(self):
+        tracker = self.latency[id(self.translator)]
+        if len(tracker) < HEDGE_MIN_SAMPLES:
+            return self.default_delay
+        return max(self.min_delay, tracker.percentile(0.95))
+
+    def _call(self, translator, src_text, fromLang, toLang):
+        start = time.monotonic()
+        result = translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+        if result not in ERROR_MESSAGES:
+            # 落后的请求完成后也要记录, 否则慢接口的分位数会被低估
+            self.latency[id(translator)].record(time.monotonic() - start)
+        return result
+
+    def _pick_secondary(self):
+        for secondary in self.secondaries:
+            if self.budgets[id(secondary)].try_acquire():
+                return secondary
+        return None
+
+    def _submit(self, translator, src_text, fromLang, toLang):
+        """close 之后仍在旧翻译链上的请求返回 None, 由调用方直接在当前线程请求"""
+        try:
+            return self._executor.submit(self._call, translator, src_text, fromLang, toLang)
+        except RuntimeError:
+            return None
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        self._count('requests')
+        primary = self._submit(self.translator, src_text, fromLang, toLang)
+        if primary is None:
+            return self._call(self.translator, src_text, fromLang, toLang)
+        done, _ = concurrent.futures.wait([primary], timeout=self.hedge_delay())
+        if done and primary.result() not in ERROR_MESSAGES:
+            return primary.result()
+        secondary = self._pick_secondary()
+        if secondary is None:
+            self._count('budget_exhausted')
+            return primary.result()
+        hedge = self._submit(secondary, src_text, fromLang, toLang)
+        if hedge is None:
+            return primary.result()
+        self._count('hedged')
+        pending = {primary, hedge}
+        fallback = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result not in ERROR_MESSAGES:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    for loser in pending:
+                        loser.cancel()
+                    return result
+                fallback = fallback or result
+        return fallback
+
+    def warm_up(self):
+        for secondary in self.secondaries:
+            secondary.warm_up()
+        return self.translator.warm_up()
+
+    def close(self):
+        """不等待已发出的请求, 落后的一方完成后线程自行退出"""
+        self._executor.shutdown(wait=False)
+
+
+class ProviderHealth(object):
+    """单个接口的健康状况: EWMA 延迟与错误率, 连续失败次数和熔断状态"""
+
+    def __init__(self, alpha=HEALTH_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.consecutive_failures = 0
+        self.state = 'closed'
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def _observe(self, latency, failed):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+        self.error_rate += self.alpha * ((1.0 if failed else 0.0) - self.error_rate)
+        self.requests += 1
+
+    def record_success(self, latency):
+        with self._lock:
+            self._observe(latency, False)
+            self.consecutive_failures = 0
+            self.state = 'closed'
+            self.opened_at = None
+
+    def record_failure(self, latency, timeout=False):
+        with self._lock:
+            self._observe(latency, True)
+            self.failures += 1
+            if timeout:
+                self.timeouts += 1
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= BREAKER_FAILURES:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def available(self, now=None):
+        """是否可以参与路由, 不改变状态; 真正发请求前还要 admit"""
+        now = now or time.monotonic()
+        with self._lock:
+            # 试探请求没有记录结果(如抛出异常)时, 再过一个冷却期放行下一次试探
+            return self.state == 'closed' or now - self.opened_at >= BREAKER_COOLDOWN
+
+    def admit(self, now=None):
+        """即将向该接口发请求时调用; 熔断冷却结束后转为半开, 只有一个请求能拿到试探机会"""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if now - self.opened_at < BREAKER_COOLDOWN:
+                return False
+            self.state = 'half_open'
+            self.opened_at = now
+            return True
+
+    def record_probe(self, reachable, now=None):
+        """后台连接探测的结果: 连不上则重新计时; 半开试探超过 REQUEST_TIMEOUT 仍没有结果时,
+        说明试探请求已经丢失, 连得上就立即放行新的试探"""
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if not reachable:
+                self.state = 'open'
+                self.opened_at = now
+            elif self.state == 'half_open' and now - self.opened_at >= REQUEST_TIMEOUT:
+                self.state = 'open'
+                self.opened_at = now - BREAKER_COOLDOWN
+
+    def expected_latency(self):
+        latency = HEALTH_UNKNOWN_LATENCY if self.latency is None else self.latency
+        # 错误率高的接口即使快也要排后
+        return latency * (1.0 + 4 * self.error_rate)
+
+    def timeout(self):
+        if self.latency is None:
+            return REQUEST_TIMEOUT
+        return min(REQUEST_TIMEOUT, max(MIN_REQUEST_TIMEOUT, self.latency * TIMEOUT_LATENCY_FACTOR))
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'latency': self.latency, 'error_rate': self.error_rate,
+                    'requests': self.requests, 'failures': self.failures, 'timeouts': self.timeouts}
+
+
+class RoutingTranslator(object):
+    """在所有已配置凭据的接口间路由: 优先最快的健康接口, 失败时依次换下一个
+
+    连续失败 BREAKER_FAILURES 次的接口熔断 BREAKER_COOLDOWN 秒, 后台线程定期对熔断接口做连接探测,
+    冷却结束后放行一次真实请求试探是否恢复。每个接口的超时随观测到的延迟调整。
+    """
+
+    provider = 'router'
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.health = {id(item): ProviderHealth() for item in self.providers}
+        self.stats = {'requests': 0, 'failovers': 0, 'exhausted': 0, 'probes': 0}
+        self._stats_lock = threading.Lock()
+        self._probe_thread = None
+        self._stop = threading.Event()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @property
+    def supports_batch(self):
+        return False
+
+    def health_of(self, provider):
+        return self.health[id(provider)]
+
+    def candidates(self):
+        now = time.monotonic()
+        available = [item for item in self.providers if self.health_of(item).available(now)]
+        # sorted 是稳定排序, 延迟相同时保持配置顺序
+        return sorted(available, key=lambda item: self.health_of(item).expected_latency())
+
+    def _set_timeout(self, provider):
+        timeout = self.health_of(provider).timeout()
+        target = provider
+        while target is not None:
+            if hasattr(target, 'timeout'):
+                target.timeout = timeout
+            target = getattr(target, 'translator', None)
+
+    def _route(self, call, is_error):
+        self._count('requests')
+        result = None
+        attempted = False
+        for provider in self.candidates():
+            health = self.health_of(provider)
+            # 只有真正要请求的接口才占用半开试探; 被别的请求抢先试探时跳过
+            if not health.admit():
+                continue
+            if attempted:
+                self._count('failovers')
+            attempted = True
+            start = time.monotonic()
+            result = call(provider)
+            elapsed = time.monotonic() - start
+            failed, timed_out = is_error(result)
+            if failed:
+                health.record_failure(elapsed, timed_out)
+            else:
+                health.record_success(elapsed)
+            self._set_timeout(provider)
+            if not failed:
+                return result
+        self._count('exhausted')
+        return result
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        result = self._route(lambda provider: provider.trans(src_text, fromLang=fromLang, toLang=toLang),
+                             lambda result: (result in ERROR_MESSAGES, result == TIMEOUT_MESSAGE))
+        return '翻译失败!' if result is None else result
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        result = self._route(lambda provider: provider.trans_batch(texts, fromLang=fromLang, toLang=toLang),
+                             lambda results: (all(item in ERROR_MESSAGES for item in results),
+                                              all(item == TIMEOUT_MESSAGE for item in results)))
+        return ['翻译失败!'] * len(texts) if result is None else result
+
+    def warm_up(self):
+        return any([provider.warm_up() for provider in self.providers])
+
+    def probe(self):
+        """对熔断中和半开试探中的接口做一次连接探测(不消耗翻译额度)"""
+        for provider in self.providers:
+            health = self.health_of(provider)
+            if health.state == 'closed':
+                continue
+            self._count('probes')
+            health.record_probe(provider.warm_up())
+
+    def _probe_loop(self):
+        while not self._stop.wait(PROBE_INTERVAL):
+            self.probe()
+
+    def start_probing(self):
+        if self._probe_thread is None:
+            self._probe_thread = threading.Thread(target=self._probe_loop, name='translator-probe', daemon=True)
+            self._probe_thread.start()
+
+    def stop_probing(self):
+        self._stop.set()
+
+    close = stop_probing
+
+
+class TranslationJob(object):
+    """一次排队中的翻译请求, 完成后 result 为译文"""
+
+    def __init__(self, text, fromLang='auto', toLang='zh', channel=None, droppable=True, context=None):
+        self.text = text
+        self.fromLang = fromLang
+        self.toLang = toLang
+        self.channel = channel
+        self.droppable = droppable
+        self.context = context
+        self.result = None
+        self.state = 'pending'
+        self.submitted_at = time.monotonic()
+
+    @property
+    def cancelled(self):
+        return self.state == 'cancelled'
+
+    @property
+    def active(self):
+        return self.state in ('pending', 'running')
+
+    def cancel(self):
+        if self.active:
+            self.state = 'cancelled'
+
+
+class TranslationWorker(object):
+    """在后台线程池里翻译, 界面线程只负责提交和接收结果
+
+    队列满时丢弃最早的可丢弃请求(队友聊天), 排队超过 max_age 秒的聊天也直接丢弃;
+    同一 channel 上提交新请求会取消旧请求, 旧请求的结果不会再回调。
+    回调在工作线程中执行, 界面需通过 Qt 信号转回主线程。
+    """
+
+    def __init__(self, translator=None, callback=None, workers=TRANSLATION_WORKERS,
+                 max_pending=TRANSLATION_QUEUE_SIZE, max_age=TRANSLATION_MAX_AGE):
+        self.translator = translator
+        self.callback = callback
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.stats = {'submitted': 0, 'completed': 0, 'dropped': 0, 'cancelled': 0}
+        self._pending = deque()
+        self._channels = {}
+        self._condition = threading.Condition()
+        self._running = True
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._run, name='translation-worker-%d' % index, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def submit(self, text, fromLang='auto', toLang='zh', channel=None, droppable=True, context=None):
+        job = TranslationJob(text, fromLang, toLang, channel, droppable, context)
+        with self._condition:
+            if not self._running:
+                raise RuntimeError('translation worker has been shut down')
+            self.stats['submitted'] += 1
+            if channel is not None:
+                previous = self._channels.get(channel)
+                if previous is not None and not previous.cancelled:
+                    previous.cancel()
+                    self.stats['cancelled'] += 1
+                self._channels[channel] = job
+            self._pending.append(job)
+            self._apply_backpressure()
+            self._condition.notify()
+        return job
+
+    def _apply_backpressure(self):
+        overflow = len(self._pending) - self.max_pending
+        if overflow <= 0:
+            return
+        kept = deque()
+        for job in self._pending:
+            if overflow > 0 and (job.cancelled or job.droppable):
+                overflow -= 1
+                if not job.cancelled:
+                    job.state = 'dropped'
+                    self.stats['dropped'] += 1
+                continue
+            kept.append(job)
+        self._pending = kept
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return None
+                job = self._pending.popleft()
+                if job.cancelled:
+                    continue
+                if job.droppable and self.max_age and time.monotonic() - job.submitted_at > self.max_age:
+                    job.state = 'dropped'
+                    self.stats['dropped'] += 1
+                    continue
+                job.state = 'running'
+                return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            translator = self.translator
+            start = time.perf_counter()
+            METRICS.record('queue_wait', time.monotonic() - job.submitted_at)
+            if translator is None:
+                job.result = '翻译失败!'
+            else:
+                try:
+                    job.result = translator.trans(job.text, fromLang=job.fromLang, toLang=job.toLang)
+                except Exception as exc:
+                    LOGGER.exception('Translation worker error: %s', exc)
+                    job.result = '翻译失败!'
+            METRICS.record_since('translate', start)
+            if job.result in ERROR_MESSAGES:
+                METRICS.incr('translate_errors')
+            with self._condition:
+                if job.channel is not None and self._channels.get(job.channel) is job:
+                    del self._channels[job.channel]
+                if job.cancelled:
+                    continue
+                job.state = 'done'
+                self.stats['completed'] += 1
+            if self.callback is not None:
+                self.callback(job)
+
+    def shutdown(self, wait=False):
+        with self._condition:
+            self._running = False
+            for job in self._pending:
+                job.cancel()
+            self._pending.clear()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class ProviderRegistry(object):
+    """按 TRANSLATOR_SPECS 创建翻译接口; 接口类在第一次用到时才解析, 也可以 register 自定义工厂
+
+    默认工厂按 spec 的 fields 校验必填项并作为同名参数传给接口类。
+    shared 按配置缓存已创建的对象, 配置不变时重复使用, 保留其连接、限速和统计状态。
+    """
+
+    def __init__(self, specs=TRANSLATOR_SPECS):
+        self.specs = specs
+        self._factories = {}
+        self._shared = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.specs)
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def _factory(self, name):
+        factory = self._factories.get(name)
+        if factory is None:
+            factory = self._factories[name] = globals()[self.specs[name]['translator']]
+        return factory
+
+    def create(self, name, settings):
+        spec = self.specs.get(name)
+        if spec is None:
+            return None
+        kwargs = {}
+        for field in spec['fields']:
+            value = str(settings.get(field['key']) or '').strip() or field.get('default', '')
+            if field.get('required', True) and not value:
+                return None
+            kwargs[field['key']] = value
+        for key in ENDPOINT_OVERRIDES:
+            if settings.get(key):
+                kwargs[key] = settings[key]
+        return self._factory(name)(**kwargs)
+
+    def shared(self, kind, settings, build):
+        """同一 kind 只保留最近一次配置对应的对象"""
+        key = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            cached = self._shared.get(kind)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        instance = build()
+        with self._lock:
+            previous = self._shared.get(kind)
+            self._shared[kind] = (key, instance)
+        if previous is not None and previous[1] is not instance:
+            self._close(previous[1])
+        return instance
+
+    def release(self, kind):
+        """配置中关闭了某一项时丢弃并关闭对应的共享对象"""
+        with self._lock:
+            previous = self._shared.pop(kind, None)
+        if previous is not None:
+            self._close(previous[1])
+
+    @staticmethod
+    def _close(instance):
+        close = getattr(instance, 'close', None)
+        if close is not None:
+            close()
+
+
+PROVIDERS = ProviderRegistry()
+
+
+def _build_provider(config, provider):
+    """按配置创建接口; providers.<接口>.credentials 可再列出多组凭据, 与主凭据轮流使用"""
     provider_settings = config.get('providers', {}).get(provider, {})
-    if provider == 'baidu':
-        appid = provider_settings.get('appid', '').strip()
-        secretkey = provider_settings.get('secretkey', '').strip()
-        if appid and secretkey:
-            return BaiduTranslator(appid, secretkey)
-    elif provider == 'deepl':
-        auth_key = provider_settings.get('auth_key', '').strip()
-        api_host = provider_settings.get('api_host', '').strip() or 'api-free.deepl.com'
-        if auth_key:
-            return DeepLTranslator(auth_key, api_host)
-    elif provider == 'youdao':
-        app_key = provider_settings.get('app_key', '').strip()
-        app_secret = provider_settings.get('app_secret', '').strip()
-        if app_key and app_secret:
-            return YoudaoTranslator(app_key, app_secret)
-    elif provider == 'papago':
-        client_id = provider_settings.get('client_id', '').strip()
-        client_secret = provider_settings.get('client_secret', '').strip()
-        if client_id and client_secret:
-            return PapagoTranslator(client_id, client_secret)
-    return None
+    credential_sets = [provider_settings]
+    for credentials in provider_settings.get('credentials') or []:
+        merged = dict(provider_settings)
+        merged.update(credentials)
+        credential_sets.append(merged)
+    instances = [PROVIDERS.create(provider, settings) for settings in credential_sets]
+    instances = [instance for instance in instances if instance is not None]
+    if not instances:
+        return None
+    rate_limits = config.get('rate_limits', {})
+    qps = rate_limits.get('qps', {}).get(provider)
+    if rate_limits.get('enabled') and qps:
+        return RateLimitedTranslator(instances, qps, rate_limits.get('burst', 1),
+                                     rate_limits.get('max_wait', DEFAULT_RATE_LIMIT_SETTINGS['max_wait']))
+    return instances[0]
+
+
+def _shared_provider(config, provider):
+    settings = [config.get('providers', {}).get(provider, {}), config.get('rate_limits', {})]
+    return PROVIDERS.shared(('provider', provider), settings, lambda: _build_provider(config, provider))
+
+
+def _with_batching(translator):
+    if translator.supports_batch:
+        return MicroBatchTranslator(translator)
+    return translator
+
+
+def _build_router(config, names):
+    providers = [_shared_provider(config, name) for name in names]
+    providers = [_with_batching(item) for item in providers if item is not None]
+    if not providers:
+        return None
+    return RoutingTranslator(providers)
+
+
+def _build_translator(config):
+    provider = config.get('provider', 'baidu')
+    if config.get('routing', {}).get('enabled'):
+        PROVIDERS.release('hedger')
+        # 选中的接口排在最前, 没有测量数据时优先使用
+        names = [provider] + [name for name in TRANSLATOR_SPECS if name != provider]
+        router = PROVIDERS.shared('router', [names, config.get('providers', {}), config.get('rate_limits', {})],
+                                  lambda: _build_router(config, names))
+        if router is not None:
+            router.start_probing()
+        return router
+    PROVIDERS.release('router')
+    translator = _shared_provider(config, provider)
+    if translator is None:
+        return None
+    translator = _with_batching(translator)
+    hedging = config.get('hedging', {})
+    if hedging.get('enabled'):
+        names = hedging.get('providers') or [name for name in TRANSLATOR_SPECS if name != provider]
+        names = [name for name in names if name != provider]
+        secondaries = [_shared_provider(config, name) for name in names]
+        secondaries = [secondary for secondary in secondaries if secondary is not None]
+        if secondaries:
+            providers = config.get('providers', {})
+            settings = [[provider] + names, {name: providers.get(name, {}) for name in [provider] + names},
+                        config.get('rate_limits', {}), hedging]
+            primary = translator
+            return PROVIDERS.shared('hedger', settings, lambda: HedgedTranslator(
+                primary, secondaries, hedging['budget_per_minute'], hedging['min_delay'], hedging['default_delay']))
+    PROVIDERS.release('hedger')
+    return translator
+
+
+def create_translator(warm_up=True, config=None):
+    if config is None:
+        config = load_config()
+    translator = _build_translator(config)
+    if translator is not None:
+        translator = single_flight = SingleFlightTranslator(translator)
+        METRICS.register_collector('single_flight', lambda: single_flight.stats)
+    else:
+        METRICS.unregister_collector('single_flight')
+    cache_settings = config.get('cache', {})
+    if translator is not None and cache_settings.get('enabled'):
+        cache = PROVIDERS.shared('cache', [CACHE_PATH, cache_settings], lambda: TranslationCache(
+            CACHE_PATH, cache_settings['max_entries'], cache_settings['disk_max_entries'], cache_settings['ttl']))
+        translator = CachedTranslator(translator, cache)
+        METRICS.register_collector('cache', lambda: cache.stats)
+    else:
+        PROVIDERS.release('cache')
+        METRICS.unregister_collector('cache')
+    if translator is not None:
+        translator = LanguageDetectingTranslator(translator)
+    if translator is not None and config.get('phrasebook', {}).get('enabled'):
+        phrasebook = Phrasebook(load_phrasebook())
+        translator = PhrasebookTranslator(translator, phrasebook)
+        METRICS.register_collector('phrasebook', lambda: phrasebook.stats)
+    else:
+        # 关闭的层不再出现在导出的统计里, 也不再持有旧对象
+        METRICS.unregister_collector('phrasebook')
+    if translator is not None and warm_up:
+        # 在后台提前建立连接, 第一条消息只需要一次往返
+        threading.Thread(target=translator.warm_up, daemon=True).start()
+    return translator
+
+
+class SwappableTranslator(TranslatorWrapper):
+    """界面持有的翻译入口; 配置变化时整体替换内部的翻译链
+
+    替换只是一次引用赋值, 已在进行中的请求继续使用旧的翻译链完成,
+    配置未变的接口对象(连接、限速、缓存)通过 PROVIDERS.shared 原样复用。
+    """
+
+    def __init__(self, config_service=None, warm_up=True):
+        super().__init__(None)
+        self.config_service = config_service or CONFIG_SERVICE
+        self.warm_up_on_swap = warm_up
+        self.version = None
+        self.swaps = 0
+        self.reload()
+
+    def __bool__(self):
+        return self.translator is not None
+
+    @property
+    def provider(self):
+        return self.config_service.get().get('provider', '')
+
+    @property
+    def label(self):
+        provider = self.provider
+        return TRANSLATOR_SPECS.get(provider, {}).get('label', provider)
+
+    def reload(self, force=False):
+        """配置文件有变化(或 force)时重建翻译链并替换, 返回是否替换"""
+        config = self.config_service.get()
+        if not force and self.version == self.config_service.version:
+            return False
+        self.translator = create_translator(warm_up=self.warm_up_on_swap, config=config)
+        self.version = self.config_service.version
+        self.swaps += 1
+        return True
+
+    def warm_up(self):
+        translator = self.translator
+        return translator is not None and translator.warm_up()
+
+    def trans(self, src_text, fromLang='auto', toLang='zh'):
+        translator = self.translator
+        if translator is None:
+            return '翻译失败!'
+        return translator.trans(src_text, fromLang=fromLang, toLang=toLang)
+
+    def trans_batch(self, texts, fromLang='auto', toLang='zh'):
+        translator = self.translator
+        if translator is None:
+            return ['翻译失败!'] * len(texts)
+        return translator.trans_batch(texts, fromLang=fromLang, toLang=toLang)
@@ -1,6 +1,7 @@
 import win32gui
-import re
+import win32process
 import random
+from lang_detect import HANGUL_PATTERN
 
 def switch_window(window_title):
     def enum_windows_proc(hwnd, window_title):
@@ -30,9 +31,28 @@ def window_exists(window_title):
     return found
 
 
+def get_window_pid(window_title):
+    pid = None
+
+    def enum_windows_proc(hwnd, _):
+        nonlocal pid
+        if win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd):
+            window_text = win32gui.GetWindowText(hwnd)
+            if window_text.startswith(window_title):
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                return False
+        return True
+
+    try:
+        win32gui.EnumWindows(enum_windows_proc, None)
+    except win32gui.error:
+        # 回调返回 False 提前结束枚举时 EnumWindows 会报错
+        pass
+    return pid
+
+
 def contains_korean(text):
-    korean_pattern = re.compile('[\uAC00-\uD7AF\u3130-\u318F\u1100-\u11FF]')
-    return bool(korean_pattern.search(text))
+    return bool(HANGUL_PATTERN.search(text))
 
 
 def generate_random_string(length):
@@ -0,0 +1,41 @@
+import pathlib
+import sys
+
+import pytest
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src import lang_detect  # noqa: E402
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("한타 가자", "kor"),
+    ("ㅋㅋㅋ", "kor"),
+    ("gg 한타 ㄱㄱ", "kor"),
+    ("我们去打团", "zh"),
+    ("今日はありがとう", "jp"),
+    ("good game", "en"),
+    ("ok 好的", "zh"),
+    ("12345", None),
+    ("!!! ??? ...", None),
+    ("\U0001F602\U0001F44D", None),
+    ("", None),
+])
+def test_detect_language(text, expected):
+    assert lang_detect.detect_language(text) == expected
+
+
+def test_script_histogram_ignores_digits_and_punctuation():
+    assert lang_detect.script_histogram("미아 3명!! ok") == {"hangul": 3, "kana": 0, "han": 0, "latin": 2}
+
+
+@pytest.mark.parametrize("text, to_lang, expected", [
+    ("백 백", "zh", True),
+    ("回城", "zh", False),
+    ("123 :)", "zh", False),
+    ("回城", "kor", True),
+])
+def test_needs_translation(text, to_lang, expected):
+    assert lang_detect.needs_translation(text, to_lang) is expected
@@ -1,7 +1,8 @@
 import importlib
+import multiprocessing
 import pathlib
 import sys
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
 import pytest
 
@@ -10,21 +11,36 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 
+def _null_backend(module):
+    class NullBackend(module.ProcessMemoryBackend):
+        """Backend without any memory, so no test can reach a real process."""
+
+        def open_process(self, pid):
+            return pid
+
+        def close_process(self, handle):
+            return True
+
+        def iter_region_info(self, handle):
+            return iter(())
+
+        def read_into(self, handle, address, buffer, size):
+            return 0
+
+    return NullBackend
+
+
 @pytest.fixture
 def memory_utils():
-    """Import memory_utils with kernel32 mocked to work on non-Windows systems."""
+    """Import memory_utils on any OS with a fake process-memory backend installed."""
     if "src.memory_utils" in sys.modules:
         del sys.modules["src.memory_utils"]
 
     sys.modules.setdefault("psutil", Mock())
-
-    with patch("ctypes.WinDLL", create=True) as win_dll_mock:
-        kernel32_mock = Mock()
-        kernel32_mock.VirtualQueryEx = Mock(return_value=0)
-        win_dll_mock.return_value = kernel32_mock
-        module = importlib.import_module("src.memory_utils")
-
-    return module
+    module = importlib.import_module("src.memory_utils")
+    module.set_backend(_null_backend(module)())
+    yield module
+    module.set_backend(None)
 
 
 def _install_fake_reader(monkeypatch, module, memory_bytes):
@@ -76,3 +92,788 @@ def test_read_string_unknown_encoding_fallback(memory_utils, monkeypatch):
     result = memory_utils.read_string(None, base_address, max_length=len(encoded), encoding_format="unknown-encoding")
 
     assert result == text
+
+
+def _install_counting_reader(monkeypatch, module, memory_bytes, readable_end=None):
+    """Fake reader that counts backend calls and fails reads past ``readable_end``."""
+    calls = []
+
+    def fake_read(_handle, address, size):
+        calls.append((address, size))
+        if readable_end is not None and address + size > readable_end:
+            return None
+        chunk = memory_bytes[address:address + size]
+        return chunk + b"\x00" * (size - len(chunk))
+
+    monkeypatch.setattr(module, "read_process_memory", fake_read)
+    monkeypatch.setattr(module, "read_process_memory_batch",
+                        lambda handle, requests: [fake_read(handle, address, size) for address, size in requests])
+    return calls
+
+
+def _read_string_per_char(module, address, max_length, encoding_format):
+    """Reference implementation of the original one-call-per-character reader."""
+    char_width = module._get_char_width(encoding_format)
+    terminator = b"\x00" * char_width
+    buffer = bytearray()
+    for step in range(max_length // char_width):
+        chunk = module.read_process_memory(None, address + step * char_width, char_width)
+        if not chunk or len(chunk) < char_width or chunk == terminator:
+            break
+        buffer.extend(chunk)
+    return buffer.decode(encoding_format, errors="ignore")
+
+
+def test_read_string_uses_single_backend_call(memory_utils, monkeypatch):
+    encoded = "팀원 채팅".encode("utf-16-le") + b"\x00\x00" + b"junk"
+    calls = _install_counting_reader(monkeypatch, memory_utils, encoded)
+
+    result = memory_utils.read_string(None, 0, max_length=200, encoding_format="utf-16-le")
+
+    assert result == "팀원 채팅"
+    assert calls == [(0, 200)]
+
+
+def test_read_string_ignores_misaligned_terminator(memory_utils, monkeypatch):
+    # "AĀ" encodes to 41 00 00 01, which contains a NUL pair straddling two characters.
+    encoded = "AĀ".encode("utf-16-le") + b"\x00\x00"
+    _install_counting_reader(monkeypatch, memory_utils, encoded)
+
+    result = memory_utils.read_string(None, 0, max_length=len(encoded), encoding_format="utf-16-le")
+
+    assert result == "AĀ"
+
+
+@pytest.mark.parametrize("encoding_format", ["utf-8", "utf-16-le"])
+@pytest.mark.parametrize("start_offset", [1, 2, 7])
+def test_read_string_partial_read_at_page_boundary(memory_utils, monkeypatch, encoding_format, start_offset):
+    page_size = memory_utils.PAGE_SIZE
+    address = page_size - start_offset
+    memory_bytes = bytearray(b"\x00" * address) + ("가나다라마바사" * 4).encode(encoding_format)
+    calls = _install_counting_reader(monkeypatch, memory_utils, bytes(memory_bytes), readable_end=page_size)
+
+    expected = _read_string_per_char(memory_utils, address, 100, encoding_format)
+    calls.clear()
+    result = memory_utils.read_string(None, address, max_length=100, encoding_format=encoding_format)
+
+    assert result == expected
+    # One failed bulk read, then at most one read per touched page.
+    assert len(calls) <= 3
+
+
+def test_read_string_without_limit_reads_by_page(memory_utils, monkeypatch):
+    text = "a" * (memory_utils.PAGE_SIZE + 10)
+    encoded = text.encode("utf-8") + b"\x00"
+    calls = _install_counting_reader(monkeypatch, memory_utils, encoded)
+
+    result = memory_utils.read_string(None, 0, max_length=None, encoding_format="utf-8")
+
+    assert result == text
+    assert len(calls) == 2
+
+
+def _install_fake_regions(monkeypatch, module, regions):
+    """Serve ``{base_address: bytes}`` regions through the region and read-into hooks."""
+    reads = []
+
+    def fake_regions(_handle):
+        for base_address in sorted(regions):
+            yield base_address, len(regions[base_address])
+
+    def fake_read_into(_handle, address, buffer, size):
+        reads.append((address, size, id(buffer)))
+        for base_address, data in regions.items():
+            if base_address <= address and address + size <= base_address + len(data):
+                start = address - base_address
+                buffer[:size] = data[start:start + size]
+                return size
+        return 0
+
+    monkeypatch.setattr(module, "iter_memory_regions", fake_regions)
+    monkeypatch.setattr(module, "read_process_memory_into", fake_read_into)
+    return reads
+
+
+def _naive_scan(regions, pattern):
+    found = []
+    for base_address in sorted(regions):
+        data = regions[base_address]
+        pos = data.find(pattern)
+        while pos != -1:
+            found.append(base_address + pos)
+            pos = data.find(pattern, pos + 1)
+    return found
+
+
+def test_scan_memory_bytes_streams_in_bounded_windows(memory_utils, monkeypatch):
+    pattern = "1234567890".encode("utf-16-le")
+    first = bytearray(b"\xaa" * 5000)
+    # Matches straddling every window boundary for a 64-byte window, plus overlapping ones.
+    for pos in (0, 50, 60, 120, 127, 4980):
+        first[pos:pos + len(pattern)] = pattern
+    regions = {0x10000: bytes(first), 0x20000: b"\xbb" * 30 + pattern + pattern}
+    reads = _install_fake_regions(monkeypatch, memory_utils, regions)
+
+    result = memory_utils.scan_memory_bytes(None, pattern, window_size=64)
+
+    assert result == _naive_scan(regions, pattern)
+    assert all(size <= 64 for _, size, _ in reads)
+    assert len({buffer_id for _, _, buffer_id in reads}) == 1
+
+
+def test_iter_scan_memory_bytes_is_lazy(memory_utils, monkeypatch):
+    pattern = b"needle"
+    regions = {0x1000: b"needle" + b"\x00" * 200, 0x9000: b"\x00" * 200 + b"needle"}
+    reads = _install_fake_regions(monkeypatch, memory_utils, regions)
+
+    scanner = memory_utils.iter_scan_memory_bytes(None, pattern, window_size=64)
+
+    assert next(scanner) == 0x1000
+    assert [address for address, _, _ in reads] == [0x1000]
+    assert list(scanner) == [0x9000 + 200]
+
+
+def test_scan_memory_bytes_skips_unreadable_region(memory_utils, monkeypatch):
+    regions = {0x1000: b"\x00needle"}
+    _install_fake_regions(monkeypatch, memory_utils, regions)
+    monkeypatch.setattr(memory_utils, "read_process_memory_into", lambda *_args: 0)
+
+    assert memory_utils.scan_memory_bytes(None, b"needle") == []
+
+
+def test_scan_memory_patterns_finds_all_encodings_in_one_pass(memory_utils, monkeypatch):
+    probe = "482915063771"
+    patterns = [probe.encode(encoding) for encoding in ("utf-8", "utf-16le", "utf-16")]
+    region = bytearray(b"\xcc" * 3000)
+    for pos, pattern in ((10, patterns[0]), (61, patterns[1]), (500, patterns[2]), (2990, patterns[0][:5])):
+        region[pos:pos + len(pattern)] = pattern
+    regions = {0x40000: bytes(region), 0x80000: b"\x00" * 40 + patterns[0]}
+    reads = _install_fake_regions(monkeypatch, memory_utils, regions)
+
+    found = memory_utils.scan_memory_patterns(None, patterns, window_size=64)
+
+    # The utf-16 pattern is the BOM plus the utf-16le pattern, so both match at overlapping offsets.
+    assert found == {pattern: _naive_scan(regions, pattern) for pattern in patterns}
+    assert found[patterns[1]] == [0x40000 + 61, 0x40000 + 502]
+    assert reads == sorted(set(reads))
+
+
+def test_scan_memory_patterns_accepts_a_generator(memory_utils, monkeypatch):
+    regions = {0x1000: b"\x00abc\x00abcd"}
+    _install_fake_regions(monkeypatch, memory_utils, regions)
+
+    found = memory_utils.scan_memory_patterns(None, (pattern for pattern in (b"abc", b"abcd")))
+
+    assert found == {b"abc": [0x1001, 0x1005], b"abcd": [0x1005]}
+
+
+def test_scan_memory_patterns_rejects_empty_pattern_set(memory_utils):
+    with pytest.raises(ValueError):
+        memory_utils.scan_memory_patterns(None, [b""])
+
+
+def test_candidate_set_refine_reads_candidates_by_page(memory_utils, monkeypatch):
+    page_size = memory_utils.PAGE_SIZE
+    memory_bytes = bytearray(b"\x00" * (3 * page_size))
+    addresses = [16, 400, 900, page_size + 32, 2 * page_size + 8]
+    for address in addresses:
+        memory_bytes[address:address + 4] = b"1111"
+    calls = _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    candidates = memory_utils.CandidateSet(None, addresses)
+
+    memory_bytes[400:404] = b"2222"
+    memory_bytes[page_size + 32:page_size + 36] = b"2222"
+    remaining = candidates.refine(b"2222")
+
+    assert remaining == 2
+    assert list(candidates) == [400, page_size + 32]
+    assert len(calls) == 3
+
+
+def test_candidate_set_refine_falls_back_to_single_reads(memory_utils, monkeypatch):
+    page_size = memory_utils.PAGE_SIZE
+    memory_bytes = b"\x00" * 8 + b"abcd" + b"\x00" * (page_size - 12) + b"ab"
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes, readable_end=page_size)
+    candidates = memory_utils.CandidateSet(None, [8, page_size - 2])
+
+    assert candidates.refine(b"abcd") == 1
+    assert 8 in candidates
+
+
+def test_candidate_set_changed_and_unchanged(memory_utils, monkeypatch):
+    memory_bytes = bytearray(b"aaaabbbbccccdddd")
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    candidates = memory_utils.CandidateSet(None, [0, 4, 8, 12])
+
+    with pytest.raises(ValueError):
+        candidates.refine_changed()
+
+    candidates.take_snapshot(4)
+    memory_bytes[4:8] = b"BBBB"
+    memory_bytes[8:12] = b"CCCC"
+    assert candidates.refine_changed() == 2
+    assert list(candidates) == [4, 8]
+
+    memory_bytes[8:12] = b"cccc"
+    assert candidates.refine_unchanged() == 1
+    assert list(candidates) == [4]
+
+
+def test_split_regions_balances_bytes_with_overlap(memory_utils):
+    regions = [(0x10000, 10000), (0x40000, 100)]
+
+    chunks = memory_utils._split_regions(regions, overlap=3, parts=4)
+
+    assert len(chunks) == 3
+    covered = [piece for chunk in chunks for piece in chunk]
+    assert covered[0] == (0x10000, 4096 + 3)
+    assert covered[-1] == (0x40000, 100)
+    # Every byte of every region is covered by at least one piece.
+    for base_address, region_size in regions:
+        pieces = sorted(piece for piece in covered if base_address <= piece[0] < base_address + region_size)
+        end = base_address
+        for piece_base, piece_size in pieces:
+            assert piece_base <= end
+            end = max(end, piece_base + piece_size)
+        assert end == base_address + region_size
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parallel_scan_matches_sequential_scan(memory_utils, monkeypatch, workers):
+    pattern = b"probe-123"
+    region = bytearray(b"\x11" * 20000)
+    for pos in range(0, 20000 - len(pattern), 997):
+        region[pos:pos + len(pattern)] = pattern
+    regions = {0x100000: bytes(region), 0x200000: pattern * 3}
+    _install_fake_regions(monkeypatch, memory_utils, regions)
+
+    expected = memory_utils.scan_memory_bytes(None, pattern, window_size=256)
+    result = memory_utils.parallel_scan_memory_bytes(None, pattern, workers=workers, window_size=256,
+                                                     processes=False)
+    multi = memory_utils.parallel_scan_memory_patterns(None, [pattern, b"\x11\x11"], workers=workers,
+                                                       window_size=256, processes=False)
+
+    assert result == expected == _naive_scan(regions, pattern)
+    assert multi[pattern] == expected
+    assert multi[b"\x11\x11"] == _naive_scan(regions, b"\x11\x11")
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="worker processes need the psutil stand-in the fixture installs")
+def test_parallel_scan_searches_shared_windows_in_worker_processes(memory_utils, monkeypatch):
+    pattern = b"needle"
+    regions = {0x1000: b"\x00" * 5000 + pattern, 0x9000: pattern + b"\x00" * 300 + pattern[:3],
+               0x20000: (b"\x22" * 61 + pattern) * 40}
+    reads = _install_fake_regions(monkeypatch, memory_utils, regions)
+    created = []
+    shared_memory = memory_utils.shared_memory.SharedMemory
+
+    def tracking_shared_memory(*args, **kwargs):
+        block = shared_memory(*args, **kwargs)
+        created.append(block.name)
+        return block
+
+    monkeypatch.setattr(memory_utils.shared_memory, "SharedMemory", tracking_shared_memory)
+    try:
+        result = memory_utils.parallel_scan_memory_bytes(None, pattern, workers=2, window_size=128)
+        first_reads = list(reads)
+        multi = memory_utils.parallel_scan_memory_patterns(None, [pattern, b"\x22\x22"], workers=2,
+                                                           window_size=128)
+    finally:
+        memory_utils.shutdown_scan_executors()
+
+    assert result == _naive_scan(regions, pattern)
+    assert multi[pattern] == result
+    assert multi[b"\x22\x22"] == _naive_scan(regions, b"\x22\x22")
+    # 内存只由父进程读取一次, 每个窗口只读一次
+    assert len(first_reads) == len(set((address, size) for address, size, _ in first_reads))
+    # 扫描结束后共享内存全部释放; 每个工作进程两个窗口轮换
+    assert len(created) == 2 * 2 * 2
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory(name=name)
+
+
+def test_parallel_scan_reuses_its_thread_pool(memory_utils, monkeypatch):
+    _install_fake_regions(monkeypatch, memory_utils, {0x1000: b"\x00needle" * 50})
+
+    memory_utils.parallel_scan_memory_bytes(None, b"needle", workers=2, processes=False)
+    executor = memory_utils._get_executor(False, 2)
+    memory_utils.parallel_scan_memory_bytes(None, b"needle", workers=2, processes=False)
+
+    assert memory_utils._get_executor(False, 2) is executor
+    memory_utils.shutdown_scan_executors()
+    assert memory_utils._get_executor(False, 2) is not executor
+    memory_utils.shutdown_scan_executors()
+
+
+def _install_fake_process(monkeypatch, module, allocations, protect=None):
+    """Serve ``{allocation_base: bytes}`` as one committed RW region each, readable with read_process_memory."""
+    protect = module.PAGE_READWRITE if protect is None else protect
+
+    def fake_region_info(_handle):
+        for allocation_base in sorted(allocations):
+            yield allocation_base, allocation_base, len(allocations[allocation_base]), protect
+
+    def fake_read(_handle, address, size):
+        for allocation_base, data in allocations.items():
+            if allocation_base <= address and address + size <= allocation_base + len(data):
+                return bytes(data[address - allocation_base:address - allocation_base + size])
+        return None
+
+    monkeypatch.setattr(module, "iter_memory_region_info", fake_region_info)
+    monkeypatch.setattr(module, "read_process_memory", fake_read)
+
+
+def _chat_allocation(own_base, other_base, text):
+    header = bytearray(b"CHATHDR\x01" + b"\x07" * 24)
+    header += other_base.to_bytes(8, "little") + (own_base + 0x10).to_bytes(8, "little")
+    header += b"\x10\x00\x00\x00" * 4
+    data = bytearray(b"\x00" * 0x200)
+    data[0x100 - len(header):0x100] = header
+    data[0x100:0x100 + len(text)] = text
+    return data
+
+
+def test_address_signature_relocates_after_restart(memory_utils, monkeypatch, tmp_path):
+    _install_fake_process(monkeypatch, memory_utils, {
+        0x10000: _chat_allocation(0x10000, 0x50000, "첫 실행".encode("utf-16-le")),
+        0x50000: bytearray(b"\x01" * 0x400),
+    })
+    signature = memory_utils.build_address_signature(None, 0x10100, "utf-16-le")
+    path = tmp_path / "chat_signature.json"
+    memory_utils.save_address_signature(str(path), signature)
+
+    # Pointers in the header change with the new layout but are masked out.
+    _install_fake_process(monkeypatch, memory_utils, {
+        0x20000: bytearray(b"\x02" * 0x200),
+        0x70000: _chat_allocation(0x70000, 0x20000, b""),
+        0x90000: bytearray(b"\x00" * 0x200),
+    })
+    loaded = memory_utils.load_address_signature(str(path))
+
+    assert loaded == signature
+    assert memory_utils.resolve_address_signature(None, loaded) == 0x70100
+
+
+def test_address_signature_tolerates_region_size_and_protection_changes(memory_utils, monkeypatch):
+    _install_fake_process(monkeypatch, memory_utils, {
+        0x10000: _chat_allocation(0x10000, 0x50000, b"a"),
+        0x50000: bytearray(b"\x01" * 0x400),
+    })
+    signature = memory_utils.build_address_signature(None, 0x10100, "utf-8")
+
+    grown = _chat_allocation(0x40000, 0x10000, b"") + bytearray(0x1000)
+    _install_fake_process(monkeypatch, memory_utils, {0x40000: grown},
+                          protect=memory_utils.PAGE_EXECUTE_READWRITE)
+    assert memory_utils.resolve_address_signature(None, signature) == 0x40100
+
+    # Two matching allocations: the one with the recorded region size wins the tie.
+    _install_fake_process(monkeypatch, memory_utils, {
+        0x40000: grown,
+        0x80000: _chat_allocation(0x80000, 0x40000, b""),
+    }, protect=memory_utils.PAGE_WRITECOPY)
+    assert memory_utils.resolve_address_signature(None, signature) == 0x80100
+
+
+def test_address_signature_rejects_ambiguous_or_missing_match(memory_utils, monkeypatch, tmp_path):
+    _install_fake_process(monkeypatch, memory_utils, {0x10000: _chat_allocation(0x10000, 0x10000, b"a")})
+    signature = memory_utils.build_address_signature(None, 0x10100, "utf-8")
+
+    _install_fake_process(monkeypatch, memory_utils, {
+        0x30000: _chat_allocation(0x30000, 0x30000, b""),
+        0x60000: _chat_allocation(0x60000, 0x30000, b""),
+    })
+    assert memory_utils.resolve_address_signature(None, signature) is None
+
+    _install_fake_process(monkeypatch, memory_utils, {0x30000: bytearray(b"\x00" * 0x200)})
+    assert memory_utils.resolve_address_signature(None, signature) is None
+    assert memory_utils.load_address_signature(str(tmp_path / "missing.json")) is None
+
+
+def test_address_signature_refuses_featureless_context(memory_utils, monkeypatch):
+    _install_fake_process(monkeypatch, memory_utils, {0x10000: bytearray(b"\x00" * 0x200)})
+
+    assert memory_utils.build_address_signature(None, 0x10100, "utf-8") is None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="process_vm_readv is Linux only")
+def test_linux_backend_reads_own_process(memory_utils):
+    import ctypes
+    import os
+
+    backend = memory_utils.LinuxBackend()
+    handle = backend.open_process(os.getpid())
+    payload = ctypes.create_string_buffer("채팅 기록".encode("utf-16-le") + b"\x00\x00", 64)
+    address = ctypes.addressof(payload)
+
+    region = next(info for info in backend.iter_region_info(handle) if info[0] <= address < info[0] + info[2])
+    assert region[3] & memory_utils.PAGE_READWRITE
+
+    buffer = bytearray(16)
+    assert backend.read_into(handle, address, buffer, 4) == 4
+    assert buffer[:4] == payload.raw[:4]
+    assert backend.read(handle, 0, 8) is None
+
+    results = backend.read_scatter(handle, [(address, 4), (0, 8), (address + 2, 6), (8, 1)])
+    assert results == [payload.raw[:4], None, payload.raw[2:8], None]
+
+    memory_utils.set_backend(backend)
+    try:
+        assert memory_utils.read_string(handle, address, 64, "utf-16-le") == "채팅 기록"
+        assert memory_utils.read_process_memory_batch(handle, [(address, 2)]) == [payload.raw[:2]]
+    finally:
+        memory_utils.set_backend(None)
+
+
+def test_read_process_memory_batch_falls_back_to_single_reads(memory_utils, monkeypatch):
+    class FailingScatterBackend(_null_backend(memory_utils)):
+        def read_into(self, handle, address, buffer, size):
+            buffer[:size] = bytes(range(address, address + size))
+            return size
+
+        def read_scatter(self, handle, requests):
+            raise OSError("scatter read unavailable")
+
+    monkeypatch.setattr(memory_utils, "_backend", FailingScatterBackend())
+
+    assert memory_utils.read_process_memory_batch(None, [(1, 2), (5, 1)]) == [b"\x01\x02", b"\x05"]
+
+
+def test_memory_snapshot_round_trip_through_replay_backend(memory_utils, monkeypatch, tmp_path):
+    page_size = memory_utils.PAGE_SIZE
+    chat = "한타 가자".encode("utf-16-le") + b"\x00\x00"
+    allocations = {
+        0x10000: bytearray(b"\x00" * 100 + b"probe" + b"\x00" * 3000),
+        0x20000: bytearray(b"\x00" * (2 * page_size)),
+    }
+    allocations[0x20000][page_size - 4:page_size - 4 + len(chat)] = chat
+    _install_fake_process(monkeypatch, memory_utils, allocations)
+    readonly = (0x30000, 0x30000, page_size, memory_utils.PAGE_READONLY)
+    fake_region_info = memory_utils.iter_memory_region_info
+    monkeypatch.setattr(memory_utils, "iter_memory_region_info", lambda handle: [*fake_region_info(handle), readonly])
+
+    def fake_read_into(handle, address, buffer, size):
+        data = memory_utils.read_process_memory(handle, address, size)
+        if data is None:
+            return 0
+        buffer[:size] = data
+        return size
+
+    monkeypatch.setattr(memory_utils, "read_process_memory_into", fake_read_into)
+    path = tmp_path / "game.snap"
+
+    assert memory_utils.capture_memory_snapshot(None, str(path), window_size=1024) == 2
+    monkeypatch.undo()
+
+    backend = memory_utils.ReplayBackend(str(path))
+    memory_utils.set_backend(backend)
+    try:
+        assert [info[:3] for info in backend.iter_region_info(None)] == [
+            (0x10000, 0x10000, 3105), (0x20000, 0x20000, 2 * page_size)]
+        assert backend.read(None, 0x20000 + 2 * page_size - 2, 4) is None
+        assert bytes(backend.view(0x10000 + 100, 5)) == b"probe"
+        assert memory_utils.scan_memory_bytes(None, b"probe") == [0x10000 + 100]
+        assert memory_utils.read_string(None, 0x20000 + page_size - 4, 200, "utf-16-le") == "한타 가자"
+    finally:
+        memory_utils.set_backend(None)
+        backend.close()
+
+
+def test_backend_interface_is_abstract(memory_utils, monkeypatch):
+    with pytest.raises(TypeError):
+        memory_utils.ProcessMemoryBackend()
+
+    monkeypatch.setattr(memory_utils.sys, "platform", "darwin")
+    with pytest.raises(OSError):
+        memory_utils.create_default_backend()
+
+
+def test_replay_backend_rejects_foreign_file(memory_utils, tmp_path):
+    path = tmp_path / "not-a-snapshot.bin"
+    path.write_bytes(b"\x00" * 64)
+
+    with pytest.raises(ValueError):
+        memory_utils.ReplayBackend(str(path))
+
+
+def _write_slot(memory_bytes, address, text, encoding_format="utf-16-le"):
+    encoded = text.encode(encoding_format) + b"\x00\x00"
+    memory_bytes[address:address + len(encoded)] = encoded
+
+
+def test_chat_history_watcher_emits_every_new_message_in_ring_order(memory_utils, monkeypatch):
+    memory_bytes = bytearray(b"\x00" * 0x1000)
+    calls = _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    watcher = memory_utils.ChatHistoryWatcher(None, 0x100, 0x40, 4, "utf-16-le", last_slot=2)
+
+    assert watcher.poll() == []
+    # Two messages in the same tick, the second one wrapping around to slot 0.
+    _write_slot(memory_bytes, 0x100 + 3 * 0x40, "ㄱㄱ")
+    _write_slot(memory_bytes, 0x100, "한타 ㄱ")
+    calls.clear()
+
+    assert watcher.poll() == [(3, "ㄱㄱ"), (0, "한타 ㄱ")]
+    assert len(calls) == 1
+    assert watcher.poll() == []
+
+
+def test_chat_history_watcher_emits_repeated_line_in_unchanged_slot(memory_utils, monkeypatch):
+    memory_bytes = bytearray(b"\x00" * 0x1000)
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    for index, text in enumerate(["ㄱㄱ", "미아", "한타", "ㄱㄱ"]):
+        _write_slot(memory_bytes, 0x100 + index * 0x40, text)
+    watcher = memory_utils.ChatHistoryWatcher(None, 0x100, 0x40, 4, "utf-16-le", last_slot=3)
+    assert watcher.poll() == []
+
+    # A teammate repeats the line already held by the next slot, then writes a new one.
+    _write_slot(memory_bytes, 0x100, "ㄱㄱ")
+    _write_slot(memory_bytes, 0x100 + 0x40, "백")
+    assert watcher.poll() == [(0, "ㄱㄱ"), (1, "백")]
+
+    # A repeat that is the last write of a poll is reported once the next message lands.
+    _write_slot(memory_bytes, 0x100 + 2 * 0x40, "한타")
+    assert watcher.poll() == []
+    _write_slot(memory_bytes, 0x100 + 3 * 0x40, "힐 부탁")
+    assert watcher.poll() == [(2, "한타"), (3, "힐 부탁")]
+
+
+def test_discover_chat_history_finds_slot_array(memory_utils, monkeypatch):
+    base_address, stride = 0x2000, 0x80
+    memory_bytes = bytearray(b"\xee" * 0x4000)
+    for index in range(-2, 6):
+        memory_bytes[base_address + index * stride:base_address + (index + 1) * stride] = b"\x00" * stride
+    probes = ["111111", "222222", "333333"]
+    _write_slot(memory_bytes, base_address - stride, "이전 메시지")
+    for index, probe in enumerate(probes):
+        _write_slot(memory_bytes, base_address + index * stride, probe)
+    # The latest-message buffer the calibration found holds only the last probe.
+    _write_slot(memory_bytes, 0x3800, probes[-1])
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    _install_fake_regions(monkeypatch, memory_utils, {0: bytes(memory_bytes)})
+
+    watcher = memory_utils.discover_chat_history(None, probes, "utf-16-le")
+
+    assert watcher.base_address == base_address - 2 * stride
+    assert (watcher.slot_stride, watcher.slot_count, watcher.last_slot) == (stride, 8, 4)
+    assert watcher.poll() == []
+    _write_slot(memory_bytes, base_address + 3 * stride, "미아 조심")
+    assert watcher.poll() == [(5, "미아 조심")]
+
+
+def test_discover_chat_history_reuses_calibration_hits(memory_utils, monkeypatch):
+    base_address, stride = 0x400, 0x80
+    memory_bytes = bytearray(b"\xee" * 0x2000)
+    memory_bytes[base_address:base_address + 4 * stride] = b"\x00" * (4 * stride)
+    probes = ["111111", "222222", "333333"]
+    for index, probe in enumerate(probes):
+        _write_slot(memory_bytes, base_address + index * stride, probe)
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+
+    def no_sweep(_handle):
+        raise AssertionError("discover_chat_history must not sweep memory again")
+
+    monkeypatch.setattr(memory_utils, "iter_memory_regions", no_sweep)
+
+    watcher = memory_utils.discover_chat_history(None, probes, "utf-16-le", first_hits=[0x1800, base_address])
+
+    assert (watcher.base_address, watcher.slot_stride, watcher.slot_count) == (base_address, stride, 4)
+
+
+def test_discover_chat_history_without_slot_array(memory_utils, monkeypatch):
+    memory_bytes = bytearray(b"\x00" * 0x1000)
+    _write_slot(memory_bytes, 0x100, "111111")
+    _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+    _install_fake_regions(monkeypatch, memory_utils, {0: bytes(memory_bytes)})
+
+    assert memory_utils.discover_chat_history(None, ["111111", "222222"], "utf-16-le") is None
+
+
+def test_read_int_and_float_return_none_on_failed_read(memory_utils, monkeypatch):
+    monkeypatch.setattr(memory_utils, "read_process_memory", lambda *_args: None)
+
+    assert memory_utils.read_int(None, 0x1000) is None
+    assert memory_utils.read_float(None, 0x1000) is None
+
+
+def _chat_entry_layout(memory_utils):
+    return memory_utils.StructLayout([
+        ("sender", memory_utils.TextField(16, "utf-16-le")),
+        ("channel", "<u4"),
+        ("timestamp", "f8", 24),
+        ("text", memory_utils.PointerField(memory_utils.TextField(64, "utf-16-le"))),
+        ("length", "H"),
+    ], size=48)
+
+
+def _pack_chat_entry(sender, channel, timestamp, text_address, length):
+    import struct
+
+    return struct.pack("<16sI4xdQH6x", sender.encode("utf-16-le"), channel, timestamp, text_address, length)
+
+
+def test_struct_layout_reads_record_in_one_call(memory_utils, monkeypatch):
+    layout = _chat_entry_layout(memory_utils)
+    memory_bytes = bytearray(b"\x00" * 0x400)
+    memory_bytes[0x100:0x130] = _pack_chat_entry("미드", 2, 12.5, 0x300, 4)
+    _write_slot(memory_bytes, 0x300, "백 백")
+    calls = _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+
+    record = layout.read(None, 0x100)
+
+    assert layout.size == 48
+    assert (record["sender"], record["channel"], record["timestamp"], record["length"]) == ("미드", 2, 12.5, 4)
+    assert int(record["text"]) == 0x300
+    assert calls == [(0x100, 48)]
+    assert record["text"].get() == "백 백"
+    assert record["text"].get() == "백 백"
+    assert len(calls) == 2
+
+
+def test_struct_layout_reads_record_array(memory_utils, monkeypatch):
+    layout = _chat_entry_layout(memory_utils)
+    nested = memory_utils.StructLayout([("entry", memory_utils.PointerField(layout)), ("count", "I")])
+    memory_bytes = bytearray(b"\x00" * 0x400)
+    for index, sender in enumerate(["탱커", "힐러", "딜러"]):
+        memory_bytes[index * 64:index * 64 + 48] = _pack_chat_entry(sender, index, 0.0, 0, 0)
+    memory_bytes[0x200:0x20c] = (64).to_bytes(8, "little") + (3).to_bytes(4, "little")
+    calls = _install_counting_reader(monkeypatch, memory_utils, memory_bytes)
+
+    records = layout.read_array(None, 0, 3, stride=64)
+    header = nested.read(None, 0x200)
+
+    assert [(record["sender"], record["channel"]) for record in records] == [("탱커", 0), ("힐러", 1), ("딜러", 2)]
+    assert records[0]["text"].get() is None
+    assert calls[0] == (0, 64 * 2 + 48)
+    assert header["entry"].get()["sender"] == "힐러"
+
+
+@pytest.mark.parametrize("fields", [
+    [("a", "I"), ("b", "H", 2)],
+    [("a", "2I")],
+    [("a", ">u4")],
+    [("a", "nonsense")],
+])
+def test_struct_layout_rejects_invalid_fields(memory_utils, fields):
+    with pytest.raises(ValueError):
+        memory_utils.StructLayout(fields)
+
+
+class _FakeProcessBackend:
+    def __init__(self):
+        self.alive = set()
+        self.opened = []
+        self.closed = []
+
+    def open_process(self, pid):
+        if pid not in self.alive:
+            raise ProcessLookupError(pid)
+        handle = 1000 + len(self.opened)
+        self.opened.append((pid, handle))
+        return handle
+
+    def close_process(self, handle):
+        self.closed.append(handle)
+        return True
+
+    def is_process_alive(self, handle):
+        return any(pid in self.alive for pid, opened in self.opened if opened == handle)
+
+
+def test_attach_manager_reattaches_after_restart(memory_utils, monkeypatch):
+    backend = _FakeProcessBackend()
+    monkeypatch.setattr(memory_utils, "_backend", backend)
+    lookups = []
+    clock = [100.0]
+    monkeypatch.setattr(memory_utils.time, "monotonic", lambda: clock[0])
+
+    def find_pid():
+        lookups.append(clock[0])
+        return next(iter(backend.alive), None)
+
+    manager = memory_utils.ProcessAttachManager("game.exe", pid_finder=find_pid, reattach_interval=5)
+
+    assert not manager.poll()
+    backend.alive.add(42)
+    clock[0] += 1
+    assert not manager.poll()
+    clock[0] += 5
+    assert manager.poll() and (manager.pid, manager.generation) == (42, 1)
+    for _ in range(10):
+        assert manager.poll()
+    assert len(lookups) == 2
+
+    # The game restarts: the old handle is released and a new one opened on the next attempt.
+    backend.alive = {77}
+    clock[0] += 1
+    assert not manager.poll()
+    assert backend.closed == [1000]
+    clock[0] += 5
+    assert manager.poll() and (manager.pid, manager.generation) == (77, 2)
+
+
+def test_attach_manager_handle_outlives_detach_while_borrowed(memory_utils, monkeypatch):
+    backend = _FakeProcessBackend()
+    backend.alive.add(42)
+    monkeypatch.setattr(memory_utils, "_backend", backend)
+    manager = memory_utils.ProcessAttachManager("game.exe", pid_finder=lambda: 42)
+
+    with manager.acquire() as handle:
+        manager.detach()
+        assert backend.closed == []
+    assert backend.closed == [handle]
+
+    backend.alive.clear()
+    manager = memory_utils.ProcessAttachManager("game.exe", pid_finder=lambda: None)
+    with pytest.raises(ProcessLookupError):
+        manager.acquire()
+
+
+def _naive_signature_scan(regions, values, mask):
+    found = []
+    for base_address in sorted(regions):
+        data = regions[base_address]
+        for pos in range(len(data) - len(values) + 1):
+            if all(data[pos + i] & m == v & m for i, (v, m) in enumerate(zip(values, mask))):
+                found.append(base_address + pos)
+    return found
+
+
+@pytest.mark.parametrize("pattern", [
+    "48 8B ?? ?? 00 00 C3",
+    "?? 8B 05 ?? ?? 00 00",
+    "4? 8B ?5",
+    "?? ?? C3",
+])
+def test_scan_memory_signature_matches_masked_bytes(memory_utils, monkeypatch, pattern):
+    import random
+
+    rng = random.Random(pattern)
+    region = bytearray(rng.getrandbits(8) for _ in range(3000))
+    for pos in (0, 61, 62, 500, 2990):
+        region[pos:pos + 8] = bytes([0x48, 0x8B, 0x05, rng.getrandbits(8), rng.getrandbits(8), 0, 0, 0xC3])
+    regions = {0x400000: bytes(region), 0x500000: bytes([0x48, 0x8B, 0x05, 1, 2, 0, 0, 0xC3]) * 3}
+    _install_fake_regions(monkeypatch, memory_utils, regions)
+    signature = memory_utils.ByteSignature(pattern)
+
+    result = memory_utils.scan_memory_signature(None, pattern, window_size=64)
+
+    assert result == _naive_signature_scan(regions, signature.values, signature.mask)
+    assert all(signature.matches(regions[0x500000], address - 0x500000) for address in result if address >= 0x500000)
+
+
+def test_byte_signature_compiles_longest_anchor(memory_utils):
+    signature = memory_utils.ByteSignature("48 ?? 8B 05 0D ?? C3")
+
+    assert (signature.anchor_offset, signature.anchor) == (2, b"\x8b\x05\x0d")
+    assert signature.mask == b"\xff\x00\xff\xff\xff\x00\xff"
+    assert list(signature.iter_matches(b"\x00\x48\x01\x8b\x05\x0d\x02\xc3\x48")) == [1]
+
+    explicit = memory_utils.ByteSignature(b"\x40\x8b", mask=b"\xf0\xff")
+    assert list(explicit.iter_matches(b"\x4f\x8b\x3f\x8b\x40\x8b")) == [0, 4]
+
+
+@pytest.mark.parametrize("pattern", ["", "4 8B", "GG", "48 8B 0"])
+def test_byte_signature_rejects_malformed_patterns(memory_utils, pattern):
+    with pytest.raises(ValueError):
+        memory_utils.ByteSignature(pattern)
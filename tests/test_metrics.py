@@ -0,0 +1,121 @@
+import json
+import pathlib
+import sys
+import threading
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src import metrics  # noqa: E402
+
+
+def test_histogram_summary_and_percentiles():
+    histogram = metrics.Histogram()
+    for _ in range(90):
+        histogram.record(0.001)
+    for _ in range(10):
+        histogram.record(0.5)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["min"] == 0.001
+    assert summary["max"] == 0.5
+    # 桶上界最多比实际值大 2 倍
+    assert 0.001 <= summary["p50"] < 0.002
+    assert 0.25 <= summary["p95"] <= 0.5
+    assert summary["p99"] == 0.5
+
+
+def test_histogram_handles_values_beyond_last_bucket():
+    histogram = metrics.Histogram()
+    histogram.record(1000.0)
+    assert histogram.percentile(0.5) == 1000.0
+    assert metrics.Histogram().percentile(0.5) is None
+
+
+def test_metrics_records_stages_and_counters():
+    registry = metrics.Metrics()
+    start = time.perf_counter()
+    registry.record_since("read_string", start)
+    registry.record("translate", 0.2)
+    with registry.timer("add_msg"):
+        pass
+    registry.incr("dedup")
+    registry.incr("dedup", 2)
+
+    snapshot = registry.snapshot()
+    assert set(snapshot["stages"]) == {"read_string", "translate", "add_msg"}
+    assert snapshot["stages"]["translate"]["mean"] == 0.2
+    assert snapshot["counters"] == {"dedup": 3}
+    assert registry.counter("dedup") == 3
+    assert registry.counter("translate_errors") == 0
+
+    registry.reset()
+    assert registry.snapshot()["stages"] == {}
+
+
+def test_counters_do_not_lose_concurrent_increments():
+    registry = metrics.Metrics()
+    threads = [threading.Thread(target=lambda: [registry.incr("dedup") for _ in range(5000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.counter("dedup") == 20000
+
+
+def test_disabled_metrics_record_nothing():
+    registry = metrics.Metrics(enabled=False)
+    registry.record("translate", 0.1)
+    registry.record_since("filter", time.perf_counter())
+    registry.incr("dedup")
+    snapshot = registry.snapshot()
+    assert snapshot["stages"] == {}
+    assert snapshot["counters"] == {}
+
+
+def test_collectors_are_read_at_snapshot_time():
+    registry = metrics.Metrics()
+    stats = {"memory_hits": 0}
+    registry.register_collector("cache", lambda: stats)
+    registry.register_collector("broken", lambda: 1 / 0)
+    stats["memory_hits"] = 5
+
+    collected = registry.snapshot()["collectors"]
+    assert collected["cache"] == {"memory_hits": 5}
+    assert "error" in collected["broken"]
+    registry.unregister_collector("broken")
+    assert "broken" not in registry.snapshot()["collectors"]
+
+
+def test_exporter_appends_json_lines(tmp_path):
+    registry = metrics.Metrics()
+    registry.record("translate", 0.05)
+    path = tmp_path / "metrics.jsonl"
+    exporter = metrics.MetricsExporter(registry, str(path), interval=0.01).start()
+    time.sleep(0.1)
+    exporter.stop()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) >= 2
+    assert lines[-1]["stages"]["translate"]["count"] == 1
+
+
+def test_instrumentation_overhead_per_message_is_a_few_microseconds():
+    # 每条消息大约记录 4 个阶段和 1 个计数器
+    registry = metrics.Metrics()
+    rounds = 20000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        stage_start = time.perf_counter()
+        stage_start = registry.record_since("read_string", stage_start)
+        stage_start = registry.record_since("filter", stage_start)
+        registry.record("translate", 0.08)
+        registry.record_since("add_msg", stage_start)
+        registry.incr("dedup")
+    per_message = (time.perf_counter() - start) / rounds
+    # 本机约 4us, 留出余量给慢速 CI
+    assert per_message < 20e-6
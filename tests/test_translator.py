@@ -0,0 +1,1462 @@
+import contextlib
+import http.server
+import json
+import os
+import pathlib
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+# translator 与运行时一样直接导入同目录的 lang_detect、metrics
+for path in (PROJECT_ROOT, PROJECT_ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+from src import translator  # noqa: E402
+from tools.provider_stand_in import StandInServer  # noqa: E402
+
+
+class _EchoHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 为 True 时服务端回完响应就静默关闭连接, 模拟空闲连接被对端回收
+    drop_after_response = False
+
+    def _reply(self, body):
+        self.server.requests.append((self.command, self.path, self.client_address[1]))
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        if self.drop_after_response:
+            self.close_connection = True
+
+    def do_GET(self):
+        self._reply({"trans_result": [{"dst": "你好"}]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._reply({"ok": True})
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(handler=_EchoHandler, ssl_context=None):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.requests = []
+    if ssl_context is not None:
+        server.socket = ssl_context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def server():
+    server = _start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _host(server):
+    return "127.0.0.1:%d" % server.server_address[1]
+
+
+@contextlib.contextmanager
+def _closed_port():
+    """分配一个端口后立即释放, 连接它会被拒绝"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    yield "127.0.0.1:%d" % port
+
+
+def test_pool_reuses_keep_alive_connection(server):
+    pool = translator.ConnectionPool()
+    for _ in range(3):
+        status, payload = pool.request("http", _host(server), "GET", "/")
+        assert status == 200
+        assert json.loads(payload.decode("utf-8"))["trans_result"][0]["dst"] == "你好"
+
+    assert pool.stats["created"] == 1
+    assert pool.stats["reused"] == 2
+    # 三次请求都来自同一个客户端端口, 即同一条 TCP 连接
+    assert len({port for _, _, port in server.requests}) == 1
+    pool.close()
+
+
+def test_pool_expires_idle_connections(server):
+    pool = translator.ConnectionPool(idle_timeout=0)
+    pool.request("http", _host(server), "GET", "/")
+    pool.request("http", _host(server), "GET", "/")
+
+    assert pool.stats["created"] == 2
+    assert pool.stats["expired"] == 1
+    pool.close()
+
+
+def test_pool_retries_when_server_closed_idle_connection():
+    handler = type("DroppingHandler", (_EchoHandler,), {"drop_after_response": True})
+    server = _start_server(handler)
+    try:
+        pool = translator.ConnectionPool()
+        pool.request("http", _host(server), "POST", "/", "a=1")
+        status, _ = pool.request("http", _host(server), "POST", "/", "a=2")
+
+        assert status == 200
+        assert pool.stats["retried"] == 1
+        assert len(server.requests) == 2
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pool_does_not_retry_fresh_connection_errors():
+    pool = translator.ConnectionPool()
+    with _closed_port() as host:
+        with pytest.raises(OSError):
+            pool.request("http", host, "GET", "/", timeout=1)
+    assert pool.stats["retried"] == 0
+
+
+def test_warm_up_prepares_idle_connection(server):
+    pool = translator.ConnectionPool()
+    baidu = translator.BaiduTranslator("appid", "secret", pool=pool)
+    baidu.host = _host(server)
+
+    assert baidu.warm_up() is True
+    assert baidu.trans("hello") == "你好"
+    assert pool.stats == {"created": 1, "reused": 1, "expired": 0, "retried": 0}
+    pool.close()
+
+
+def test_translator_keeps_error_strings_when_unreachable():
+    pool = translator.ConnectionPool()
+    baidu = translator.BaiduTranslator("appid", "secret", timeout=1, pool=pool)
+    with _closed_port() as host:
+        baidu.host = host
+        assert baidu.trans("hello") == "网络请求失败，请检查网络设置。"
+        assert baidu.warm_up() is False
+
+
+@pytest.fixture
+def tls_contexts(tmp_path):
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        pytest.skip("openssl CLI is not available")
+    cert = tmp_path / "cert.pem"
+    key = tmp_path / "key.pem"
+    result = subprocess.run(
+        [openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", str(key), "-out", str(cert)],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        pytest.skip("openssl could not create a test certificate")
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(str(cert), str(key))
+    client_context = ssl.create_default_context(cafile=str(cert))
+    return server_context, client_context
+
+
+def test_pool_reuses_tls_connection(tls_contexts):
+    server_context, client_context = tls_contexts
+    server = _start_server(ssl_context=server_context)
+    try:
+        pool = translator.ConnectionPool(ssl_context=client_context)
+        deepl = translator.DeepLTranslator("key", api_host=_host(server), pool=pool)
+        for _ in range(3):
+            status, _ = pool.request("https", deepl.host, "POST", "/v2/translate", "text=hi")
+            assert status == 200
+
+        assert pool.stats["created"] == 1
+        assert len({port for _, _, port in server.requests}) == 1
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _CountingTranslator(object):
+    provider = "fake"
+
+    def __init__(self, results=None):
+        self.calls = []
+        self.results = results or {}
+
+    def warm_up(self):
+        return True
+
+    def trans(self, src_text, fromLang="auto", toLang="zh"):
+        self.calls.append((src_text, fromLang, toLang))
+        return self.results.get(src_text, "译:" + src_text)
+
+
+def test_cache_answers_repeated_messages_without_calling_provider(tmp_path):
+    backend = _CountingTranslator()
+    cached = translator.CachedTranslator(backend, translator.TranslationCache(str(tmp_path / "cache.db")))
+
+    assert cached.trans("ㅋㅋㅋ") == "译:ㅋㅋㅋ"
+    assert cached.trans("  ㅋㅋㅋ ") == "译:ㅋㅋㅋ"
+    assert cached.trans("ㅋㅋㅋ", toLang="en") == "译:ㅋㅋㅋ"
+
+    assert len(backend.calls) == 2
+    assert cached.cache.stats["memory_hits"] == 1
+
+
+def test_cache_never_stores_error_messages(tmp_path):
+    backend = _CountingTranslator({"gg": "翻译失败!", "ㅈㅅ": "网络请求失败，请检查网络设置。"})
+    cached = translator.CachedTranslator(backend, translator.TranslationCache(str(tmp_path / "cache.db")))
+
+    for _ in range(2):
+        assert cached.trans("gg") == "翻译失败!"
+        assert cached.trans("ㅈㅅ") == "网络请求失败，请检查网络设置。"
+
+    assert len(backend.calls) == 4
+    assert cached.cache.stats["stores"] == 0
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = translator.TranslationCache(path=None, max_entries=2)
+    keys = [cache.make_key("fake", "auto", "zh", text) for text in ("a", "b", "c")]
+    cache.put(keys[0], "A")
+    cache.put(keys[1], "B")
+    assert cache.get(keys[0]) == "A"
+    cache.put(keys[2], "C")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "A"
+    assert cache.get(keys[2]) == "C"
+    assert cache.stats["evictions"] == 1
+
+
+def test_cache_expires_entries_after_ttl(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "time", lambda: now[0])
+    cache = translator.TranslationCache(str(tmp_path / "cache.db"), ttl=60)
+    key = cache.make_key("fake", "auto", "zh", "백")
+    cache.put(key, "回城")
+
+    now[0] += 30
+    assert cache.get(key) == "回城"
+    now[0] += 60
+    assert cache.get(key) is None
+    # 内存里过期后也不会从磁盘读回旧译文
+    assert cache.stats["disk_hits"] == 0
+
+
+def test_cache_persists_to_disk_and_trims(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = translator.TranslationCache(path, disk_max_entries=10)
+    for index in range(25):
+        cache.put(cache.make_key("fake", "auto", "zh", str(index)), "r%d" % index)
+    cache.close()
+
+    reopened = translator.TranslationCache(path, disk_max_entries=10)
+    assert reopened.get(reopened.make_key("fake", "auto", "zh", "24")) == "r24"
+    assert reopened.get(reopened.make_key("fake", "auto", "zh", "0")) is None
+    assert reopened.stats["disk_hits"] == 1
+    assert reopened._disk_count <= 10
+    reopened.close()
+
+
+def test_cache_counts_replaced_rows_once(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = translator.TranslationCache(path, disk_max_entries=3)
+    first = cache.make_key("fake", "auto", "zh", "first")
+    cache.put(first, "一")
+    for index in range(10):
+        cache.put(cache.make_key("fake", "auto", "zh", "second"), "二%d" % index)
+    cache.put(cache.make_key("fake", "auto", "zh", "third"), "三")
+    assert cache._disk_count == 3
+    cache.close()
+
+    # 重复写入同一条不应触发清理, 最早的条目仍在磁盘上
+    reopened = translator.TranslationCache(path, disk_max_entries=3)
+    assert reopened._disk_count == 3
+    assert reopened.get(first) == "一"
+    assert reopened.get(reopened.make_key("fake", "auto", "zh", "second")) == "二9"
+    reopened.close()
+
+
+def _layers(created):
+    layers = []
+    while created is not None:
+        layers.append(type(created))
+        created = getattr(created, "translator", None)
+    return layers
+
+
+def _find_layer(created, cls):
+    while not isinstance(created, cls):
+        created = created.translator
+    return created
+
+
+def test_create_translator_wraps_provider_with_cache(monkeypatch, tmp_path):
+    config = translator._build_default_config()
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    config["rate_limits"]["enabled"] = True
+    monkeypatch.setattr(translator, "load_config", lambda: config)
+    monkeypatch.setattr(translator, "CACHE_PATH", str(tmp_path / "cache.db"))
+
+    created = translator.create_translator(warm_up=False)
+    assert _layers(created) == [translator.PhrasebookTranslator, translator.LanguageDetectingTranslator,
+                                translator.CachedTranslator,
+                                translator.SingleFlightTranslator, translator.MicroBatchTranslator,
+                                translator.RateLimitedTranslator, translator.BaiduTranslator]
+    assert created.provider == "baidu"
+
+    cache = _find_layer(created, translator.CachedTranslator).cache
+    config["cache"]["enabled"] = False
+    uncached = translator.create_translator(warm_up=False)
+    assert translator.CachedTranslator not in _layers(uncached)
+    # 关闭缓存后旧的 sqlite 连接随之关闭
+    assert cache._db is None
+
+    config["cache"].update(enabled=True, max_entries=10)
+    resized = _find_layer(translator.create_translator(warm_up=False), translator.CachedTranslator).cache
+    config["cache"]["max_entries"] = 20
+    translator.create_translator(warm_up=False)
+    assert resized._db is None
+
+
+class _BlockingTranslator(object):
+    provider = "fake"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def trans(self, src_text, fromLang="auto", toLang="zh"):
+        self.calls.append(src_text)
+        self.started.set()
+        self.release.wait(5)
+        return "译:" + src_text
+
+
+def _collecting_worker(backend, **kwargs):
+    results = []
+    done = threading.Event()
+
+    def callback(job):
+        results.append(job)
+        done.set()
+
+    worker = translator.TranslationWorker(backend, callback, **kwargs)
+    return worker, results, done
+
+
+def test_worker_translates_in_background():
+    backend = _BlockingTranslator()
+    worker, results, done = _collecting_worker(backend, workers=1)
+    job = worker.submit("ㅎㅇ", context="chat")
+
+    assert backend.started.wait(5)
+    assert not results
+    backend.release.set()
+    assert done.wait(5)
+    assert results == [job]
+    assert job.result == "译:ㅎㅇ"
+    assert job.state == "done"
+    worker.shutdown(wait=True)
+
+
+def test_worker_drops_oldest_chat_when_queue_is_full():
+    backend = _BlockingTranslator()
+    worker, results, _ = _collecting_worker(backend, workers=1, max_pending=2)
+    worker.submit("busy")
+    assert backend.started.wait(5)
+    jobs = [worker.submit(str(index)) for index in range(4)]
+    urgent = worker.submit("input", droppable=False)
+
+    assert [job.state for job in jobs] == ["dropped", "dropped", "dropped", "pending"]
+    assert urgent.state == "pending"
+    assert worker.stats["dropped"] == 3
+    backend.release.set()
+    worker.shutdown(wait=False)
+
+
+def test_worker_drops_chat_that_waited_too_long(monkeypatch):
+    backend = _BlockingTranslator()
+    worker, results, _ = _collecting_worker(backend, workers=1, max_age=10)
+    worker.submit("busy")
+    assert backend.started.wait(5)
+    stale = worker.submit("old")
+    stale.submitted_at -= 60
+    worker.submit("new")
+    backend.release.set()
+    for _ in range(500):
+        if len(results) == 2:
+            break
+        time.sleep(0.01)
+    worker.shutdown(wait=True)
+
+    assert [job.text for job in results] == ["busy", "new"]
+    assert stale.state == "dropped"
+    assert "old" not in backend.calls
+
+
+def test_worker_cancels_superseded_request_on_same_channel():
+    backend = _BlockingTranslator()
+    worker, results, done = _collecting_worker(backend, workers=1)
+    first = worker.submit("첫번째", channel="input", droppable=False)
+    assert backend.started.wait(5)
+    second = worker.submit("두번째", channel="input", droppable=False)
+    backend.release.set()
+    assert done.wait(5)
+    worker.shutdown(wait=True)
+
+    assert first.cancelled
+    assert [job.text for job in results] == ["두번째"]
+    assert worker.stats["cancelled"] == 1
+
+
+def _start_callers(target, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_single_flight_shares_one_request_between_concurrent_callers():
+    backend = _BlockingTranslator()
+    flight = translator.SingleFlightTranslator(backend)
+    threads, results = _start_callers(lambda: flight.trans("한타 ㄱㄱ"), 5)
+    assert backend.started.wait(5)
+    for _ in range(500):
+        if flight.stats["coalesced"] == 4:
+            break
+        time.sleep(0.01)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert backend.calls == ["한타 ㄱㄱ"]
+    assert results == ["译:한타 ㄱㄱ"] * 5
+    assert flight.stats == {"requests": 1, "coalesced": 4}
+    # 请求结束后不再合并, 下一次调用重新请求
+    assert flight.trans("한타 ㄱㄱ") == "译:한타 ㄱㄱ"
+    assert len(backend.calls) == 2
+
+
+def test_single_flight_shares_failures():
+    class FailingTranslator(_BlockingTranslator):
+        def trans(self, src_text, fromLang="auto", toLang="zh"):
+            super().trans(src_text, fromLang, toLang)
+            raise ValueError("boom")
+
+    backend = FailingTranslator()
+    flight = translator.SingleFlightTranslator(backend)
+    errors = []
+
+    def call():
+        try:
+            return flight.trans("gg")
+        except ValueError as exc:
+            errors.append(exc)
+
+    threads, _ = _start_callers(call, 3)
+    assert backend.started.wait(5)
+    for _ in range(500):
+        if flight.stats["coalesced"] == 2:
+            break
+        time.sleep(0.01)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(backend.calls) == 1
+    assert len(errors) == 3
+    assert not flight._flights
+
+
+class _BatchProviderHandler(_EchoHandler):
+    """按各接口的批量协议把每条文本翻译成 "译:<文本>" """
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path == "/api/trans/vip/translate":
+            lines = params["q"][0].split("\n")
+            body = {"trans_result": [{"src": line, "dst": "译:" + line} for line in lines]}
+        elif self.path == "/v2/translate":
+            body = {"translations": [{"text": "译:" + text} for text in params["text"]]}
+        else:
+            body = {"errorCode": "0",
+                    "translateResults": [{"query": q, "translation": "译:" + q} for q in params["q"]]}
+        self.server.batches.append(len(body.get("trans_result") or body.get("translations")
+                                       or body.get("translateResults")))
+        self._reply(body)
+
+
+@pytest.fixture
+def batch_server():
+    server = _start_server(_BatchProviderHandler)
+    server.batches = []
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _local_provider(name, server, pool):
+    if name == "baidu":
+        provider = translator.BaiduTranslator("id", "key", pool=pool)
+    elif name == "deepl":
+        provider = translator.DeepLTranslator("key", api_host=_host(server), pool=pool)
+    else:
+        provider = translator.YoudaoTranslator("key", "secret", pool=pool)
+    provider.scheme = "http"
+    if name != "deepl":
+        provider.host = _host(server)
+    return provider
+
+
+def test_pack_batches_respects_item_and_size_limits():
+    batches = list(translator._pack_batches(["aa", "bb", "cc", "d" * 10, "e"], max_items=2, max_chars=5))
+    assert batches == [["aa", "bb"], ["cc"], ["d" * 10], ["e"]]
+
+
+@pytest.mark.parametrize("name", ["baidu", "deepl", "youdao"])
+def test_provider_batch_keeps_order_across_requests(batch_server, name):
+    pool = translator.ConnectionPool()
+    provider = _local_provider(name, batch_server, pool)
+    provider.BATCH_MAX_ITEMS = 3
+    texts = ["메시지 %d" % index for index in range(7)] + ["두\n줄"]
+
+    assert provider.trans_batch(texts) == ["译:" + " ".join(text.splitlines()) for text in texts]
+    assert batch_server.batches == [3, 3, 2]
+    assert pool.stats["created"] == 1
+    pool.close()
+
+
+def test_provider_batch_reports_errors_per_message():
+    pool = translator.ConnectionPool()
+    provider = translator.BaiduTranslator("id", "key", timeout=1, pool=pool)
+    with _closed_port() as host:
+        provider.host = host
+        assert provider.trans_batch(["a", "b"]) == ["网络请求失败，请检查网络设置。"] * 2
+
+
+class _BatchCountingTranslator(_CountingTranslator):
+    supports_batch = True
+    BATCH_MAX_ITEMS = 4
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def trans_batch(self, texts, fromLang="auto", toLang="zh"):
+        self.batches.append(list(texts))
+        return ["译:" + text for text in texts]
+
+
+def test_micro_batcher_gathers_messages_while_a_request_is_in_flight():
+    backend = _BatchCountingTranslator()
+    started = threading.Event()
+    release = threading.Event()
+    single = backend.trans
+
+    def slow_trans(src_text, fromLang="auto", toLang="zh"):
+        started.set()
+        release.wait(5)
+        return single(src_text, fromLang=fromLang, toLang=toLang)
+
+    backend.trans = slow_trans
+    batcher = translator.MicroBatchTranslator(backend, window=0.2)
+    texts = ["a", "b", "c", "d", "e"]
+    results = {}
+
+    def call(text):
+        results[text] = batcher.trans(text)
+
+    busy = threading.Thread(target=call, args=("busy",))
+    busy.start()
+    assert started.wait(5)
+    threads = [threading.Thread(target=call, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not backend.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [busy] + threads:
+        thread.join(5)
+
+    assert results == {text: "译:" + text for text in ["busy"] + texts}
+    # 第一条在途期间到达的消息攒批, 满 4 条立即发送, 剩下的一条单独请求
+    assert [len(batch) for batch in backend.batches] == [4]
+    assert sorted(call[0] for call in backend.calls) == sorted(["busy"] + [text for text in texts
+                                                                       if text not in backend.batches[0]])
+    assert batcher.stats == {"batches": 3, "messages": 6}
+
+
+def test_micro_batcher_sends_lone_message_without_waiting():
+    backend = _BatchCountingTranslator()
+    batcher = translator.MicroBatchTranslator(backend, window=5)
+
+    start = time.monotonic()
+    assert batcher.trans("혼자") == "译:혼자"
+    assert time.monotonic() - start < 1
+    assert backend.calls == [("혼자", "auto", "zh")]
+    assert backend.batches == []
+
+
+def test_cached_batch_only_requests_missing_texts():
+    backend = _BatchCountingTranslator()
+    cached = translator.CachedTranslator(backend, translator.TranslationCache(path=None))
+    cached.trans("a")
+
+    assert cached.trans_batch(["a", "b", "c"]) == ["译:a", "译:b", "译:c"]
+    assert backend.batches == [["b", "c"]]
+
+
+class _SlowBaiduHandler(_EchoHandler):
+    delay = 0.0
+    answer = "慢"
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self._reply({"trans_result": [{"dst": self.answer}]})
+
+
+def _baidu_stand_in(delay, answer):
+    handler = type("StandIn", (_SlowBaiduHandler,), {"delay": delay, "answer": answer})
+    server = _start_server(handler)
+    provider = translator.BaiduTranslator("id", "key", pool=translator.ConnectionPool())
+    provider.host = _host(server)
+    return server, provider
+
+
+@pytest.fixture
+def stand_ins():
+    servers = []
+
+    def start(delay, answer):
+        server, provider = _baidu_stand_in(delay, answer)
+        servers.append(server)
+        return provider
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_hedging_uses_secondary_when_primary_is_slow(stand_ins):
+    primary = stand_ins(0.5, "主")
+    secondary = stand_ins(0.0, "备")
+    hedged = translator.HedgedTranslator(primary, [secondary], min_delay=0.05, default_delay=0.05)
+
+    start = time.monotonic()
+    assert hedged.trans("ㅎㅇ") == "备"
+    assert time.monotonic() - start < 0.4
+    assert hedged.stats["hedged"] == 1
+    assert hedged.stats["hedge_wins"] == 1
+
+
+def test_hedging_skips_secondary_when_primary_answers_in_time(stand_ins):
+    primary = stand_ins(0.0, "主")
+    secondary = stand_ins(0.0, "备")
+    hedged = translator.HedgedTranslator(primary, [secondary], default_delay=0.5)
+
+    assert hedged.trans("ㅎㅇ") == "主"
+    assert hedged.stats["hedged"] == 0
+
+
+def test_hedging_delay_follows_primary_p95(stand_ins):
+    primary = stand_ins(0.0, "主")
+    hedged = translator.HedgedTranslator(primary, [], min_delay=0.01, default_delay=2.0)
+    tracker = hedged.latency[id(primary)]
+    assert hedged.hedge_delay() == 2.0
+
+    for index in range(20):
+        tracker.record(0.05 if index < 19 else 0.9)
+    assert hedged.hedge_delay() == 0.05
+
+
+def test_hedging_budget_limits_secondary_calls(stand_ins):
+    primary = stand_ins(0.2, "主")
+    secondary = stand_ins(0.0, "备")
+    hedged = translator.HedgedTranslator(primary, [secondary], budget_per_minute=1,
+                                         min_delay=0.01, default_delay=0.01)
+
+    assert hedged.trans("a") == "备"
+    assert hedged.trans("b") == "主"
+    assert hedged.stats["hedged"] == 1
+    assert hedged.stats["budget_exhausted"] == 1
+
+
+def test_hedging_fails_over_immediately_on_primary_error(stand_ins):
+    secondary = stand_ins(0.0, "备")
+    primary = translator.BaiduTranslator("id", "key", timeout=1, pool=translator.ConnectionPool())
+    with _closed_port() as host:
+        primary.host = host
+        hedged = translator.HedgedTranslator(primary, [secondary], default_delay=5.0)
+        start = time.monotonic()
+        assert hedged.trans("a") == "备"
+    assert time.monotonic() - start < 2.0
+
+
+def test_create_translator_builds_hedging_from_config(monkeypatch):
+    config = translator._build_default_config()
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    config["providers"]["papago"].update({"client_id": "id", "client_secret": "secret"})
+    config["cache"]["enabled"] = False
+    config["hedging"]["enabled"] = True
+    monkeypatch.setattr(translator, "load_config", lambda: config)
+
+    hedged = _find_layer(translator.create_translator(warm_up=False), translator.HedgedTranslator)
+    assert [item.provider for item in hedged.secondaries] == ["papago"]
+    assert hedged.provider == "hedged:baidu+papago"
+
+    # 配置不变时复用同一个对冲层, 关闭对冲后旧的线程池被关闭
+    assert _find_layer(translator.create_translator(warm_up=False), translator.HedgedTranslator) is hedged
+    config["hedging"]["enabled"] = False
+    translator.create_translator(warm_up=False)
+    assert hedged._executor._shutdown
+
+
+def test_hedging_after_close_requests_on_calling_thread(stand_ins):
+    primary = stand_ins(0.0, "主")
+    hedged = translator.HedgedTranslator(primary, [stand_ins(0.0, "备")], default_delay=0.5)
+    hedged.close()
+    assert hedged.trans("ㅎㅇ") == "主"
+    assert hedged.stats["requests"] == 1
+
+
+def test_hedged_results_are_not_cached_under_primary_provider(stand_ins, tmp_path):
+    primary = stand_ins(0.5, "主")
+    hedged = translator.HedgedTranslator(primary, [stand_ins(0.0, "备")], min_delay=0.05, default_delay=0.05)
+    cache = translator.TranslationCache(str(tmp_path / "cache.db"))
+    cached = translator.CachedTranslator(hedged, cache)
+
+    assert cached.trans("ㅎㅇ", fromLang="ko") == "备"
+    assert cache.get(cache.make_key("baidu", "ko", "zh", "ㅎㅇ")) is None
+    assert cache.get(cache.make_key(hedged.provider, "ko", "zh", "ㅎㅇ")) == "备"
+    cache.close()
+    hedged.close()
+
+
+class _ScriptedProvider(object):
+    """按设定的延迟和结果应答, 用于测试路由"""
+    supports_batch = False
+
+    def __init__(self, name, latency=0.0, result=None, reachable=True):
+        self.provider = name
+        self.latency = latency
+        self.result = result
+        self.reachable = reachable
+        self.timeout = translator.REQUEST_TIMEOUT
+        self.calls = 0
+
+    def warm_up(self):
+        return self.reachable
+
+    def trans(self, src_text, fromLang="auto", toLang="zh"):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.result or "%s:%s" % (self.provider, src_text)
+
+    def trans_batch(self, texts, fromLang="auto", toLang="zh"):
+        return [self.trans(text, fromLang, toLang) for text in texts]
+
+
+def test_router_prefers_fastest_healthy_provider():
+    slow = _ScriptedProvider("slow", latency=0.05)
+    fast = _ScriptedProvider("fast", latency=0.0)
+    router = translator.RoutingTranslator([slow, fast])
+
+    # 还没有测量数据时按配置顺序, 之后选择 EWMA 延迟最低的
+    assert router.trans("a") == "slow:a"
+    assert router.trans("b") == "fast:b"
+    assert router.trans("c") == "fast:c"
+    assert router.health_of(slow).latency >= 0.05
+
+
+def test_router_fails_over_and_opens_breaker(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    broken = _ScriptedProvider("broken", result="网络请求失败，请检查网络设置。")
+    backup = _ScriptedProvider("backup")
+    router = translator.RoutingTranslator([broken, backup])
+    router.health_of(backup).latency = 10.0
+
+    for index in range(translator.BREAKER_FAILURES):
+        assert router.trans(str(index)) == "backup:%d" % index
+    assert router.health_of(broken).state == "open"
+    assert router.stats["failovers"] == translator.BREAKER_FAILURES
+
+    router.trans("x")
+    assert broken.calls == translator.BREAKER_FAILURES
+
+    # 冷却结束后放行一次试探请求, 恢复后重新参与路由
+    now[0] += translator.BREAKER_COOLDOWN
+    broken.result = None
+    assert router.trans("y") == "broken:y"
+    assert router.health_of(broken).state == "closed"
+
+
+def test_router_probe_restarts_cooldown_while_unreachable(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    down = _ScriptedProvider("down", result=translator.TIMEOUT_MESSAGE, reachable=False)
+    router = translator.RoutingTranslator([down])
+    for _ in range(translator.BREAKER_FAILURES):
+        assert router.trans("a") == translator.TIMEOUT_MESSAGE
+    assert router.health_of(down).timeouts == translator.BREAKER_FAILURES
+
+    now[0] += translator.BREAKER_COOLDOWN - 1
+    router.probe()
+    now[0] += 2
+    assert router.candidates() == []
+    assert router.trans("b") == "翻译失败!"
+    assert router.stats["exhausted"] == translator.BREAKER_FAILURES + 1
+
+
+def test_router_adapts_timeout_to_observed_latency():
+    provider = _ScriptedProvider("p")
+    wrapped = translator.TranslatorWrapper(provider)
+    router = translator.RoutingTranslator([wrapped])
+    router.trans("a")
+
+    assert provider.timeout == translator.MIN_REQUEST_TIMEOUT
+    health = router.health_of(wrapped)
+    health.latency = 100.0
+    assert health.timeout() == translator.REQUEST_TIMEOUT
+
+
+def test_create_translator_routes_over_configured_providers(monkeypatch):
+    config = translator._build_default_config()
+    config["provider"] = "papago"
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    config["providers"]["papago"].update({"client_id": "id", "client_secret": "secret"})
+    config["cache"]["enabled"] = False
+    config["routing"]["enabled"] = True
+    monkeypatch.setattr(translator, "load_config", lambda: config)
+    monkeypatch.setattr(translator.RoutingTranslator, "start_probing", lambda self: None)
+
+    router = _find_layer(translator.create_translator(warm_up=False), translator.RoutingTranslator)
+    assert [item.provider for item in router.providers] == ["papago", "baidu"]
+
+    # 关闭路由后停止探测线程
+    config["routing"]["enabled"] = False
+    translator.create_translator(warm_up=False)
+    assert router._stop.is_set()
+
+
+def test_half_open_breaker_lets_a_single_trial_through(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    health = translator.ProviderHealth()
+    for _ in range(translator.BREAKER_FAILURES):
+        health.record_failure(0.1)
+    assert not health.available()
+    assert not health.admit()
+
+    now[0] += translator.BREAKER_COOLDOWN
+    # available 只是查询, 不会占用试探机会
+    assert health.available() and health.available()
+    assert health.state == "open"
+    assert health.admit()
+    assert health.state == "half_open"
+    # 试探请求还没有结果, 并发的其他请求不能再打到这个接口
+    assert not health.available()
+    assert not health.admit()
+    health.record_failure(0.1)
+    assert health.state == "open"
+    assert not health.admit()
+
+    now[0] += translator.BREAKER_COOLDOWN
+    assert health.admit()
+    health.record_success(0.1)
+    assert health.admit() and health.admit()
+
+
+def test_router_keeps_half_open_trial_for_the_provider_it_attempts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    primary = _ScriptedProvider("primary")
+    backup = _ScriptedProvider("backup", result="网络请求失败，请检查网络设置。")
+    router = translator.RoutingTranslator([primary, backup])
+    router.health_of(primary).latency = 0.0
+    router.health_of(backup).latency = 10.0
+    for _ in range(translator.BREAKER_FAILURES):
+        router.health_of(backup).record_failure(0.1)
+
+    now[0] += translator.BREAKER_COOLDOWN
+    # 主接口正常应答时, 备用接口的试探机会不应被消耗
+    assert router.trans("a") == "primary:a"
+    assert router.health_of(backup).state == "open"
+    assert backup.calls == 0
+
+    primary.result = "网络请求失败，请检查网络设置。"
+    backup.result = None
+    assert router.trans("b") == "backup:b"
+    assert router.health_of(backup).state == "closed"
+    assert router.stats["failovers"] == 1
+
+
+def test_router_probe_rescues_a_lost_half_open_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    provider = _ScriptedProvider("p")
+    router = translator.RoutingTranslator([provider])
+    health = router.health_of(provider)
+    for _ in range(translator.BREAKER_FAILURES):
+        health.record_failure(0.1)
+    now[0] += translator.BREAKER_COOLDOWN
+    assert health.admit()
+
+    # 试探请求丢失, 结果一直没有记录
+    now[0] += translator.REQUEST_TIMEOUT - 1
+    router.probe()
+    assert router.candidates() == []
+    now[0] += 1
+    router.probe()
+    assert router.stats["probes"] == 2
+    assert router.trans("a") == "p:a"
+    assert health.state == "closed"
+
+    for _ in range(translator.BREAKER_FAILURES):
+        health.record_failure(0.1)
+    now[0] += translator.BREAKER_COOLDOWN
+    assert health.admit()
+    provider.reachable = False
+    router.probe()
+    assert health.state == "open"
+    now[0] += translator.BREAKER_COOLDOWN - 1
+    assert router.candidates() == []
+
+
+def test_router_stats_count_concurrent_requests():
+    router = translator.RoutingTranslator([_ScriptedProvider("p")])
+    threads = [threading.Thread(target=lambda: [router.trans("a") for _ in range(500)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert router.stats["requests"] == 2000
+
+
+def test_language_detection_skips_untranslatable_messages():
+    backend = _CountingTranslator()
+    detecting = translator.LanguageDetectingTranslator(backend)
+
+    # 不需要翻译时返回 NO_TRANSLATION, 界面不会把原文再显示一遍
+    assert detecting.trans("1234") == translator.NO_TRANSLATION
+    assert detecting.trans("好的") == translator.NO_TRANSLATION
+    assert detecting.trans("한타 ㄱㄱ") == "译:한타 ㄱㄱ"
+    assert backend.calls == [("한타 ㄱㄱ", "kor", "zh")]
+    assert detecting.stats == {"detected": 3, "skipped": 2}
+
+
+def test_language_detection_groups_batches_by_source_language():
+    backend = _BatchCountingTranslator()
+    detecting = translator.LanguageDetectingTranslator(backend)
+    texts = ["백", "gg", "ㅋㅋ", "?!", "nice"]
+
+    assert detecting.trans_batch(texts) == ["译:백", "译:gg", "译:ㅋㅋ", translator.NO_TRANSLATION, "译:nice"]
+    assert sorted(backend.batches) == [["gg", "nice"], ["백", "ㅋㅋ"]]
+
+
+class _PapagoHandler(_EchoHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path.endswith("detectLangs"):
+            self._reply({"langCode": "ko"})
+        else:
+            self._reply({"message": {"result": {"translatedText": params["source"][0]}}})
+
+
+def test_papago_skips_detect_langs_with_local_detection():
+    server = _start_server(_PapagoHandler)
+    try:
+        papago = translator.PapagoTranslator("id", "secret", pool=translator.ConnectionPool())
+        papago.scheme = "http"
+        papago.host = _host(server)
+
+        assert papago.trans("미아") == "ko"
+        assert len(server.requests) == 2
+        assert translator.LanguageDetectingTranslator(papago).trans("미아") == "ko"
+        assert [path for _, path, _ in server.requests[2:]] == ["/v1/papago/n2mt"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_phrasebook_answers_whole_messages_and_token_sequences():
+    phrasebook = translator.Phrasebook(translator.DEFAULT_PHRASEBOOK)
+
+    assert phrasebook.translate("ㄱㄱ") == "走走"
+    assert phrasebook.translate(" GG ") == "GG"
+    assert phrasebook.translate("ㅋㅋㅋㅋ") == "哈哈哈哈"
+    assert phrasebook.translate("한타 ㄱㄱ!!") == "团战 走走!!"
+    assert phrasebook.translate("수고하셨습니다") == "辛苦了"
+    assert phrasebook.stats == {"lookups": 5, "exact_hits": 3, "segment_hits": 2}
+
+
+def test_phrasebook_leaves_uncovered_text_to_provider():
+    phrasebook = translator.Phrasebook({"백": "撤退"})
+
+    assert phrasebook.translate("백업 하자") is None
+    assert phrasebook.translate("!!!") is None
+    assert phrasebook.translate("백 3") == "撤退 3"
+    assert phrasebook.hit_rate == pytest.approx(1 / 3)
+
+
+def test_phrasebook_prefers_longest_match():
+    phrasebook = translator.Phrasebook({"힐": "治疗", "힐러": "奶妈"})
+    assert phrasebook.translate("힐러 힐") == "奶妈 治疗"
+    assert phrasebook.translate("힐러힐러") == "奶妈奶妈"
+
+
+def test_phrasebook_single_syllables_only_match_standalone_tokens():
+    phrasebook = translator.Phrasebook(translator.DEFAULT_PHRASEBOOK)
+
+    # 单个音节粘在其他文字上时多半是另一个词的一部分, 交给翻译接口
+    assert phrasebook.translate("백힐") is None
+    assert phrasebook.translate("궁탱") is None
+    assert phrasebook.translate("힐러힐") is None
+    assert phrasebook.translate("백") == "撤退"
+    assert phrasebook.translate("백 힐!!") == "撤退 治疗!!"
+    assert phrasebook.translate("ㅋㅋ갱") is None
+    assert phrasebook.translate("갱 ㅋㅋ") == "抓人 哈哈"
+
+
+def test_phrasebook_stats_are_consistent_across_threads():
+    phrasebook = translator.Phrasebook({"백": "撤退"})
+    threads = [threading.Thread(target=lambda: [phrasebook.translate("백") for _ in range(2000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert phrasebook.stats["lookups"] == 8000
+    assert phrasebook.stats["exact_hits"] == 8000
+
+
+def test_load_phrasebook_merges_user_entries(tmp_path):
+    path = tmp_path / "phrasebook.json"
+    path.write_text(json.dumps({"ㄱㄱ": "冲冲冲", "자리": "位置"}, ensure_ascii=False), encoding="utf-8")
+
+    entries = translator.load_phrasebook(str(path))
+    assert entries["ㄱㄱ"] == "冲冲冲"
+    assert entries["자리"] == "位置"
+    assert entries["한타"] == "团战"
+
+    path.write_text("not json", encoding="utf-8")
+    assert translator.load_phrasebook(str(path)) == translator.DEFAULT_PHRASEBOOK
+
+
+def test_phrasebook_translator_skips_provider_for_covered_messages():
+    backend = _BatchCountingTranslator()
+    wrapped = translator.PhrasebookTranslator(backend, translator.Phrasebook({"백": "撤退"}))
+
+    assert wrapped.trans("백") == "撤退"
+    assert wrapped.trans("백", fromLang="zh", toLang="kor") == "译:백"
+    assert wrapped.trans_batch(["백", "미드"]) == ["撤退", "译:미드"]
+    assert backend.batches == [["미드"]]
+
+
+class _QuotaBaiduHandler(_EchoHandler):
+    """每个 appid 在任意 1 秒窗口内最多 qps 次请求, 超出时返回百度的 54003 错误"""
+    qps = 10
+
+    def do_GET(self):
+        appid = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)["appid"][0]
+        now = time.monotonic()
+        with self.server.lock:
+            stamps = self.server.stamps.setdefault(appid, [])
+            stamps[:] = [stamp for stamp in stamps if now - stamp < 1.0]
+            allowed = len(stamps) < self.qps
+            if allowed:
+                stamps.append(now)
+            self.server.per_key[appid] = self.server.per_key.get(appid, 0) + allowed
+        if allowed:
+            self._reply({"trans_result": [{"dst": "ok"}]})
+        else:
+            self._reply({"error_code": "54003", "error_msg": "Invalid Access Limit"})
+
+
+@pytest.fixture
+def quota_server():
+    server = _start_server(_QuotaBaiduHandler)
+    server.lock = threading.Lock()
+    server.stamps = {}
+    server.per_key = {}
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _run_concurrently(call, count, workers=4):
+    results = []
+    lock = threading.Lock()
+    remaining = list(range(count))
+
+    def worker():
+        while True:
+            with lock:
+                if not remaining:
+                    return
+                remaining.pop()
+            result = call()
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results, time.monotonic() - start
+
+
+def _quota_providers(server, count):
+    pool = translator.ConnectionPool()
+    providers = [translator.BaiduTranslator("key%d" % index, "secret", pool=pool) for index in range(count)]
+    for provider in providers:
+        provider.host = _host(server)
+    return providers
+
+
+def test_unpaced_burst_exceeds_provider_quota(quota_server):
+    provider = _quota_providers(quota_server, 1)[0]
+    results, _ = _run_concurrently(lambda: provider.trans("a"), 15)
+    assert results.count("翻译失败!") >= 5
+
+
+def test_rate_limiter_paces_requests_under_quota(quota_server):
+    limited = translator.RateLimitedTranslator(_quota_providers(quota_server, 1), qps=9, max_wait=2.0)
+    results, elapsed = _run_concurrently(lambda: limited.trans("a"), 12)
+
+    assert results == ["ok"] * 12
+    assert elapsed >= 1.0
+    assert limited.stats["delayed"] >= 10
+
+
+def test_rate_limiter_rotates_credentials_to_scale_throughput(quota_server):
+    limited = translator.RateLimitedTranslator(_quota_providers(quota_server, 2), qps=9, max_wait=2.0)
+    results, elapsed = _run_concurrently(lambda: limited.trans("a"), 12)
+
+    assert results == ["ok"] * 12
+    assert elapsed < 1.0
+    assert quota_server.per_key == {"key0": 6, "key1": 6}
+
+
+def test_rate_limiter_fails_fast_instead_of_queueing_past_max_wait(monkeypatch):
+    now = [0.0]
+    sleeps = []
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(translator.time, "sleep", sleeps.append)
+    backend = _CountingTranslator()
+    backend.supports_batch = False
+    limited = translator.RateLimitedTranslator([backend], qps=2, max_wait=0.6)
+
+    results = [limited.trans("a") for _ in range(3)] + [limited.trans_batch(["b", "c"])]
+    # 第二条等 0.5 秒, 之后的请求预计要等 1 秒, 不占令牌直接返回
+    assert sleeps == [0.5]
+    assert results == ["译:a", "译:a", translator.RATE_LIMITED_MESSAGE,
+                       [translator.RATE_LIMITED_MESSAGE] * 2]
+    assert limited.stats["rejected"] == 2
+    assert translator.RATE_LIMITED_MESSAGE in translator.ERROR_MESSAGES
+
+
+def test_rate_limits_are_off_by_default():
+    config = translator._build_default_config()
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    assert isinstance(translator._build_provider(config, "baidu"), translator.BaiduTranslator)
+
+
+def test_token_bucket_reservations_queue_up(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(translator.time, "monotonic", lambda: now[0])
+    bucket = translator.TokenBucket(rate=2, capacity=1)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.5, 1.0]
+    now[0] += 1.0
+    assert bucket.delay() == 0.5
+    now[0] += 0.5
+    assert bucket.delay() == 0.0
+    assert bucket.reserve() == 0.0
+
+
+def test_build_provider_rotates_extra_credentials():
+    config = translator._build_default_config()
+    config["providers"]["deepl"].update({"auth_key": "a", "api_host": "api.deepl.com",
+                                         "credentials": [{"auth_key": "b"}, {"auth_key": ""}]})
+    config["rate_limits"].update({"enabled": True, "max_wait": 3.0})
+    provider = translator._build_provider(config, "deepl")
+
+    assert isinstance(provider, translator.RateLimitedTranslator)
+    assert provider.max_wait == 3.0
+    assert [(item.auth_key, item.api_host) for item in provider.translators] == [
+        ("a", "api.deepl.com"), ("b", "api.deepl.com")]
+    provider.timeout = 2
+    assert [item.timeout for item in provider.translators] == [2, 2]
+
+    config["rate_limits"]["enabled"] = False
+    assert isinstance(translator._build_provider(config, "deepl"), translator.DeepLTranslator)
+
+
+def _write_config(path, config):
+    translator.save_config(config, str(path))
+
+
+def test_config_service_reloads_only_when_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "translator_config.json"
+    config = translator._build_default_config()
+    _write_config(path, config)
+    service = translator.ConfigService(str(path))
+    loads = []
+    real_load = translator.load_config
+    monkeypatch.setattr(translator, "load_config", lambda p=None: loads.append(p) or real_load(p))
+
+    first = service.get()
+    assert service.get() is first
+    assert loads == [str(path)]
+
+    config["provider"] = "deepl"
+    _write_config(path, config)
+    stat = path.stat()
+    # 显式推进 mtime, 不依赖文件系统的时间精度
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert service.get()["provider"] == "deepl"
+    assert service.version == 2
+
+
+def test_load_config_fills_nested_defaults_around_partial_overrides(tmp_path):
+    path = tmp_path / "translator_config.json"
+    path.write_text(json.dumps({"rate_limits": {"enabled": True, "qps": {"deepl": 20}},
+                                "providers": {"deepl": {"auth_key": "key"}}}), encoding="utf-8")
+
+    config = translator.load_config(str(path))
+    rate_limits = config["rate_limits"]
+    assert rate_limits["enabled"] is True
+    assert rate_limits["qps"]["deepl"] == 20
+    assert rate_limits["qps"]["baidu"] == translator.DEFAULT_RATE_LIMIT_SETTINGS["qps"]["baidu"]
+    assert rate_limits["max_wait"] == translator.DEFAULT_RATE_LIMIT_SETTINGS["max_wait"]
+    assert config["providers"]["deepl"]["auth_key"] == "key"
+    assert config["providers"]["deepl"]["api_host"] == "api-free.deepl.com"
+    assert config["hedging"] == translator.DEFAULT_HEDGING_SETTINGS
+    # 补齐的默认值是副本, 修改配置不会影响模块级默认值
+    config["rate_limits"]["qps"]["baidu"] = 99
+    assert translator.load_config(str(path))["rate_limits"]["qps"]["baidu"] == 1
+
+
+def test_registry_builds_providers_from_specs_lazily():
+    registry = translator.ProviderRegistry()
+    assert registry._factories == {}
+
+    deepl = registry.create("deepl", {"auth_key": " key ", "api_host": ""})
+    assert isinstance(deepl, translator.DeepLTranslator)
+    assert (deepl.auth_key, deepl.api_host) == ("key", "api-free.deepl.com")
+    assert registry.create("baidu", {"appid": "id"}) is None
+    assert registry.create("unknown", {}) is None
+
+    registry.register("papago", lambda client_id, client_secret: ("custom", client_id))
+    assert registry.create("papago", {"client_id": "a", "client_secret": "b"}) == ("custom", "a")
+
+
+def test_registry_shares_objects_until_settings_change():
+    registry = translator.ProviderRegistry()
+    closed = []
+
+    class Closable(object):
+        def close(self):
+            closed.append(self)
+
+    first = registry.shared("cache", {"ttl": 1}, Closable)
+    assert registry.shared("cache", {"ttl": 1}, Closable) is first
+    second = registry.shared("cache", {"ttl": 2}, Closable)
+
+    assert second is not first
+    assert closed == [first]
+
+
+def test_swappable_translator_swaps_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "translator_config.json"
+    config = translator._build_default_config()
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    config["cache"]["enabled"] = False
+    _write_config(path, config)
+    service = translator.ConfigService(str(path))
+    swappable = translator.SwappableTranslator(service, warm_up=False)
+
+    assert swappable and swappable.label == "百度翻译"
+    old_chain = swappable.translator
+    old_provider = _find_layer(old_chain, translator.BaiduTranslator)
+    assert swappable.reload() is False
+
+    # 只改了短语表开关: 重建翻译链, 但百度接口对象(连接、限速状态)原样复用
+    config["phrasebook"]["enabled"] = False
+    _write_config(path, config)
+    service.invalidate()
+    assert swappable.reload() is True
+    assert swappable.translator is not old_chain
+    assert _find_layer(swappable.translator, translator.BaiduTranslator) is old_provider
+
+    config["providers"]["baidu"]["appid"] = ""
+    _write_config(path, config)
+    service.invalidate()
+    assert swappable.reload() is True
+    assert not swappable
+    assert swappable.trans("ㅎㅇ") == "翻译失败!"
+
+
+def test_swap_does_not_interrupt_in_flight_request(tmp_path):
+    path = tmp_path / "translator_config.json"
+    _write_config(path, translator._build_default_config())
+    swappable = translator.SwappableTranslator(translator.ConfigService(str(path)), warm_up=False)
+    backend = _BlockingTranslator()
+    swappable.translator = backend
+    results = []
+    thread = threading.Thread(target=lambda: results.append(swappable.trans("한타")))
+    thread.start()
+    assert backend.started.wait(5)
+
+    swappable.reload(force=True)
+    backend.release.set()
+    thread.join(5)
+    assert results == ["译:한타"]
+    assert swappable.translator is not backend
+
+
+_STAND_IN_CREDENTIALS = {
+    "baidu": {"appid": "id", "secretkey": "key"},
+    "deepl": {"auth_key": "key"},
+    "youdao": {"app_key": "key", "app_secret": "secret"},
+    "papago": {"client_id": "id", "client_secret": "secret"},
+}
+
+
+def _stand_in_provider(name, server, **settings):
+    settings = dict(_STAND_IN_CREDENTIALS[name], host=server.host, scheme="http", **settings)
+    created = translator.PROVIDERS.create(name, settings)
+    created.pool = translator.ConnectionPool()
+    return created
+
+
+@pytest.mark.parametrize("name", ["baidu", "deepl", "youdao", "papago"])
+def test_stand_in_speaks_each_provider_protocol(name):
+    with StandInServer() as server:
+        provider = _stand_in_provider(name, server)
+        assert provider.host == server.host
+
+        result = provider.trans("한타 가자", fromLang="kor", toLang="zh")
+        assert result.endswith("] 한타 가자")
+        batch = provider.trans_batch(["백", "미아"], fromLang="kor", toLang="zh")
+        assert [item.split("] ")[1] for item in batch] == ["백", "미아"]
+        assert server.stats[name]["ok"] >= 2
+
+
+@pytest.mark.parametrize("name", ["baidu", "deepl", "youdao", "papago"])
+def test_stand_in_errors_map_to_translator_failures(name):
+    with StandInServer(error_rate=1.0) as server:
+        provider = _stand_in_provider(name, server)
+        assert provider.trans("한타", fromLang="kor") == "翻译失败!"
+        assert provider.trans_batch(["a", "b"], fromLang="kor") == ["翻译失败!"] * 2
+
+
+def test_stand_in_enforces_per_credential_quota():
+    with StandInServer(qps=2) as server:
+        first = _stand_in_provider("baidu", server)
+        second = _stand_in_provider("baidu", server, appid="other")
+        results = [first.trans("a", fromLang="kor") for _ in range(3)] + [second.trans("a", fromLang="kor")]
+
+        assert results.count("翻译失败!") == 1
+        assert server.stats["baidu"] == {"ok": 3, "errors": 0, "throttled": 1}
+
+
+def test_stand_in_injects_latency_per_provider():
+    with StandInServer(latency={"deepl": "fixed:0.2"}) as server:
+        fast = _stand_in_provider("baidu", server)
+        slow = _stand_in_provider("deepl", server)
+        start = time.monotonic()
+        fast.trans("a", fromLang="kor")
+        middle = time.monotonic()
+        slow.trans("a", fromLang="kor")
+        end = time.monotonic()
+
+    assert middle - start < 0.15
+    assert end - middle >= 0.2
+
+
+def test_worker_records_translate_timings_and_errors():
+    class _FailingTranslator(object):
+        provider = "fake"
+
+        def trans(self, src_text, fromLang="auto", toLang="zh"):
+            return "翻译失败!" if src_text == "bad" else "译:" + src_text
+
+    translator.METRICS.reset()
+    worker, results, _ = _collecting_worker(_FailingTranslator(), workers=1)
+    worker.submit("good")
+    worker.submit("bad")
+    deadline = time.monotonic() + 5
+    while len(results) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.shutdown(wait=True)
+
+    snapshot = translator.METRICS.snapshot()
+    assert snapshot["stages"]["translate"]["count"] == 2
+    assert snapshot["stages"]["queue_wait"]["count"] == 2
+    assert snapshot["counters"]["translate_errors"] == 1
+
+
+def test_connection_pool_records_round_trips(server):
+    translator.METRICS.reset()
+    pool = translator.ConnectionPool()
+    pool.request("http", _host(server), "GET", "/")
+    pool.close()
+    assert translator.METRICS.snapshot()["stages"]["http"]["count"] == 1
+
+
+def test_create_translator_exposes_cache_stats_to_metrics(monkeypatch, tmp_path):
+    config = translator._build_default_config()
+    config["providers"]["baidu"].update({"appid": "id", "secretkey": "key"})
+    monkeypatch.setattr(translator, "CACHE_PATH", str(tmp_path / "cache.db"))
+    created = translator.create_translator(warm_up=False, config=config)
+    cache = _find_layer(created, translator.CachedTranslator).cache
+    key = cache.make_key("baidu", "kor", "zh", "미아 조심")
+    cache.put(key, "小心失踪")
+    assert cache.get(key) == "小心失踪"
+
+    collectors = translator.METRICS.snapshot()["collectors"]
+    assert collectors["cache"]["stores"] == 1
+    assert collectors["cache"]["memory_hits"] == 1
+    assert "coalesced" in collectors["single_flight"]
+    assert "lookups" in collectors["phrasebook"]
+
+    # 关闭的层从统计中移除; 没有可用接口时整条链都不存在
+    config["cache"]["enabled"] = False
+    config["phrasebook"]["enabled"] = False
+    translator.create_translator(warm_up=False, config=config)
+    collectors = translator.METRICS.snapshot()["collectors"]
+    assert "cache" not in collectors and "phrasebook" not in collectors
+    assert "single_flight" in collectors
+
+    config["providers"]["baidu"]["appid"] = ""
+    assert translator.create_translator(warm_up=False, config=config) is None
+    assert translator.METRICS.snapshot()["collectors"] == {}
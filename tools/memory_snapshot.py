@@ -0,0 +1,69 @@
+"""Capture a process's committed read/write memory to a snapshot file, or inspect one.
+
+Snapshots can be replayed offline with ``memory_utils.ReplayBackend`` to
+time the scanner, ``read_string`` and calibration without a running game.
+
+Usage::
+
+    python tools/memory_snapshot.py capture --name HeroesOfTheStorm_x64.exe game.snap
+    python tools/memory_snapshot.py capture --pid 4242 game.snap
+    python tools/memory_snapshot.py info game.snap
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import memory_utils  # noqa: E402
+
+
+def capture(args):
+    pid = args.pid if args.pid is not None else memory_utils.get_process_id(args.name)
+    handle = memory_utils.get_process_handle(pid)
+    try:
+        start = time.perf_counter()
+        count = memory_utils.capture_memory_snapshot(handle, args.output)
+        elapsed = time.perf_counter() - start
+    finally:
+        memory_utils.CloseHandle(handle)
+    size_mb = pathlib.Path(args.output).stat().st_size / (1024 * 1024)
+    print(f'captured {count} regions ({size_mb:.1f} MiB) from pid {pid} in {elapsed:.2f}s -> {args.output}')
+
+
+def info(args):
+    backend = memory_utils.ReplayBackend(args.snapshot)
+    try:
+        total = sum(region[2] for region in backend.regions)
+        print(f'{args.snapshot}: {len(backend.regions)} regions, {total / (1024 * 1024):.1f} MiB')
+        for base_address, allocation_base, region_size, protect, _ in backend.regions[:args.limit]:
+            print(f'  {base_address:#018x} alloc={allocation_base:#018x} size={region_size:#x} protect={protect:#x}')
+    finally:
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    capture_parser = subparsers.add_parser('capture', help='dump a live process to a snapshot file')
+    target = capture_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--pid', type=int)
+    target.add_argument('--name', help='process name, e.g. HeroesOfTheStorm_x64.exe')
+    capture_parser.add_argument('output')
+    capture_parser.set_defaults(func=capture)
+
+    info_parser = subparsers.add_parser('info', help='list the regions stored in a snapshot')
+    info_parser.add_argument('snapshot')
+    info_parser.add_argument('--limit', type=int, default=20)
+    info_parser.set_defaults(func=info)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Serve fake Baidu, DeepL, Youdao and Papago translation APIs on localhost.
+
+The stand-in speaks each provider's request/response format closely enough for
+the ``*Translator`` classes, with configurable latency, error rate and a
+per-credential QPS quota, so throughput and tail latency can be measured
+without spending real quota.  Point a translator at it with
+``host='127.0.0.1:<port>', scheme='http'`` (or the same keys under
+``providers.<name>`` in translator_config.json).
+
+Latency specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``exponential:MEAN``,
+``lognormal:MEDIAN,SIGMA`` (all in seconds).
+
+Usage::
+
+    python tools/provider_stand_in.py --port 8765 --latency lognormal:0.08,0.5 --error-rate 0.01 --qps 10
+"""
+import argparse
+import http.server
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+
+BAIDU_PATH = '/api/trans/vip/translate'
+DEEPL_PATH = '/v2/translate'
+YOUDAO_PATH = '/api'
+YOUDAO_BATCH_PATH = '/v2/api'
+PAPAGO_PATH = '/v1/papago/n2mt'
+PAPAGO_DETECT_PATH = '/v1/papago/detectLangs'
+
+
+def parse_latency(spec):
+    """把延迟描述解析成无参函数, 每次调用返回一次采样的秒数"""
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    if kind == 'fixed':
+        return lambda: values[0] if values else 0.0
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'exponential':
+        return lambda: random.expovariate(1.0 / values[0])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError('unknown latency spec: %s' % spec)
+
+
+def fake_translation(text, target):
+    return '[%s] %s' % (target, text)
+
+
+class QuotaTracker(object):
+    """按凭据统计最近 1 秒内的请求数"""
+
+    def __init__(self, qps):
+        self.qps = qps
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    def allow(self, credential):
+        if not self.qps:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            stamps = [stamp for stamp in self._stamps.get(credential, []) if now - stamp < 1.0]
+            allowed = len(stamps) < self.qps
+            if allowed:
+                stamps.append(now)
+            self._stamps[credential] = stamps
+        return allowed
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出, 不关 Nagle 时每个请求会多出 ~40ms 的延迟确认等待
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _params(self):
+        split = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(split.query)
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            params.update(urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8')))
+        return split.path, params
+
+    def _send(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        path, params = self._params()
+        route = self.server.routes.get(path)
+        if route is None:
+            self._send(404, {'error': 'not found'})
+            return
+        provider, handler = route
+        credential = self._credential(provider, params)
+        stand_in = self.server.stand_in
+        time.sleep(max(0.0, stand_in.latency_for(provider)()))
+        if not stand_in.quota.allow((provider, credential)):
+            stand_in.count(provider, 'throttled')
+            self._send(*handler(self, params, 'throttled'))
+        elif random.random() < stand_in.error_rate:
+            stand_in.count(provider, 'errors')
+            self._send(*handler(self, params, 'error'))
+        else:
+            stand_in.count(provider, 'ok')
+            self._send(*handler(self, params, None))
+
+    def _credential(self, provider, params):
+        if provider == 'papago':
+            return self.headers.get('X-Naver-Client-Id', '')
+        key = {'baidu': 'appid', 'deepl': 'auth_key', 'youdao': 'appKey'}[provider]
+        return params.get(key, [''])[0]
+
+    def baidu(self, params, failure):
+        if failure == 'throttled':
+            return 200, {'error_code': '54003', 'error_msg': 'Invalid Access Limit'}
+        if failure:
+            return 200, {'error_code': '52001', 'error_msg': 'TIMEOUT'}
+        target = params.get('to', ['zh'])[0]
+        lines = params.get('q', [''])[0].split('\n')
+        return 200, {'from': params.get('from', ['auto'])[0], 'to': target,
+                     'trans_result': [{'src': line, 'dst': fake_translation(line, target)} for line in lines]}
+
+    def deepl(self, params, failure):
+        if failure == 'throttled':
+            return 429, {'message': 'Too many requests'}
+        if failure:
+            return 503, {'message': 'Service unavailable'}
+        target = params.get('target_lang', ['ZH'])[0]
+        return 200, {'translations': [{'detected_source_language': 'KO', 'text': fake_translation(text, target)}
+                                      for text in params.get('text', [])]}
+
+    def youdao(self, params, failure):
+        if failure == 'throttled':
+            return 200, {'errorCode': '411'}
+        if failure:
+            return 200, {'errorCode': '500'}
+        target = params.get('to', ['zh-CHS'])[0]
+        return 200, {'errorCode': '0', 'translation': [fake_translation(params.get('q', [''])[0], target)]}
+
+    def youdao_batch(self, params, failure):
+        if failure:
+            return self.youdao(params, failure)
+        target = params.get('to', ['zh-CHS'])[0]
+        return 200, {'errorCode': '0', 'translateResults': [
+            {'query': query, 'translation': fake_translation(query, target)} for query in params.get('q', [])]}
+
+    def papago(self, params, failure):
+        if failure == 'throttled':
+            return 429, {'errorCode': '010', 'errorMessage': 'Quota Exceed'}
+        if failure:
+            return 500, {'errorCode': '500', 'errorMessage': 'Internal Server Error'}
+        target = params.get('target', ['zh-CN'])[0]
+        return 200, {'message': {'result': {'srcLangType': params.get('source', ['ko'])[0], 'tarLangType': target,
+                                            'translatedText': fake_translation(params.get('text', [''])[0], target)}}}
+
+    def papago_detect(self, params, failure):
+        if failure:
+            return self.papago(params, failure)
+        return 200, {'langCode': 'ko'}
+
+
+class StandInServer(object):
+    """在后台线程运行的模拟服务器; latency 可以是一个描述, 也可以是 {接口: 描述}"""
+
+    ROUTES = {
+        BAIDU_PATH: ('baidu', StandInHandler.baidu),
+        DEEPL_PATH: ('deepl', StandInHandler.deepl),
+        YOUDAO_PATH: ('youdao', StandInHandler.youdao),
+        YOUDAO_BATCH_PATH: ('youdao', StandInHandler.youdao_batch),
+        PAPAGO_PATH: ('papago', StandInHandler.papago),
+        PAPAGO_DETECT_PATH: ('papago', StandInHandler.papago_detect),
+    }
+
+    def __init__(self, port=0, latency='fixed:0', error_rate=0.0, qps=None, bind='127.0.0.1'):
+        if isinstance(latency, dict):
+            self.latencies = {provider: parse_latency(spec) for provider, spec in latency.items()}
+            self.default_latency = parse_latency('fixed:0')
+        else:
+            self.latencies = {}
+            self.default_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.quota = QuotaTracker(qps)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer((bind, port), StandInHandler)
+        self._server.daemon_threads = True
+        self._server.routes = self.ROUTES
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def host(self):
+        address, port = self._server.server_address[:2]
+        return '%s:%d' % (address, port)
+
+    def latency_for(self, provider):
+        return self.latencies.get(provider, self.default_latency)
+
+    def count(self, provider, outcome):
+        with self._stats_lock:
+            counters = self.stats.setdefault(provider, {'ok': 0, 'errors': 0, 'throttled': 0})
+            counters[outcome] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='provider-stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0', help='e.g. lognormal:0.08,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--qps', type=float, default=None, help='per-credential quota, unlimited by default')
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.latency, args.error_rate, args.qps, args.bind)
+    print(f'provider stand-in listening on http://{server.host} (Ctrl+C to stop)')
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()